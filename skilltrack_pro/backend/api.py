@@ -1,48 +1,281 @@
-from flask import Blueprint, jsonify
-from flask_login import login_required
-from .models import Course, Trainer
+import uuid
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import select, func, and_, or_
+from .models import Course, Trainer, Documentation, db
+from .utils import stream_query_json
+from .routes_trainer import get_or_create_current_trainer
+from . import changes, course_stats, data_version, events, exports, fragment_cache
+from .db_pool import pool_metrics
+from .search import search as search_index
+from .bulk_courses import (
+    ImportFormatError, detect_format, import_courses, parse_schedule_time, read_rows, schedule_courses,
+)
+from .scheduling import MAX_CALENDAR_DAYS, calendar_statement
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Rows fetched per round trip when streaming large course lists
+COURSE_STREAM_BATCH = 500
+
 @api_bp.route('/admin/stats')
 @login_required
 def admin_stats():
-    requested_count = Course.query.filter_by(status='Requested').count()
-    in_review_count = Course.query.filter_by(status='In Review').count()
-    approved_count = Course.query.filter_by(status='Approved').count()
-    rejected_count = Course.query.filter_by(status='Rejected').count()
-    completed_count = Course.query.filter_by(status='Completed').count()
-    return jsonify({
-        'requested': requested_count,
-        'in_review': in_review_count,
-        'approved': approved_count,
-        'rejected': rejected_count,
-        'completed': completed_count
-    })
+    return jsonify(course_stats.get_course_counts())
+
+@api_bp.route('/admin/stats/cache')
+@login_required
+def admin_stats_cache():
+    return jsonify(course_stats.cache_info())
+
+@api_bp.route('/admin/stats/fragments')
+@login_required
+def admin_stats_fragments():
+    return jsonify(fragment_cache.cache_info())
+
+@api_bp.route('/admin/stats/pool')
+@login_required
+def admin_stats_pool():
+    return jsonify(pool_metrics.snapshot(db.engine.pool))
 
 @api_bp.route('/admin/courses')
 @login_required
 def admin_courses():
-    courses = Course.query.all()
-    course_list = []
-    for course in courses:
-        trainer_name = None
-        if course.trainer_id:
-            trainer = Trainer.query.filter_by(id=course.trainer_id).first()
-            trainer_name = trainer.name if trainer else None
-        
-        scheduled_time = None
-        if hasattr(course, 'scheduled_time') and course.scheduled_time:
-            try:
-                scheduled_time = course.scheduled_time.strftime('%Y-%m-%d %H:%M')
-            except:
-                scheduled_time = str(course.scheduled_time)
-        
-        course_list.append({
-            'id': str(course.id),
-            'title': course.title,
-            'trainer_name': trainer_name or 'Unassigned',
-            'status': course.status,
-            'scheduled_time': scheduled_time or '-'
-        })
-    return jsonify(course_list)
+    # One joined, column-only query; rows are plain tuples, so no ORM
+    # objects are hydrated and no per-course trainer lookups are issued.
+    statement = (
+        select(Course.id, Course.title, Course.status, Course.scheduled_time, Trainer.name)
+        .outerjoin(Trainer, Course.trainer_id == Trainer.id)
+    )
+    return stream_query_json(statement, _course_row, yield_per=COURSE_STREAM_BATCH)
+
+@api_bp.route('/admin/courses/import', methods=['POST'])
+@login_required
+def admin_import_courses():
+    # Body: a CSV/JSON/NDJSON file (multipart 'file' field or the raw request body)
+    return _bulk_courses_response(import_courses)
+
+@api_bp.route('/admin/courses/schedule', methods=['POST'])
+@login_required
+def admin_schedule_courses():
+    return _bulk_courses_response(schedule_courses)
+
+def _bulk_courses_response(action):
+    if current_user.role != 'admin':
+        abort(403)
+    upload = request.files.get('file')
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+    try:
+        if upload:
+            fmt = detect_format(upload.filename, upload.mimetype, request.args.get('format'))
+            rows = read_rows(upload.stream, fmt)
+        else:
+            fmt = detect_format(mimetype=request.mimetype, requested=request.args.get('format'))
+            rows = read_rows(request.stream, fmt)
+        report = action(rows, current_user.id, dry_run=dry_run)
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(report.to_dict())
+
+def _course_row(row):
+    course_id, title, status, scheduled_time, trainer_name = row
+    return {
+        'id': str(course_id),
+        'title': title,
+        'trainer_name': trainer_name or 'Unassigned',
+        'status': status,
+        'scheduled_time': scheduled_time.strftime('%Y-%m-%d %H:%M') if scheduled_time else '-'
+    }
+
+@api_bp.route('/admin/calendar')
+@login_required
+def admin_calendar():
+    # Every session in the window across the organisation, or one trainer's with ?trainer_id=
+    trainer_id = None
+    if request.args.get('trainer_id'):
+        trainer_id = request.args.get('trainer_id', type=uuid.UUID)
+        if trainer_id is None:
+            return jsonify({'error': 'Invalid trainer_id'}), 400
+    return _calendar_response(trainer_id)
+
+@api_bp.route('/trainer/calendar')
+@login_required
+def trainer_calendar():
+    return _calendar_response(get_or_create_current_trainer().id)
+
+def _calendar_response(trainer_id):
+    # ?start=&end= are ISO dates or datetimes; the default window is the coming week
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        start = parse_schedule_time(request.args['start']) if request.args.get('start') else today
+        end = parse_schedule_time(request.args['end']) if request.args.get('end') else start + timedelta(days=7)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates, e.g. 2025-03-01'}), 400
+    if end <= start or end - start > timedelta(days=MAX_CALENDAR_DAYS):
+        return jsonify({'error': f'end must be after start and at most {MAX_CALENDAR_DAYS} days later'}), 400
+    return stream_query_json(calendar_statement(start, end, trainer_id), _session_row,
+                             yield_per=COURSE_STREAM_BATCH)
+
+def _session_row(row):
+    course_id, title, status, scheduled_time, scheduled_end, trainer_id, trainer_name = row
+    return {
+        'id': str(course_id),
+        'title': title,
+        'status': status,
+        'trainer_id': str(trainer_id) if trainer_id else None,
+        'trainer_name': trainer_name or 'Unassigned',
+        'start': scheduled_time.isoformat(),
+        'end': scheduled_end.isoformat()
+    }
+
+@api_bp.route('/admin/exports/<name>.<fmt>')
+@login_required
+def admin_export(name, fmt):
+    # /api/admin/exports/courses.csv, documentation.xlsx, feedback.csv, ...
+    # Filters: ?status=, ?trainer_id=, ?start=&end= (ISO dates, end exclusive)
+    if current_user.role != 'admin':
+        abort(403)
+    if name not in exports.EXPORTS or fmt not in exports.FORMATS:
+        return jsonify({'error': f'Unknown export {name}.{fmt}'}), 404
+    filters = {'status': request.args.get('status') or None}
+    if request.args.get('trainer_id'):
+        filters['trainer_id'] = request.args.get('trainer_id', type=uuid.UUID)
+        if filters['trainer_id'] is None:
+            return jsonify({'error': 'Invalid trainer_id'}), 400
+    try:
+        for key in ('start', 'end'):
+            if request.args.get(key):
+                filters[key] = parse_schedule_time(request.args[key])
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates, e.g. 2025-03-01'}), 400
+    filename = f'{name}-{datetime.utcnow():%Y%m%d-%H%M}.{fmt}'
+    return Response(
+        stream_with_context(exports.export_stream(name, fmt, filters)),
+        mimetype=exports.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+@api_bp.route('/observer/stats')
+@login_required
+@data_version.conditional(data_version.DOCUMENTATION)
+def observer_stats():
+    # Pending documents only count once a file has been uploaded
+    has_file = and_(Documentation.file_path.isnot(None), Documentation.file_path != '')
+    rows = db.session.query(Documentation.status, func.count(Documentation.id)).filter(
+        or_(Documentation.status != 'Pending', has_file)
+    ).group_by(Documentation.status)
+    counts = dict(rows.all())
+    return jsonify({
+        'pending': counts.get('Pending', 0),
+        'approved': counts.get('Approved', 0),
+        'rejected': counts.get('Rejected', 0)
+    })
+
+@api_bp.route('/observer/pending-docs')
+@login_required
+@data_version.conditional(data_version.DOCUMENTATION, data_version.TRAINERS)
+def observer_pending_docs():
+    rows = db.session.execute(
+        select(Documentation.id, Course.title, Trainer.name, Documentation.revision_number,
+               Documentation.status, Documentation.submitted_at)
+        .join(Course, Documentation.course_id == Course.id)
+        .outerjoin(Trainer, Course.trainer_id == Trainer.id)
+        .where(Documentation.status == 'Pending',
+               Documentation.file_path.isnot(None), Documentation.file_path != '')
+        .order_by(Documentation.submitted_at)
+    )
+    return jsonify([{
+        'id': str(doc_id),
+        'course_title': title,
+        'trainer_name': trainer_name or 'Unassigned',
+        'revision_number': revision_number or 0,
+        'status': status,
+        'submitted_at': submitted_at.strftime('%Y-%m-%d %H:%M') if submitted_at else None
+    } for doc_id, title, trainer_name, revision_number, status, submitted_at in rows])
+
+@api_bp.route('/trainer/stats')
+@login_required
+@data_version.conditional(data_version.COURSES)
+def trainer_stats():
+    trainer = get_or_create_current_trainer()
+    return jsonify(course_stats.get_course_counts(trainer_id=trainer.id))
+
+@api_bp.route('/trainer/my-courses')
+@login_required
+@data_version.conditional(data_version.COURSES)
+def trainer_my_courses():
+    trainer = get_or_create_current_trainer()
+    rows = db.session.execute(
+        select(Course.id, Course.title, Course.status, Course.scheduled_time, Course.updated_at)
+        .where(Course.trainer_id == trainer.id)
+        .order_by(Course.title)
+    )
+    return jsonify([{
+        'id': str(course_id),
+        'title': title,
+        'status': status,
+        'scheduled_time': scheduled_time.strftime('%Y-%m-%d %H:%M') if scheduled_time else '-',
+        'updated_at': updated_at.strftime('%Y-%m-%d %H:%M') if updated_at else '-'
+    } for course_id, title, status, scheduled_time, updated_at in rows])
+
+@api_bp.route('/changes')
+@login_required
+def change_feed():
+    # Without ?since= only the current cursor is returned: take it, load the lists, then poll from it
+    if 'since' not in request.args:
+        return jsonify({'changes': [], 'cursor': changes.head(), 'has_more': False})
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({'error': 'since must be a cursor returned by this endpoint'}), 400
+    limit = min(max(request.args.get('limit', changes.PAGE_SIZE, type=int), 1), changes.PAGE_SIZE)
+    trainer_id = get_or_create_current_trainer().id if current_user.role == 'trainer' else None
+    entries, cursor, has_more = changes.since(since, limit, trainer_id)
+    return jsonify({
+        'changes': [{
+            'cursor': entry.id,
+            'type': entry.entity_type,
+            'id': str(entry.entity_id),
+            'course_id': str(entry.course_id),
+            'action': entry.action,
+            'status': entry.status,
+            'at': entry.created_at.isoformat(timespec='seconds'),
+        } for entry in entries],
+        'cursor': cursor,
+        'has_more': has_more,
+    })
+
+@api_bp.route('/search')
+@login_required
+def search():
+    # Results cover every course, trainer and document text, so only admins and observers may search
+    if current_user.role not in ('admin', 'observer'):
+        abort(403)
+    types = [t for t in request.args.get('type', '').split(',') if t]
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    results, has_more = search_index(request.args.get('q', ''), types=types, page=page, per_page=per_page)
+    return jsonify({
+        'query': request.args.get('q', ''),
+        'page': page,
+        'has_more': has_more,
+        'results': results
+    })
+
+@api_bp.route('/events')
+@login_required
+def event_stream():
+    broker = events.get_broker()
+    if broker is None:
+        return jsonify({'error': 'Live updates are disabled'}), 404
+    if broker.subscriber_count() >= current_app.config['EVENTS_MAX_STREAMS']:
+        return jsonify({'error': 'Too many open update streams'}), 503, {'Retry-After': '30'}
+    trainer_id = get_or_create_current_trainer().id if current_user.role == 'trainer' else None
+    audience = events.Audience(current_user.role, trainer_id)
+    # Not wrapped in stream_with_context: the request's database connection
+    # is released when the view returns, not held for the life of the stream
+    return Response(
+        events.stream(broker, audience, request.headers.get('Last-Event-ID')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
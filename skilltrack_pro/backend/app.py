@@ -1,11 +1,18 @@
 from flask import Flask, redirect, url_for, session
 from flask_login import LoginManager
+from flask_migrate import Migrate, upgrade
+from jinja2 import FileSystemBytecodeCache
 from .routes_admin import admin_bp
 from .routes_trainer import trainer_bp
 from .routes_observer import observer_bp
 from .auth import auth_bp
 from .api import api_bp
-from .models import db, User  # Import db and User model
+from .routes_documents import documents_bp
+from .models import db
+from .principal import load_principal
+from .commands import register_commands
+from .db_pool import engine_options, instrument_engine
+from . import assets, changes, compression, events, metrics, storage
 import os
 
 
@@ -15,9 +22,70 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')  # Required for sessions
 # Configure your Supabase PostgreSQL connection string here
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sizing profile: 'direct', 'transaction' (Supabase transaction pooler / PgBouncer) or 'null'
+app.config['DB_POOL_PROFILE'] = os.getenv('DB_POOL_PROFILE', 'direct')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], app.config['DB_POOL_PROFILE']
+)
+
+# Prometheus /metrics with per-endpoint latency, SQL and Supabase timings; off by default
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+# Optional bearer token the scraper must send
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+# Per-file upload limit; requests whose body is clearly larger are refused with 413 before being read
+app.config['MAX_UPLOAD_BYTES'] = int(os.getenv('MAX_UPLOAD_BYTES', 50 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = app.config['MAX_UPLOAD_BYTES'] + 64 * 1024
+
+# Where uploaded documents are stored. It must lie outside the static folder, so they
+# are only reachable through the authorised /documents/<id>/download route.
+app.config['UPLOAD_ROOT'] = os.getenv('UPLOAD_ROOT') or os.path.join(app.instance_path, 'uploads')
+# How document downloads are sent: 'python', 'x-sendfile' or 'x-accel' (nginx)
+app.config['DOCUMENT_SEND_MODE'] = os.getenv('DOCUMENT_SEND_MODE', 'python')
+# nginx 'internal' location that aliases UPLOAD_ROOT, used in x-accel mode
+app.config['DOCUMENT_ACCEL_PREFIX'] = os.getenv('DOCUMENT_ACCEL_PREFIX', '/protected-uploads')
+
+# Compiled templates are kept on disk so restarted workers skip recompiling them.
+# Defaults to a per-user directory under the system temp dir; 'off' disables it.
+app.config['TEMPLATE_BYTECODE_CACHE'] = os.getenv('TEMPLATE_BYTECODE_CACHE', '')
+if app.config['TEMPLATE_BYTECODE_CACHE'] != 'off':
+    if app.config['TEMPLATE_BYTECODE_CACHE']:
+        os.makedirs(app.config['TEMPLATE_BYTECODE_CACHE'], exist_ok=True)
+    app.jinja_options = {
+        **app.jinja_options,
+        'bytecode_cache': FileSystemBytecodeCache(app.config['TEMPLATE_BYTECODE_CACHE'] or None),
+    }
+
+# gzip/brotli for text responses, and content-hashed static URLs cached as immutable
+app.config['COMPRESS_RESPONSES'] = os.getenv('COMPRESS_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+app.config['STATIC_FINGERPRINT'] = os.getenv('STATIC_FINGERPRINT', 'true').lower() in ('1', 'true', 'yes')
+
+# Live dashboard updates: 'auto' uses Postgres LISTEN/NOTIFY on Postgres and an in-process broker otherwise.
+# LISTEN needs a session-mode connection; point EVENTS_DATABASE_URL at one when DATABASE_URL is a transaction pooler.
+app.config['EVENTS_BROKER'] = os.getenv('EVENTS_BROKER', 'auto')
+app.config['EVENTS_DATABASE_URL'] = os.getenv('EVENTS_DATABASE_URL')
+# Open event streams per worker process. Each holds a gunicorn thread (or greenlet) but no database
+# connection; gunicorn.conf.py gives every worker this many threads on top of the pool's connections.
+app.config['EVENTS_MAX_STREAMS'] = int(os.getenv('EVENTS_MAX_STREAMS', 25))
+
+# Observer review list: 'shared' (everyone sees every pending document) or 'claim'
+# (each observer leases the next few documents; see review_queue.py)
+app.config['REVIEW_QUEUE_MODE'] = os.getenv('REVIEW_QUEUE_MODE', 'shared')
 
 # Initialize SQLAlchemy with app
 db.init_app(app)
+with app.app_context():
+    instrument_engine(db.engine)
+metrics.init_app(app)
+compression.init_app(app)
+assets.init_app(app)
+storage.init_app(app)
+changes.init_app(app)
+events.init_app(app)
+
+# Schema changes live in migrations/ and are applied with `flask db upgrade`.
+# Batch mode lets the same scripts run against SQLite in development.
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(__file__), 'migrations'), render_as_batch=True)
 
 # Setup Flask-Login
 login_manager = LoginManager()
@@ -27,7 +95,8 @@ login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(user_id)
+    # Resolved from the signed session / in-process cache; Postgres only on a miss
+    return load_principal(user_id)
 
 
 # Register blueprints
@@ -36,6 +105,9 @@ app.register_blueprint(admin_bp)
 app.register_blueprint(trainer_bp)
 app.register_blueprint(observer_bp)
 app.register_blueprint(api_bp)
+app.register_blueprint(documents_bp)
+
+register_commands(app)
 
 
 @app.route('/')
@@ -45,6 +117,6 @@ def home():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()  # Create tables if not exist
+        upgrade()  # Bring the schema up to the latest migration
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,78 @@
+"""Content-hashed static URLs served with far-future, immutable caching.
+
+At startup every stylesheet, script, image and font under the static folder
+is hashed. url_for('static', filename='css/style.css') then builds
+/static/css/style.<hash>.css. The static view maps the hashed name back to
+the file and marks the response cacheable for a year: a changed file gets a
+new hash, and so a new URL, on the next deploy. Plain URLs keep Flask's
+default revalidating behaviour. There is no build step and nothing to check
+in; the manifest is rebuilt whenever the app starts.
+
+Paths under EXCLUDED_DIRS answer 404 whether or not fingerprinting is on.
+"""
+import hashlib
+import os
+import posixpath
+from flask import abort
+
+# Only these are fingerprinted; uploads and anything else keep plain URLs
+FINGERPRINT_EXTENSIONS = {'.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2'}
+# Uploads saved under the static folder before UPLOAD_ROOT existed; never fingerprinted or served
+EXCLUDED_DIRS = {'uploads'}
+HASH_LENGTH = 12
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def build_manifest(static_folder):
+    """Return ({filename: hashed_filename}, {hashed_filename: filename}) for the assets in ``static_folder``."""
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            stem, extension = os.path.splitext(name)
+            if extension.lower() not in FINGERPRINT_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(65536), b''):
+                    digest.update(block)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            directory = filename[:-len(name)]
+            manifest[filename] = f'{directory}{stem}.{digest.hexdigest()[:HASH_LENGTH]}{extension}'
+    return manifest, {hashed: filename for filename, hashed in manifest.items()}
+
+
+def init_app(app):
+    """Keep EXCLUDED_DIRS off the static route; if STATIC_FINGERPRINT, also serve hashed names as immutable."""
+    if not app.static_folder:
+        return
+    manifest, originals = {}, {}
+    if app.config.get('STATIC_FINGERPRINT'):
+        manifest, originals = build_manifest(app.static_folder)
+        app.extensions['static_manifest'] = manifest
+    serve = app.view_functions['static']
+
+    @app.url_defaults
+    def fingerprint(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        if posixpath.normpath(filename).split('/', 1)[0] in EXCLUDED_DIRS:
+            abort(404)
+        original = originals.get(filename)
+        if original is None:
+            return serve(filename=filename)
+        response = serve(filename=original)
+        if response.status_code == 200:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            # Let the compression hook see the body; these files are small
+            response.direct_passthrough = False
+        return response
+
+    app.view_functions['static'] = static
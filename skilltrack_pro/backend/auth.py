@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from flask_login import login_user, logout_user, login_required
 from .supabase_client import supabase, register_user
 from .models import User, db
+from .principal import remember_user
+from .metrics import supabase_call
 import logging
 
 auth_bp = Blueprint('auth', __name__)
@@ -13,10 +15,11 @@ def login():
         password = request.form.get('password')
 
         try:
-            response = supabase.auth.sign_in_with_password({
-                "email": email,
-                "password": password
-            })
+            with supabase_call('auth.sign_in'):
+                response = supabase.auth.sign_in_with_password({
+                    "email": email,
+                    "password": password
+                })
         except Exception as e:
             flash(f"Error connecting to Supabase: {e}", "danger")
             return render_template('login.html')
@@ -42,6 +45,7 @@ def login():
             db.session.commit()
 
         login_user(user)
+        remember_user(user)
         session['role'] = role
 
         # Role-based redirects
@@ -96,6 +100,7 @@ def register():
 
         # Log in the user immediately
         login_user(user)
+        remember_user(user)
         flash("Registration successful! You are now logged in.", "success")
 
         # Redirect based on role
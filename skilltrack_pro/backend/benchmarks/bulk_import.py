@@ -0,0 +1,127 @@
+"""Throughput of the bulk course import and bulk scheduling endpoints.
+
+    python -m skilltrack_pro.backend.benchmarks.bulk_import [--rows N] [--format csv|json|ndjson]
+
+Uploads a generated file of --rows courses (a few percent of them invalid)
+to /api/admin/courses/import, then schedules every imported course through
+/api/admin/courses/schedule. The same work done one form post at a time
+through admin.request_course and admin.schedule_course is timed on a
+--per-row-sample of rows and extrapolated, for comparison.
+"""
+import argparse
+import csv
+import io
+import json
+import random
+from datetime import datetime, timedelta
+from .common import bootstrap, login, make_user, timed
+
+
+def course_rows(count, trainer_emails, rng):
+    start = datetime(2030, 1, 1, 9, 0)
+    for i in range(count):
+        row = {
+            'title': f'Cohort course {i}',
+            'description': f'Onboarding module {i % 40} for the spring cohort',
+            'trainer_email': rng.choice(trainer_emails) if rng.random() < 0.7 else '',
+            'scheduled_time': (start + timedelta(hours=i)).strftime('%Y-%m-%d %H:%M'),
+        }
+        if rng.random() < 0.02:
+            row['title'] = ''
+        elif rng.random() < 0.01:
+            row['scheduled_time'] = 'next tuesday'
+        yield row
+
+
+def encode(rows, fmt):
+    if fmt == 'csv':
+        out = io.StringIO()
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+        return out.getvalue().encode()
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(row) + '\n' for row in rows).encode()
+    return json.dumps(list(rows)).encode()
+
+
+MIMETYPES = {'csv': 'text/csv', 'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--format', choices=list(MIMETYPES), default='csv')
+    parser.add_argument('--per-row-sample', type=int, default=200)
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from sqlalchemy import select, update
+    from ..models import Course, Trainer, db
+
+    rng = random.Random(7)
+    with app.app_context():
+        admin = make_user('admin')
+        trainer_users = [make_user('trainer') for _ in range(20)]
+        db.session.add_all([admin] + trainer_users)
+        db.session.flush()
+        db.session.add_all([Trainer(name=u.username, user_id=u.id) for u in trainer_users])
+        db.session.commit()
+        admin_id = admin.id
+        emails = [u.email for u in trainer_users]
+
+    client = app.test_client()
+    login(client, admin_id)
+    body = encode(course_rows(args.rows, emails, rng), args.format)
+
+    counter.reset()
+    with timed() as t:
+        response = client.post('/api/admin/courses/import', data=body, content_type=MIMETYPES[args.format])
+    report = response.get_json()
+    print(f'import   {args.rows} rows ({len(body) // 1024} KiB {args.format}): {report["accepted"]} created, '
+          f'{report["rejected"]} rejected in {t["seconds"]:.2f}s = {args.rows / t["seconds"]:.0f} rows/s, '
+          f'{counter.count} statements')
+
+    with app.app_context():
+        db.session.execute(update(Course).where(Course.user_id == admin_id).values(status='In Review'))
+        db.session.commit()
+        course_ids = db.session.scalars(select(Course.id).where(Course.user_id == admin_id)).all()
+    start = datetime(2031, 1, 1, 9, 0)
+    schedule = [{'course_id': str(course_id), 'scheduled_time': (start + timedelta(hours=i)).isoformat()}
+                for i, course_id in enumerate(course_ids)]
+    body = encode(schedule, args.format)
+
+    counter.reset()
+    with timed() as t:
+        response = client.post('/api/admin/courses/schedule', data=body, content_type=MIMETYPES[args.format])
+    report = response.get_json()
+    print(f'schedule {len(schedule)} rows: {report["accepted"]} scheduled, {report["rejected"]} rejected in '
+          f'{t["seconds"]:.2f}s = {len(schedule) / t["seconds"]:.0f} rows/s, {counter.count} statements')
+
+    # The same work one form post per course, as before the bulk endpoints
+    sample = args.per_row_sample
+    counter.reset()
+    with timed() as t:
+        for i in range(sample):
+            client.post('/admin/courses/request', data={'title': f'Single course {i}', 'description': 'One by one'})
+    print(f'per-row request_course: {sample / t["seconds"]:.0f} rows/s, {counter.count / sample:.1f} statements/row '
+          f'(~{args.rows * t["seconds"] / sample:.1f}s for {args.rows} rows)')
+
+    with app.app_context():
+        db.session.execute(update(Course).where(Course.title.like('Single course %')).values(status='In Review'))
+        db.session.commit()
+        single_ids = db.session.scalars(select(Course.id).where(Course.title.like('Single course %'))).all()
+    counter.reset()
+    with timed() as t:
+        for course_id in single_ids:
+            client.post('/admin/courses/schedule', data={'course_id': str(course_id), 'datetime': '2032-01-01 09:00'})
+    print(f'per-row schedule_course: {len(single_ids) / t["seconds"]:.0f} rows/s, '
+          f'{counter.count / len(single_ids):.1f} statements/row')
+
+
+if __name__ == '__main__':
+    main()
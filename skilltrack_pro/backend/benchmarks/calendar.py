@@ -0,0 +1,86 @@
+"""Calendar window queries and trainer conflict checks on seeded data.
+
+    python -m skilltrack_pro.backend.benchmarks.calendar [--scale small|medium|production] [--repeat N]
+
+Times the org-wide and per-trainer month views of /api/admin/calendar and
+/api/trainer/calendar, one SQL conflict check per proposed slot, and the
+batch path bulk scheduling uses: one query loads every trainer's month into
+IntervalIndex objects, then each proposed slot is checked in memory.
+"""
+import argparse
+import random
+import statistics
+from datetime import datetime, timedelta
+from .common import bootstrap, login, timed
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        with timed() as t:
+            result = fn()
+        samples.append(t['seconds'] * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    from ..seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='medium')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--proposals', type=int, default=2000)
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from sqlalchemy import select
+    from ..models import Trainer, db
+    from ..scheduling import find_conflicts, load_indexes, session_end
+    from ..seed import pick_sample, seed_database
+
+    with app.app_context():
+        counts = seed_database(**SCALES[args.scale], random_seed=42, search_index=False)
+        sample = pick_sample()
+        trainer_ids = db.session.scalars(select(Trainer.id)).all()
+    print(f'{counts["courses"]} courses, {counts["trainers"]} trainers')
+
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=31)
+    window = f'start={start:%Y-%m-%d}&end={end:%Y-%m-%d}'
+    admin, trainer = app.test_client(), app.test_client()
+    login(admin, sample['admin'])
+    login(trainer, sample['trainer'])
+
+    for label, client, url in (
+        ('org month view', admin, f'/api/admin/calendar?{window}'),
+        ('trainer month view', trainer, f'/api/trainer/calendar?{window}'),
+        ('admin, one trainer', admin, f'/api/admin/calendar?{window}&trainer_id={sample["trainer_id"]}'),
+    ):
+        client.get(url)
+        counter.reset()
+        ms, sessions = _median_ms(lambda: client.get(url).get_json(), args.repeat)
+        print(f'{label:<20} {len(sessions):>6} sessions  {ms:8.1f} ms  '
+              f'{counter.count // args.repeat} statements/request')
+
+    rng = random.Random(1)
+    proposals = []
+    for _ in range(args.proposals):
+        slot = start + timedelta(days=rng.randint(0, 30), hours=rng.randint(8, 17))
+        proposals.append((rng.choice(trainer_ids), slot, session_end(slot, 60)))
+
+    with app.app_context():
+        with timed() as t:
+            sql_conflicts = sum(bool(find_conflicts(trainer_id, s, e)) for trainer_id, s, e in proposals)
+        print(f'SQL check per slot:   {args.proposals} slots, {sql_conflicts} conflicts, '
+              f'{t["seconds"] * 1e6 / args.proposals:.0f} us/slot')
+
+        with timed() as t:
+            indexes = load_indexes({trainer_id for trainer_id, _, _ in proposals}, start, end + timedelta(days=1))
+            index_conflicts = sum(bool(indexes[trainer_id].overlapping(s, e)) for trainer_id, s, e in proposals)
+        print(f'IntervalIndex batch:  {args.proposals} slots, {index_conflicts} conflicts, '
+              f'{t["seconds"] * 1e6 / args.proposals:.0f} us/slot including the load query')
+
+
+if __name__ == '__main__':
+    main()
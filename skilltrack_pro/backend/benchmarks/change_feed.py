@@ -0,0 +1,106 @@
+"""Catching up after changes: reloading full lists versus /api/changes.
+
+    python -m skilltrack_pro.backend.benchmarks.change_feed [--scale small|medium|production] [--changes 1,10,100]
+
+Before: a client that wants to know what changed reloads its lists, here
+/api/admin/courses for the admin and /api/trainer/my-courses for a trainer.
+After: it asks /api/changes for what happened since its cursor. For each
+batch of observer reviews the script reports the bytes and SQL statements
+of both ways of catching up.
+
+Every other review is a rejection. The rejected documents are then
+resubmitted, giving them a second entry, the log is aged past the
+compaction window, and the script reports what compact() keeps.
+"""
+import argparse
+from datetime import datetime, timedelta
+from .common import bootstrap, login
+
+RELOADS = {
+    'admin': '/api/admin/courses',
+    'trainer': '/api/trainer/my-courses',
+}
+
+
+def _catch_up(client, counter, cursor):
+    """Follow /api/changes from ``cursor`` to the head; returns (bytes, statements, entries, cursor)."""
+    size = statements = entries = 0
+    has_more = True
+    while has_more:
+        counter.reset()
+        response = client.get(f'/api/changes?since={cursor}')
+        statements += counter.count
+        size += len(response.get_data())
+        body = response.get_json()
+        entries += len(body['changes'])
+        cursor, has_more = body['cursor'], body['has_more']
+    return size, statements, entries, cursor
+
+
+def _reload(client, counter, url):
+    counter.reset()
+    # A fresh download, as after a change the conditional ETag no longer matches
+    size = len(client.get(url).get_data())
+    return size, counter.count
+
+
+def main():
+    from ..seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--changes', default='1,10,100')
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from sqlalchemy import func, select, update
+    from .. import changes, state_machine
+    from ..seed import pick_sample, seed_database
+    from ..models import ChangeLogEntry, db
+    from ..queries import pending_documentation_query
+
+    with app.app_context():
+        seed_database(**SCALES[args.scale], random_seed=42, search_index=False)
+        sample = pick_sample()
+        pending = [doc.id for doc in pending_documentation_query()]
+
+    observer = app.test_client()
+    login(observer, sample['observer'])
+    clients = {}
+    for role in RELOADS:
+        clients[role] = app.test_client()
+        login(clients[role], sample[role])
+    cursors = {role: client.get('/api/changes').get_json()['cursor'] for role, client in clients.items()}
+    rejected = []
+
+    print(f'{"reviews":>8}  {"client":<8}{"reload KiB":>11}{"queries":>9}{"feed KiB":>10}{"queries":>9}{"entries":>9}')
+    for count in (int(n) for n in args.changes.split(',')):
+        batch, pending = pending[:count], pending[count:]
+        for i, doc_id in enumerate(batch):
+            if i % 2:
+                observer.post(f'/observer/review/{doc_id}', data={'action': 'reject', 'feedback': 'Benchmark'})
+                rejected.append(doc_id)
+            else:
+                observer.post(f'/observer/review/{doc_id}', data={'action': 'approve'})
+        for role, client in clients.items():
+            reload_size, reload_queries = _reload(client, counter, RELOADS[role])
+            feed_size, feed_queries, entries, cursors[role] = _catch_up(client, counter, cursors[role])
+            print(f'{len(batch):>8}  {role:<8}{reload_size / 1024:>11.1f}{reload_queries:>9}'
+                  f'{feed_size / 1024:>10.1f}{feed_queries:>9}{entries:>9}')
+
+    with app.app_context():
+        resubmitted = state_machine.DOCUMENTATION.apply_many('resubmit', rejected)
+        state_machine.COURSE.apply_many('resubmit', list({row.course_id for row in resubmitted}))
+        db.session.commit()
+        before = db.session.scalar(select(func.count(ChangeLogEntry.id)))
+        db.session.execute(update(ChangeLogEntry).values(
+            created_at=datetime.utcnow() - timedelta(days=changes.COMPACT_AFTER_DAYS + 1)))
+        db.session.commit()
+        removed = changes.compact()
+        print()
+        print(f'compaction: {before} entries, {removed} superseded removed, {before - removed} kept')
+
+
+if __name__ == '__main__':
+    main()
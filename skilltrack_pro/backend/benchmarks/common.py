@@ -0,0 +1,100 @@
+"""Shared setup for the benchmark scripts.
+
+Builds the Flask app against a throwaway SQLite database (or BENCH_DATABASE_URL)
+with a fake Supabase admin API, and counts the SQL statements each request runs.
+Import ``bootstrap`` before anything else from the backend package: the
+Supabase client reads its environment at import time.
+"""
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+# A syntactically valid placeholder; the benchmarks never talk to Supabase
+FAKE_SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark'
+
+
+class FakeSupabaseAdmin:
+    """In-memory stand-in for ``supabase.auth.admin`` with real pagination."""
+
+    def __init__(self, users=None):
+        self.users = list(users or [])
+        self.calls = 0
+
+    def list_users(self, page=1, per_page=50):
+        self.calls += 1
+        start = (page - 1) * per_page
+        return self.users[start:start + per_page]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        # (statement, parameters) pairs, skipping executemany batches
+        self.executed = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+        if not executemany:
+            self.executed.append((statement, parameters))
+
+    def reset(self):
+        self.count = 0
+        self.statements = []
+        self.executed = []
+
+
+def bootstrap(database_url=None):
+    """Create the app, its tables and a query counter; returns (app, counter)."""
+    if database_url is None:
+        database_url = os.environ.get('BENCH_DATABASE_URL')
+    if database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='skilltrack-bench-'), 'bench.sqlite')
+        database_url = f'sqlite:///{path}'
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+    os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', FAKE_SUPABASE_KEY)
+
+    from sqlalchemy import event
+    from ..app import app
+    from ..models import db
+    from .. import supabase_client
+
+    supabase_client.supabase.auth.admin = FakeSupabaseAdmin()
+    app.config['TESTING'] = True
+
+    counter = QueryCounter()
+    with app.app_context():
+        db.create_all()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+    return app, counter
+
+
+def login(client, user_id):
+    """Mark the test client's session as logged in, the way Flask-Login does."""
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def make_user(role, username=None):
+    from ..models import User
+    username = username or f'{role}-{uuid.uuid4().hex[:8]}'
+    user = User(username=username, email=f'{username}@example.com', role=role)
+    user.password_hash = 'benchmark'
+    return user
+
+
+@contextmanager
+def timed():
+    """Yield a dict whose 'seconds' key is filled in when the block exits."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
@@ -0,0 +1,81 @@
+"""Worker time spent per document download in each /documents download mode.
+
+    python -m skilltrack_pro.backend.benchmarks.document_download [--size-mb N] [--requests N]
+
+A worker stays occupied until the response body has been fully iterated, so
+the time to drain each response is what a gunicorn sync worker would spend.
+Here the client reads from memory; over a real network the Python paths hold
+the worker for as long as the client takes to download, while the offloaded
+modes (x-sendfile / x-accel) only ever return headers.
+"""
+import argparse
+import io
+import statistics
+import tempfile
+import time
+from .common import bootstrap, login, make_user
+
+
+def drain(client, url, headers=None):
+    start = time.perf_counter()
+    response = client.get(url, headers=headers or {}, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return time.perf_counter() - start, response.status_code, size
+
+
+def measure(client, url, requests, headers=None):
+    samples = [drain(client, url, headers) for _ in range(requests)]
+    times = [t for t, _, _ in samples]
+    return statistics.median(times) * 1000, samples[-1][1], samples[-1][2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    app, _ = bootstrap()
+    # Keep the benchmark blob out of the real upload root
+    app.config['UPLOAD_ROOT'] = tempfile.mkdtemp(prefix='skilltrack-bench-uploads-')
+    from ..models import Course, Documentation, db
+    from ..storage import store_upload
+
+    with app.test_request_context():
+        user = make_user('observer')
+        db.session.add(user)
+        db.session.flush()
+        course = Course(title='Benchmark course', user_id=user.id, status='In Review')
+        db.session.add(course)
+        db.session.flush()
+        payload = io.BytesIO(b'%PDF-1.4\n' + b'0' * (args.size_mb * 1024 * 1024))
+        content_hash, _, path = store_upload(payload, 'pdf', limit=(args.size_mb + 1) * 1024 * 1024)
+        doc = Documentation(course_id=course.id, file_path=path, content_hash=content_hash,
+                            original_filename='benchmark.pdf', status='Pending', revision_number=1)
+        db.session.add(doc)
+        db.session.commit()
+        user_id, doc_id = user.id, doc.id
+
+    client = app.test_client()
+    login(client, user_id)
+    download_url = f'/documents/{doc_id}/download'
+
+    app.config['DOCUMENT_SEND_MODE'] = 'python'
+    rows = [('download (python)', *measure(client, download_url, args.requests))]
+    rows.append(('download, Range 1MB', *measure(client, download_url, args.requests,
+                                                 {'Range': 'bytes=0-1048575'})))
+    rows.append(('download, If-None-Match', *measure(client, download_url, args.requests,
+                                                     {'If-None-Match': f'"{content_hash}"'})))
+    for mode in ('x-sendfile', 'x-accel'):
+        app.config['DOCUMENT_SEND_MODE'] = mode
+        rows.append((f'download ({mode})', *measure(client, download_url, args.requests)))
+
+    print(f'{args.size_mb} MB document, median of {args.requests} requests')
+    print(f'{"path":<26}{"worker ms":>12}{"status":>8}{"body bytes":>14}')
+    for name, ms, status, size in rows:
+        print(f'{name:<26}{ms:>12.2f}{status:>8}{size:>14}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Fail when a route's query scans a large table sequentially.
+
+    BENCH_DATABASE_URL=postgresql://... \\
+        python -m skilltrack_pro.backend.benchmarks.explain_plans [--courses N]
+
+Seeds a large dataset with seed.py, requests every page and API endpoint
+as the role that uses it, and EXPLAINs each SELECT those requests issued with
+the parameters they were issued with. The script exits with status 1 if any
+plan reads a large table with a filtered sequential scan that is not in
+ALLOWED_SCANS. Run it against Postgres (the planner that matters); without
+BENCH_DATABASE_URL it falls back to SQLite's EXPLAIN QUERY PLAN, which is a
+useful smoke test but not a substitute.
+
+The bundled database is created with create_all(); the migrations in
+migrations/versions declare the same indexes (`flask db check` verifies that).
+"""
+import argparse
+import json
+import re
+import sys
+from .common import bootstrap, login
+
+# Tables smaller than this are cheaper to scan than to index into
+LARGE_TABLE_ROWS = 5000
+
+# Endpoints that are meant to read (nearly) a whole table, with the tables they may scan
+ALLOWED_SCANS = {
+    'api.admin_courses': {'courses'},              # streams every course
+    'api.admin_stats': {'courses'},                # GROUP BY status over all courses
+    'admin.dashboard': {'courses'},
+    'api.observer_stats': {'documentation'},       # GROUP BY status over all documentation
+    'observer.dashboard': {'documentation'},       # lists every approved/rejected document
+    'observer.completed_reviews': {'documentation'},
+}
+
+
+def seed(app, courses, trainers, admins):
+    """Seed a realistic spread of data and return ids of representative rows."""
+    from ..seed import pick_sample, seed_database
+
+    with app.app_context():
+        seed_database(trainers, courses, admins=admins, observers=3, random_seed=42, search_index=False)
+        return pick_sample()
+
+
+def routes(sample):
+    """(role, url) pairs covering every GET page and API endpoint that reads the database."""
+    completed = sample['completed_course'] or sample['course']
+    return [
+        ('admin', '/admin/dashboard'),
+        ('admin', '/admin/trainers'),
+        ('admin', f"/admin/trainers/{sample['trainer_id']}/edit"),
+        ('admin', '/admin/courses/schedule'),
+        ('admin', '/admin/rejected_courses'),
+        ('admin', '/admin/approved_courses'),
+        ('admin', '/admin/feedback'),
+        ('admin', '/api/admin/stats'),
+        ('admin', '/api/admin/courses'),
+        ('admin', '/api/admin/calendar'),
+        ('admin', f"/api/admin/calendar?trainer_id={sample['trainer_id']}"),
+        ('admin', '/api/changes?since=0'),
+        ('trainer', '/trainer/dashboard'),
+        ('trainer', '/trainer/my_courses'),
+        ('trainer', '/trainer/course_requests'),
+        ('trainer', f"/trainer/upload_documentation/{sample['course']}"),
+        ('trainer', '/trainer/approvals_feedback'),
+        ('trainer', f"/trainer/feedback/{sample['course']}"),
+        ('trainer', '/trainer/completed_sessions'),
+        ('trainer', f'/trainer/completed_sessions/{completed}/report'),
+        ('trainer', '/api/trainer/stats'),
+        ('trainer', '/api/trainer/my-courses'),
+        ('trainer', '/api/trainer/calendar'),
+        ('trainer', '/api/changes?since=0'),
+        ('observer', '/api/search?q=course'),
+        ('observer', '/observer/dashboard'),
+        ('observer', f"/observer/review/{sample['doc']}"),
+        ('observer', '/observer/pending_reviews'),
+        ('observer', '/observer/completed_reviews'),
+        ('observer', '/api/observer/stats'),
+        ('observer', '/api/observer/pending-docs'),
+    ]
+
+
+def _postgres_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans, stack = [], [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        # An unfiltered Seq Scan feeding a hash join reads rows it needs anyway
+        if node['Node Type'] == 'Seq Scan' and 'Filter' in node:
+            scans.append(node['Relation Name'])
+        stack.extend(node.get('Plans', []))
+    return scans
+
+
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS (\w+))?$')
+
+
+def _sqlite_scans(conn, statement, parameters, aliases):
+    scans = []
+    for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+        match = _SQLITE_SCAN.match(row[-1])
+        if match:
+            scans.append(aliases.get(match.group(1), match.group(1)))
+    return scans
+
+
+def check(app, counter, sample):
+    from sqlalchemy import inspect
+    from ..models import db
+
+    clients = {}
+    for role in ('admin', 'trainer', 'observer'):
+        clients[role] = app.test_client()
+        login(clients[role], sample[role])
+
+    with app.app_context():
+        with db.engine.connect() as conn:
+            sizes = {name: conn.exec_driver_sql(f'SELECT COUNT(*) FROM {name}').scalar()
+                     for name in inspect(conn).get_table_names()}
+    large = {name for name, rows in sizes.items() if rows >= LARGE_TABLE_ROWS}
+    # SQLite reports the alias SQLAlchemy gave a table (courses_1 etc.)
+    aliases = {f'{name}_{n}': name for name in sizes for n in range(1, 5)}
+
+    failures, explained = [], 0
+    for role, url in routes(sample):
+        counter.reset()
+        endpoint = app.url_map.bind('').match(url.split('?')[0])[0]
+        try:
+            response = clients[role].get(url)
+            # Streamed bodies only run their query while being read
+            response.get_data()
+            status = response.status_code
+        except Exception as e:
+            # A template error after the queries ran still leaves plans to check
+            status = f'{type(e).__name__}: {e}'
+        if status != 200:
+            print(f'note: {url} -> {status}')
+        with app.app_context():
+            with db.engine.connect() as conn:
+                for statement, parameters in counter.executed:
+                    if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                        continue
+                    explained += 1
+                    if conn.dialect.name == 'postgresql':
+                        scans = _postgres_scans(conn, statement, parameters)
+                    else:
+                        scans = _sqlite_scans(conn, statement, parameters, aliases)
+                    for table in scans:
+                        if table in large and table not in ALLOWED_SCANS.get(endpoint, ()):
+                            failures.append((endpoint, url, f'sequential scan on {table}', statement))
+    return sizes, explained, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=20000)
+    parser.add_argument('--trainers', type=int, default=500)
+    parser.add_argument('--admins', type=int, default=5)
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+    sample = seed(app, args.courses, args.trainers, args.admins)
+    sizes, explained, failures = check(app, counter, sample)
+
+    with app.app_context():
+        from ..models import db
+        dialect = db.engine.dialect.name
+    print(f'{dialect}: ' + ', '.join(f'{name}={rows}' for name, rows in sorted(sizes.items()) if rows))
+    print(f'explained {explained} statements from {len(routes(sample))} routes')
+    for endpoint, url, problem, statement in failures:
+        print(f'FAIL {endpoint} ({url}): {problem}')
+        if statement:
+            print('    ' + ' '.join(statement.split())[:300])
+    if failures:
+        sys.exit(1)
+    print('OK: no sequential scans on large tables')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Peak memory of the streaming course export as the row count grows.
+
+    python -m skilltrack_pro.backend.benchmarks.export_memory [--sizes 1000,10000,100000,1000000]
+        [--formats csv,xlsx] [--naive]
+
+Seeds one database with the largest size (minute-spaced courses, a third
+of them assigned to trainers), then downloads /api/admin/exports/courses.*
+in a fresh process per size and format, filtered to the first N courses by
+date range. Each process reports its peak RSS and how far the request
+raised it above the peak reached while starting up (ru_maxrss is a
+high-water mark, so 0 means the export never outgrew the app itself).
+--naive adds a row that loads the same courses with Course.query.all() and
+builds the CSV in memory, the way a non-streaming export would.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+SEED_START = datetime(2030, 1, 1)
+SEED_BATCH = 20000
+
+
+def _rss_mib():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _course_id():
+    # The UUID columns have NUMERIC affinity on SQLite, which stores hex like
+    # '12e4...' (digits and at most one 'e') as a REAL; at a million rows a few
+    # ids hit that, so skip them
+    while True:
+        course_id = uuid.uuid4()
+        if any(c in 'abcdf' for c in course_id.hex):
+            return course_id
+
+
+def seed(database_url, rows):
+    from .common import bootstrap, make_user
+
+    app, _ = bootstrap(database_url)
+
+    from sqlalchemy import insert
+    from ..models import Course, Trainer, db
+
+    with app.app_context():
+        admin = make_user('admin')
+        trainer_users = [make_user('trainer') for _ in range(20)]
+        db.session.add_all([admin] + trainer_users)
+        db.session.flush()
+        trainers = [Trainer(name=u.username, user_id=u.id) for u in trainer_users]
+        db.session.add_all(trainers)
+        db.session.commit()
+        trainer_ids = [t.id for t in trainers]
+        for offset in range(0, rows, SEED_BATCH):
+            batch = []
+            for i in range(offset, min(offset + SEED_BATCH, rows)):
+                start = SEED_START + timedelta(minutes=i)
+                batch.append({
+                    'id': _course_id(), 'title': f'Export course {i}', 'description': None,
+                    'status': 'Approved', 'user_id': admin.id,
+                    'trainer_id': trainer_ids[i % 20] if i % 3 == 0 else None,
+                    'scheduled_time': start, 'duration_minutes': 1,
+                    'scheduled_end': start + timedelta(minutes=1),
+                })
+            db.session.execute(insert(Course.__table__), batch)
+            db.session.commit()
+        return admin.id
+
+
+def child(database_url, admin_id, rows, fmt):
+    from .common import bootstrap, login
+
+    app, counter = bootstrap(database_url)
+    end = SEED_START + timedelta(minutes=rows)
+    query = f'start={SEED_START:%Y-%m-%dT%H:%M}&end={end:%Y-%m-%dT%H:%M}'
+    before = _rss_mib()
+    started = time.perf_counter()
+    size = 0
+    if fmt == 'naive':
+        import csv
+        import io
+        from ..models import Course
+
+        with app.app_context():
+            out = io.StringIO()
+            writer = csv.writer(out)
+            courses = Course.query.filter(Course.scheduled_time >= SEED_START, Course.scheduled_time < end).all()
+            for course in courses:
+                writer.writerow([course.id, course.title, course.status, course.scheduled_time])
+            size = len(out.getvalue().encode())
+    else:
+        client = app.test_client()
+        login(client, admin_id)
+        response = client.get(f'/api/admin/exports/courses.{fmt}?{query}', buffered=False)
+        for chunk in response.response:
+            size += len(chunk)
+        response.close()
+    peak = _rss_mib()
+    print(json.dumps({'peak_mib': peak, 'growth_mib': peak - before, 'seconds': time.perf_counter() - started,
+                      'bytes': size, 'statements': counter.count}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--formats', default='csv,xlsx')
+    parser.add_argument('--naive', action='store_true')
+    parser.add_argument('--child', nargs=4, metavar=('URL', 'ADMIN', 'ROWS', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        url, admin_id, rows, fmt = args.child
+        child(url, admin_id, int(rows), fmt)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    formats = args.formats.split(',') + (['naive'] if args.naive else [])
+    url = os.environ.get('BENCH_DATABASE_URL') or \
+        f'sqlite:///{os.path.join(tempfile.mkdtemp(prefix="skilltrack-export-"), "bench.sqlite")}'
+    started = time.perf_counter()
+    admin_id = seed(url, max(sizes))
+    print(f'seeded {max(sizes)} courses in {time.perf_counter() - started:.1f}s')
+
+    print(f'{"rows":>9} {"format":<6} {"peak RSS":>10} {"growth":>10} {"seconds":>8} {"size":>10} {"stmts":>6}')
+    for rows in sizes:
+        for fmt in formats:
+            result = subprocess.run(
+                [sys.executable, '-m', __spec__.name, '--child', url, str(admin_id), str(rows), fmt],
+                capture_output=True, text=True, check=True,
+            )
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f'{rows:>9} {fmt:<6} {stats["peak_mib"]:>7.1f} MiB {stats["growth_mib"]:>6.1f} MiB '
+                  f'{stats["seconds"]:>8.2f} {stats["bytes"] / 2**20:>6.1f} MiB {stats["statements"]:>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Cost of keeping dashboards current: polling reloads versus pushed events.
+
+    python -m skilltrack_pro.backend.benchmarks.live_updates [--scale small|medium|production] [--streams 10,100,1000]
+
+Before: a dashboard only learns about a status change by reloading, i.e.
+requesting the page and the API calls its script makes. For each dashboard
+the script reports the bytes and SQL statements of one such refresh.
+
+After: one observer review is pushed to every open /api/events stream. The
+script reports the size of the frame each dashboard receives and the SQL
+statements the streams ran to produce it.
+
+It then opens N idle streams, each iterated on its own thread as a gunicorn
+gthread worker would. It reports the resident memory each stream adds, and
+the delay from commit to the frame arriving on every stream.
+"""
+import argparse
+import statistics
+import threading
+import time
+from .common import bootstrap, login
+
+REFRESHES = {
+    'admin': ('/admin/dashboard', '/api/admin/stats', '/api/admin/courses'),
+    'observer': ('/observer/dashboard', '/api/observer/stats', '/api/observer/pending-docs'),
+    'trainer': ('/trainer/dashboard', '/api/trainer/stats', '/api/trainer/my-courses'),
+}
+EVENTS_PER_RUN = 50
+
+
+def _rss_kib():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _refresh_costs(app, counter, sample):
+    print(f'{"dashboard refresh (before)":<28}{"requests":>9}{"KiB":>9}{"queries":>9}')
+    for role, urls in REFRESHES.items():
+        client = app.test_client()
+        login(client, sample[role])
+        for url in urls:
+            client.get(url)  # warm caches, as a repeat refresh would find them
+        counter.reset()
+        size = sum(len(client.get(url).get_data()) for url in urls)
+        print(f'{role:<28}{len(urls):>9}{size / 1024:>9.1f}{counter.count:>9}')
+
+
+def _read_stream(app, user_id, frames, ready):
+    client = app.test_client()
+    login(client, user_id)
+    response = client.get('/api/events', buffered=False)
+    ready.release()
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith('id: '):
+            frames.append((time.perf_counter(), chunk))
+
+
+def _pushed_review(app, counter, sample, doc_id):
+    frames = {role: [] for role in REFRESHES}
+    ready = threading.Semaphore(0)
+    for role in REFRESHES:
+        threading.Thread(target=_read_stream, args=(app, sample[role], frames[role], ready), daemon=True).start()
+    for _ in REFRESHES:
+        ready.acquire()
+    client = app.test_client()
+    login(client, sample['observer'])
+    client.post(f'/observer/review/{doc_id}', data={'action': 'approve'})
+    counter.reset()
+    time.sleep(0.5)
+    print(f'{"pushed review (after)":<28}{"frames":>9}{"bytes":>9}{"queries":>9}')
+    for role, received in frames.items():
+        size = sum(len(frame.encode()) for _, frame in received)
+        print(f'{role:<28}{len(received):>9}{size:>9}{counter.count:>9}')
+
+
+def _fan_out(app, streams):
+    from .. import events
+
+    broker = app.extensions['events']
+    audience = events.Audience('admin')
+    arrivals = [[] for _ in range(streams)]
+
+    def consume(body, received):
+        for chunk in body:
+            if chunk.startswith('id: '):
+                received.append(time.perf_counter())
+
+    rss_before = _rss_kib()
+    for received in arrivals:
+        body = events.stream(broker, audience)
+        threading.Thread(target=consume, args=(body, received), daemon=True).start()
+    while broker.subscriber_count() < streams:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    rss_per_stream = (_rss_kib() - rss_before) / streams
+
+    sent = []
+    for i in range(EVENTS_PER_RUN):
+        sent.append(time.perf_counter())
+        broker.committed([{
+            'type': 'course', 'id': str(i), 'title': 'Benchmark', 'status': 'Approved', 'previous_status': 'In Review',
+            'trainer_id': None, 'previous_trainer_id': None, 'trainer_name': None,
+        }])
+        time.sleep(0.01)
+    deadline = time.time() + 30
+    while any(len(received) < EVENTS_PER_RUN for received in arrivals) and time.time() < deadline:
+        time.sleep(0.05)
+
+    delays = sorted((received[i] - sent[i]) * 1000 for received in arrivals for i in range(len(received)))
+    delivered = len(delays) / (streams * EVENTS_PER_RUN)
+    p99 = delays[int(len(delays) * 0.99) - 1] if delays else float('nan')
+    print(f'{streams:>8}{rss_per_stream:>14.1f}{delivered:>11.0%}'
+          f'{statistics.median(delays) if delays else float("nan"):>10.2f}{p99:>10.2f}')
+    # A resync ends every stream, so the next run starts from none
+    broker.deliver({'type': 'resync'})
+    while broker.subscriber_count():
+        time.sleep(0.01)
+
+
+def main():
+    from ..seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--streams', default='10,100,1000')
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from ..seed import pick_sample, seed_database
+    from ..queries import pending_documentation_query
+
+    with app.app_context():
+        seed_database(**SCALES[args.scale], random_seed=42, search_index=False)
+        sample = pick_sample()
+        doc_id = pending_documentation_query().first().id
+
+    _refresh_costs(app, counter, sample)
+    print()
+    _pushed_review(app, counter, sample, doc_id)
+    app.extensions['events'].deliver({'type': 'resync'})
+    print()
+    print(f'{"streams":>8}{"KiB/stream":>14}{"delivered":>11}{"p50 ms":>10}{"p99 ms":>10}')
+    for streams in (int(n) for n in args.streams.split(',')):
+        _fan_out(app, streams)
+
+
+if __name__ == '__main__':
+    main()
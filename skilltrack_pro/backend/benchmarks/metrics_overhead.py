@@ -0,0 +1,78 @@
+"""Per-request cost of the metrics middleware, disabled vs. enabled.
+
+    python -m skilltrack_pro.backend.benchmarks.metrics_overhead [--requests N]
+
+The middleware is installed (or not) when the app is imported, so each mode
+runs in its own interpreter. Reports the median request time and the SQL
+statements per request seen by the benchmark's own counter.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from .common import bootstrap, login, make_user
+
+ROUTES = ['/trainer/dashboard', '/trainer/my_courses', '/api/trainer/stats', '/api/trainer/my-courses']
+
+
+def measure(requests):
+    app, counter = bootstrap()
+    from ..models import Course, Trainer, db
+
+    with app.app_context():
+        user = make_user('trainer')
+        db.session.add(user)
+        db.session.flush()
+        trainer = Trainer(name=user.username, user_id=user.id)
+        db.session.add(trainer)
+        db.session.flush()
+        db.session.add_all([Course(title=f'Course {i}', description='Metrics overhead', status='Approved',
+                                   user_id=user.id, trainer_id=trainer.id) for i in range(50)])
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    login(client, user_id)
+    for route in ROUTES:
+        client.get(route)  # warm caches and templates
+    counter.reset()
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        client.get(ROUTES[i % len(ROUTES)]).get_data()
+        samples.append(time.perf_counter() - start)
+    return {'median_ms': statistics.median(samples) * 1000, 'queries': counter.count / requests,
+            'metrics_route': client.get('/metrics').status_code}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.requests)))
+        return
+
+    results = {}
+    for mode in ('disabled', 'enabled'):
+        env = dict(os.environ, METRICS_ENABLED='1' if mode == 'enabled' else '0')
+        output = subprocess.run(
+            [sys.executable, '-m', __spec__.name, '--child', '--requests', str(args.requests)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f'{"mode":<10}{"median ms":>11}{"queries/req":>13}{"/metrics":>10}')
+    for mode, r in results.items():
+        print(f'{mode:<10}{r["median_ms"]:>11.3f}{r["queries"]:>13.2f}{r["metrics_route"]:>10}')
+    overhead = results['enabled']['median_ms'] - results['disabled']['median_ms']
+    print(f'enabled adds {overhead * 1000:.0f} us per request')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Response size and render time of the HTML pages on seeded data.
+
+    python -m skilltrack_pro.backend.benchmarks.page_render [--scale small|medium|production] [--iterations N]
+
+Requests every GET page of the admin, trainer and observer blueprints (and
+the login page) as the role that uses it. For each it reports the body
+size, how much of it is inline <style>, the median request time, the median
+time spent inside render_template and the SQL statements per request. The
+first request warms every cache, so the medians are steady-state repeat
+views with unchanged data.
+
+It then times loading every template compiled from source, and, when a
+Jinja bytecode cache is configured, loading them as a restarted worker
+would: with the in-memory template cache empty and the bytecode on disk.
+"""
+import argparse
+import re
+import statistics
+import time
+from .common import bootstrap, login
+from .routes import discover_routes
+
+_STYLE = re.compile(rb'<style[^>]*>(.*?)</style>', re.S)
+
+
+class RenderTimer:
+    """Time spent in outermost render_template calls, via Flask's template signals."""
+
+    def __init__(self, app):
+        from flask import before_render_template, template_rendered
+
+        self.seconds = 0.0
+        self._depth = 0
+        self._started = None
+        before_render_template.connect(self._before, app)
+        template_rendered.connect(self._after, app)
+
+    def _before(self, sender, **extra):
+        if self._depth == 0:
+            self._started = time.perf_counter()
+        self._depth += 1
+
+    def _after(self, sender, **extra):
+        self._depth -= 1
+        if self._depth == 0:
+            self.seconds += time.perf_counter() - self._started
+
+    def reset(self):
+        self.seconds = 0.0
+
+
+def _load_all_templates(env):
+    env.cache.clear()
+    started = time.perf_counter()
+    names = [name for name in env.list_templates() if name.endswith('.html')]
+    for name in names:
+        env.get_template(name)
+    return len(names), time.perf_counter() - started
+
+
+def main():
+    from ..seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from ..seed import fake_auth_users, pick_sample, seed_database
+    from .. import supabase_client
+
+    with app.app_context():
+        seed_database(**SCALES[args.scale], random_seed=42, search_index=False)
+        sample = pick_sample()
+        supabase_client.supabase.auth.admin.users = fake_auth_users()
+
+    clients = {None: app.test_client()}
+    for role in ('admin', 'trainer', 'observer'):
+        clients[role] = app.test_client()
+        login(clients[role], sample[role])
+    pages = [route for route in discover_routes(app, sample) if not route[0].startswith('api.')]
+    pages.insert(0, ('auth.login', None, '/login'))
+
+    timer = RenderTimer(app)
+    total_bytes = total_style = 0
+    print(f'{"page":<36}{"status":>7}{"KiB":>8}{"style KiB":>11}{"ms":>8}{"render ms":>11}{"queries":>9}')
+    for endpoint, role, url in pages:
+        client = clients[role]
+        try:
+            client.get(url)
+        except Exception as e:
+            print(f'{endpoint:<36}{type(e).__name__:>7}')
+            continue
+        request_ms, render_ms = [], []
+        for _ in range(args.iterations):
+            counter.reset()
+            timer.reset()
+            started = time.perf_counter()
+            response = client.get(url)
+            body = response.get_data()
+            request_ms.append((time.perf_counter() - started) * 1000)
+            render_ms.append(timer.seconds * 1000)
+        style = sum(len(match) for match in _STYLE.findall(body))
+        total_bytes += len(body)
+        total_style += style
+        print(f'{endpoint:<36}{response.status_code:>7}{len(body) / 1024:>8.1f}{style / 1024:>11.1f}'
+              f'{statistics.median(request_ms):>8.2f}{statistics.median(render_ms):>11.2f}{counter.count:>9}')
+    print(f'{"total":<36}{"":>7}{total_bytes / 1024:>8.1f}{total_style / 1024:>11.1f}')
+
+    env = app.jinja_env
+    cache = env.bytecode_cache
+    env.bytecode_cache = None
+    count, source = _load_all_templates(env)
+    line = f'load {count} templates: {source * 1000:.1f} ms compiling from source'
+    if cache is not None:
+        env.bytecode_cache = cache
+        _load_all_templates(env)  # make sure every template is in the bytecode cache
+        _, cached = _load_all_templates(env)
+        line += f', {cached * 1000:.1f} ms from {type(cache).__name__} after a restart'
+    print(line)
+
+
+if __name__ == '__main__':
+    main()
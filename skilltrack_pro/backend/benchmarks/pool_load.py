@@ -0,0 +1,120 @@
+"""Connection pool behaviour as concurrent workers outgrow the pool.
+
+    python -m skilltrack_pro.backend.benchmarks.pool_load \\
+        [--pool-size N] [--max-overflow N] [--pool-timeout S] [--latency-ms MS] [--requests N]
+
+Threads play the part of gunicorn worker threads, each repeatedly requesting
+database-backed API routes. For every concurrency level the script reports
+throughput, request latency and the pool metrics collected by db_pool
+(checkout wait, peak connections in use, overflow, timeouts). --latency-ms
+adds a simulated network round trip to every statement, which is what makes
+connections scarce against a remote Supabase database; with
+BENCH_DATABASE_URL the real round trip applies on top.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from .common import bootstrap, login, make_user
+
+ROUTES = ['/api/trainer/my-courses', '/api/observer/pending-docs', '/api/admin/courses', '/api/search?q=course']
+
+
+def worker(app, user_id, deadline, requests, latencies, errors):
+    client = app.test_client()
+    login(client, user_id)
+    i = 0
+    while i < requests and time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = client.get(ROUTES[i % len(ROUTES)])
+            response.get_data()
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except Exception as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def run(app, user_id, workers, requests, timeout):
+    from ..db_pool import pool_metrics
+    from ..models import db
+
+    pool_metrics.reset()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + timeout
+    threads = [threading.Thread(target=worker, args=(app, user_id, deadline, requests, latencies, errors))
+               for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        metrics = pool_metrics.snapshot(db.engine.pool)
+    ordered = sorted(latencies)
+    return {
+        'workers': workers,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[int(len(ordered) * 0.95) - 1] * 1000,
+        'errors': len(errors),
+        **metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-overflow', type=int, default=2)
+    parser.add_argument('--pool-timeout', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--requests', type=int, default=100, help='requests per worker')
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    args = parser.parse_args()
+
+    # The engine is built when the app is imported, so size it through the environment
+    os.environ['DB_POOL_SIZE'] = str(args.pool_size)
+    os.environ['DB_MAX_OVERFLOW'] = str(args.max_overflow)
+    os.environ['DB_POOL_TIMEOUT'] = str(args.pool_timeout)
+    app, _ = bootstrap()
+
+    from sqlalchemy import event
+    from ..models import Course, Trainer, db
+
+    with app.app_context():
+        user = make_user('trainer')
+        db.session.add(user)
+        db.session.flush()
+        trainer = Trainer(name=user.username, user_id=user.id)
+        db.session.add(trainer)
+        db.session.flush()
+        db.session.add_all([Course(title=f'Course {i}', description='Load test', status='Approved',
+                                   user_id=user.id, trainer_id=trainer.id) for i in range(200)])
+        db.session.commit()
+        user_id = user.id
+        if args.latency_ms:
+            delay = args.latency_ms / 1000
+
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def simulated_round_trip(*_):
+                time.sleep(delay)
+
+    capacity = args.pool_size + args.max_overflow
+    levels = args.workers or sorted({1, args.pool_size, capacity, capacity * 2, capacity * 4})
+    print(f'pool_size={args.pool_size} max_overflow={args.max_overflow} timeout={args.pool_timeout}s '
+          f'latency={args.latency_ms}ms, {args.requests} requests per worker')
+    print(f'{"workers":>8}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"wait avg":>10}{"wait max":>10}'
+          f'{"peak use":>10}{"overflow":>10}{"timeouts":>10}{"errors":>8}')
+    for workers in levels:
+        r = run(app, user_id, workers, args.requests, timeout=120)
+        print(f'{r["workers"]:>8}{r["rps"]:>9.1f}{r["p50_ms"]:>9.1f}{r["p95_ms"]:>9.1f}'
+              f'{r["wait_ms_avg"]:>10.2f}{r["wait_ms_max"]:>10.1f}{r["peak_in_use"]:>10}'
+              f'{r["peak_overflow"]:>10}{r["timeouts"]:>10}{r["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
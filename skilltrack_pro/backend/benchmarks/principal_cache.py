@@ -0,0 +1,58 @@
+"""Queries per authenticated request with and without the principal cache.
+
+    python -m skilltrack_pro.backend.benchmarks.principal_cache [--requests N]
+
+The "legacy" run restores the old user loader (User lookup by primary key,
+followed by the Trainer lookup in every trainer route); the "cached" run uses
+principal.load_principal.
+"""
+import argparse
+import uuid
+from .common import bootstrap, login, make_user
+
+ROUTES = ['/trainer/dashboard', '/trainer/my_courses', '/api/trainer/stats', '/api/trainer/my-courses']
+
+
+def run(app, counter, user_id, requests):
+    client = app.test_client()
+    login(client, user_id)
+    client.get(ROUTES[0])  # warm up: creates the Trainer row and seeds the caches
+    counter.reset()
+    for i in range(requests):
+        client.get(ROUTES[i % len(ROUTES)])
+    return counter.count / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+    from ..models import User, db
+    from .. import principal
+
+    with app.app_context():
+        user = make_user('trainer')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    cached_loader = app.login_manager._user_callback
+
+    def legacy_loader(raw_id):
+        return db.session.get(User, uuid.UUID(raw_id))
+
+    app.login_manager._user_callback = legacy_loader
+    legacy = run(app, counter, user_id, args.requests)
+    app.login_manager._user_callback = cached_loader
+    cached = run(app, counter, user_id, args.requests)
+
+    print(f'{"mode":<10}{"queries/request":>18}')
+    print(f'{"legacy":<10}{legacy:>18.2f}')
+    print(f'{"cached":<10}{cached:>18.2f}')
+    print(f'removed {legacy - cached:.2f} queries per request; cache {principal.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Reviewer throughput and duplicate decisions with concurrent observers.
+
+    python -m skilltrack_pro.backend.benchmarks.review_queue [--observers 1,2,4,8] [--target 80] [--review-ms 20]
+
+Every observer runs on its own thread with its own session. An observer
+opens a document, spends --review-ms on it, then approves it. Each run
+stops once --target distinct documents are decided, and the documents are
+reset to pending before the next run. Three ways of picking work are
+compared:
+
+  shared list     (before) every observer picks from the oldest pending
+                  documents, and the decision is a plain read-modify-write
+  shared+guarded  the same list, but decisions go through review_queue.settle;
+                  a losing observer's review is wasted instead of duplicated
+  claim queue     (after) observers lease batches with SKIP LOCKED and
+                  decide only what they hold
+
+Under SQLite the claim statement runs without FOR UPDATE; the single
+UPDATE ... WHERE id IN (SELECT ...) is what keeps claims disjoint there.
+Set BENCH_DATABASE_URL to run the same script against Postgres.
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import datetime
+from .common import bootstrap, make_user
+
+# Oldest pending documents an observer chooses from in the shared list
+SHARED_PAGE = 10
+RUN_TIMEOUT_SECONDS = 120
+
+
+class Tally:
+    def __init__(self, target):
+        self.target = target
+        self.lock = threading.Lock()
+        self.decisions = []
+        self.wasted = 0
+
+    def decided(self, doc_id):
+        with self.lock:
+            self.decisions.append(doc_id)
+
+    def waste(self):
+        with self.lock:
+            self.wasted += 1
+
+    def done(self):
+        with self.lock:
+            return len(set(self.decisions)) >= self.target
+
+
+def _shared_pick():
+    from ..queries import pending_documentation_query
+
+    page = pending_documentation_query().limit(SHARED_PAGE).all()
+    return random.choice(page) if page else None
+
+
+def _shared(observer_id, tally, review_seconds, guarded):
+    from .. import review_queue
+    from ..models import db
+
+    while not tally.done():
+        doc = _shared_pick()
+        if doc is None:
+            return
+        db.session.commit()  # end the read; the observer is now looking at the document
+        time.sleep(review_seconds)
+        if guarded:
+            if not review_queue.settle(doc.id, observer_id, 'approve', values={'approved_at': datetime.utcnow()}):
+                db.session.rollback()
+                tally.waste()
+                continue
+        else:
+            doc.status = 'Approved'
+            doc.approved_at = datetime.utcnow()
+        db.session.commit()
+        tally.decided(doc.id)
+
+
+def _claimed(observer_id, tally, review_seconds):
+    from .. import review_queue
+    from ..models import Documentation, db
+
+    while not tally.done():
+        claimed = review_queue.claim_reviews(observer_id)
+        if not claimed:
+            return
+        for doc_id in claimed:
+            db.session.get(Documentation, doc_id)
+            db.session.commit()
+            time.sleep(review_seconds)
+            if not review_queue.settle(doc_id, observer_id, 'approve', values={'approved_at': datetime.utcnow()}):
+                db.session.rollback()
+                tally.waste()
+                continue
+            db.session.commit()
+            tally.decided(doc_id)
+
+
+def _run(app, mode, observer_ids, target, review_seconds):
+    tally = Tally(target)
+
+    def observer(observer_id):
+        with app.app_context():
+            if mode == 'claim queue':
+                _claimed(observer_id, tally, review_seconds)
+            else:
+                _shared(observer_id, tally, review_seconds, guarded=mode == 'shared+guarded')
+
+    threads = [threading.Thread(target=observer, args=(observer_id,)) for observer_id in observer_ids]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(RUN_TIMEOUT_SECONDS)
+    return tally, time.perf_counter() - started
+
+
+def _reset(app, doc_ids):
+    from sqlalchemy import update
+    from ..models import Documentation, db
+
+    with app.app_context():
+        if doc_ids:
+            db.session.execute(update(Documentation).where(Documentation.id.in_(doc_ids))
+                               .values(status='Pending', approved_at=None))
+        db.session.execute(update(Documentation).where(Documentation.claimed_by.isnot(None))
+                           .values(claimed_by=None, claim_expires_at=None))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--observers', default='1,2,4,8')
+    parser.add_argument('--target', type=int, default=80)
+    parser.add_argument('--review-ms', type=int, default=20)
+    args = parser.parse_args()
+    counts = [int(n) for n in args.observers.split(',')]
+
+    app, _ = bootstrap()
+
+    from ..seed import SCALES, seed_database
+    from ..models import db
+    from ..queries import pending_documentation_query
+
+    with app.app_context():
+        seed_database(**SCALES['small'], random_seed=42, search_index=False)
+        observers = [make_user('observer') for _ in range(max(counts))]
+        db.session.add_all(observers)
+        db.session.commit()
+        observer_ids = [user.id for user in observers]
+        pending = pending_documentation_query().count()
+    target = min(args.target, pending)
+    print(f'{pending} pending documents; {target} decided per run, {args.review_ms} ms per review')
+    print(f'{"mode":<18}{"observers":>10}{"docs/s":>9}{"decisions":>11}{"duplicates":>12}{"wasted":>8}')
+
+    random.seed(42)
+    for mode in ('shared list', 'shared+guarded', 'claim queue'):
+        for count in counts:
+            tally, seconds = _run(app, mode, observer_ids[:count], target, args.review_ms / 1000)
+            distinct = set(tally.decisions)
+            print(f'{mode:<18}{count:>10}{len(distinct) / seconds:>9.1f}{len(tally.decisions):>11}'
+                  f'{len(tally.decisions) - len(distinct):>12}{tally.wasted:>8}')
+            _reset(app, distinct)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Latency, query count and memory of every page and API route on seeded data.
+
+    python -m skilltrack_pro.backend.benchmarks.routes [--scale small|medium|production]
+        [--iterations N] [--save NAME] [--compare NAME] [--no-seed]
+
+Seeds the database with seed.py (BENCH_DATABASE_URL for a local Postgres,
+otherwise a throwaway SQLite file), then requests every GET route of the
+admin, trainer, observer and api blueprints as the role that uses it, with
+Supabase stubbed. For each route it reports p50/p95/p99 latency over
+--iterations requests, SQL statements per request and the peak memory
+allocated while serving one request (measured in a separate tracemalloc
+pass, so tracing does not inflate the timings).
+
+--save NAME writes the results to baselines/NAME.json; --compare NAME reads
+one back and exits with status 1 if any route's p95 grew by more than
+--threshold or it started issuing more queries. Baselines are machine-local:
+compare runs from the same machine and database.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from .common import bootstrap, login
+
+BLUEPRINTS = ('admin', 'trainer', 'observer', 'api')
+# Role that uses each api endpoint, by endpoint name prefix
+API_ROLES = (('api.admin_', 'admin'), ('api.trainer_', 'trainer'), ('api.observer_', 'observer'),
+             ('api.search', 'observer'))
+# Sample row filling each URL parameter; (endpoint, argument) entries take precedence
+URL_PARAMS = {
+    'id': 'trainer_id',
+    'doc_id': 'doc',
+    'course_id': 'course',
+    ('trainer.session_report', 'course_id'): 'completed_course',
+}
+QUERY_STRINGS = {'api.search': 'q=python'}
+# Responses that stay open until the client disconnects; reading their body never returns
+STREAMING_ENDPOINTS = {'api.event_stream'}
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+# Latency changes smaller than this are noise whatever the percentage
+NOISE_FLOOR_MS = 2.0
+
+
+def discover_routes(app, sample):
+    """(endpoint, role, url) for every GET route of BLUEPRINTS, except STREAMING_ENDPOINTS."""
+    found = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        blueprint = rule.endpoint.split('.')[0]
+        if blueprint not in BLUEPRINTS or 'GET' not in rule.methods or rule.endpoint in STREAMING_ENDPOINTS:
+            continue
+        if blueprint == 'api':
+            role = next((r for prefix, r in API_ROLES if rule.endpoint.startswith(prefix)), 'admin')
+        else:
+            role = blueprint
+        values = {}
+        for argument in rule.arguments:
+            key = URL_PARAMS.get((rule.endpoint, argument), URL_PARAMS.get(argument))
+            values[argument] = sample.get(key) or sample['course']
+        url = app.url_map.bind('').build(rule.endpoint, values)
+        if rule.endpoint in QUERY_STRINGS:
+            url += '?' + QUERY_STRINGS[rule.endpoint]
+        found.append((rule.endpoint, role, url))
+    return found
+
+
+def _request(client, url):
+    """Status of a GET with its body fully read, or the exception's name."""
+    try:
+        response = client.get(url)
+        response.get_data()
+        return response.status_code
+    except Exception as e:
+        return type(e).__name__
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def measure(counter, routes, clients, iterations):
+    results = {}
+    for endpoint, role, url in routes:
+        client = clients[role]
+        _request(client, url)  # warm caches and compiled statements
+        timings, queries, statuses = [], [], set()
+        for _ in range(iterations):
+            counter.reset()
+            start = time.perf_counter()
+            statuses.add(_request(client, url))
+            timings.append((time.perf_counter() - start) * 1000)
+            queries.append(counter.count)
+        timings.sort()
+        results[endpoint] = {
+            'url': url,
+            'role': role,
+            'status': sorted(map(str, statuses)),
+            'p50_ms': round(_percentile(timings, 50), 3),
+            'p95_ms': round(_percentile(timings, 95), 3),
+            'p99_ms': round(_percentile(timings, 99), 3),
+            'queries': max(queries),
+        }
+
+    tracemalloc.start()
+    try:
+        for endpoint, role, url in routes:
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            _request(clients[role], url)
+            results[endpoint]['peak_kib'] = round((tracemalloc.get_traced_memory()[1] - current) / 1024, 1)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Lines describing regressions of ``results`` against ``baseline``."""
+    problems = []
+    for endpoint, old in baseline['routes'].items():
+        new = results.get(endpoint)
+        if new is None:
+            continue
+        growth = new['p95_ms'] - old['p95_ms']
+        if growth > NOISE_FLOOR_MS and new['p95_ms'] > old['p95_ms'] * (1 + threshold):
+            problems.append(f"{endpoint}: p95 {old['p95_ms']:.1f} -> {new['p95_ms']:.1f} ms")
+        if new['queries'] > old['queries']:
+            problems.append(f"{endpoint}: queries {old['queries']} -> {new['queries']}")
+    return problems
+
+
+def main():
+    from ..seed import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--no-seed', action='store_true', help='benchmark the data already in BENCH_DATABASE_URL')
+    parser.add_argument('--save', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative p95 growth')
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from ..models import db
+    from ..seed import fake_auth_users, pick_sample, seed_database
+    from .. import supabase_client
+
+    with app.app_context():
+        counts = None
+        if not args.no_seed:
+            started = time.perf_counter()
+            counts = seed_database(**SCALES[args.scale], random_seed=args.random_seed)
+            print('seeded ' + ', '.join(f'{n} {table}' for table, n in counts.items())
+                  + f' in {time.perf_counter() - started:.1f}s')
+        try:
+            sample = pick_sample()
+        except AttributeError:
+            sys.exit('No courses with a trainer in the database; drop --no-seed')
+        # The directory sync sees exactly the trainers it already mirrors
+        supabase_client.supabase.auth.admin.users = fake_auth_users()
+        dialect = db.engine.dialect.name
+
+    clients = {}
+    for role in ('admin', 'trainer', 'observer'):
+        clients[role] = app.test_client()
+        login(clients[role], sample[role])
+
+    routes = discover_routes(app, sample)
+    results = measure(counter, routes, clients, args.iterations)
+
+    print(f'{dialect}, {args.iterations} requests per route')
+    print(f'{"endpoint":<34}{"status":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}{"peak KiB":>10}')
+    for endpoint, r in results.items():
+        print(f'{endpoint:<34}{",".join(r["status"]):>8}{r["p50_ms"]:>9.1f}{r["p95_ms"]:>9.1f}'
+              f'{r["p99_ms"]:>9.1f}{r["queries"]:>9}{r["peak_kib"]:>10.0f}')
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save}.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'dialect': dialect,
+                'scale': None if args.no_seed else args.scale,
+                'seeded': counts,
+                'python': platform.python_version(),
+                'iterations': args.iterations,
+                'routes': results,
+            }, f, indent=2)
+        print(f'saved {path}')
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f'{args.compare}.json')) as f:
+            baseline = json.load(f)
+        if baseline['dialect'] != dialect:
+            print(f"warning: baseline ran on {baseline['dialect']}, this run on {dialect}")
+        problems = compare(results, baseline, args.threshold)
+        for line in problems:
+            print(f'REGRESSION {line}')
+        if problems:
+            sys.exit(1)
+        print(f'OK: no regressions against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Round trips and races of status changes: ORM read-modify-write versus state_machine.
+
+    python -m skilltrack_pro.backend.benchmarks.state_transitions [--threads 8] [--batch 50]
+
+Before: a route loads the rows, checks and assigns status in Python, and
+the session flushes the UPDATEs. After: state_machine applies each
+transition as UPDATE ... WHERE status = :expected RETURNING.
+
+Three measurements:
+
+  round trips  SQL statements (commit excluded) and time for one observer
+               approval, which moves a document and its course
+  contention   --threads threads approve the same pending document at
+               once; "winners" is how many believed their decision landed
+  batch        approving --batch In Review courses with one apply_many()
+               versus one apply() per course
+
+Under SQLite the database lock serialises the writers, but every thread
+has read Pending before any of them writes, so the ORM flow still decides
+one document several times. Set BENCH_DATABASE_URL to run the same script
+against Postgres.
+"""
+import argparse
+import threading
+from datetime import datetime
+from .common import bootstrap, make_user, timed
+
+ROUNDS = 20
+
+
+def _orm_approve(doc_id):
+    from ..models import db
+    from ..queries import documentation_with_course
+
+    doc = documentation_with_course(doc_id)
+    if doc.status != 'Pending':
+        return False
+    doc.status = 'Approved'
+    doc.approved_at = datetime.utcnow()
+    doc.revision_number = (doc.revision_number or 0) + 1
+    doc.course.status = 'Approved'
+    db.session.flush()
+    return True
+
+
+def _cas_approve(doc_id, observer_id):
+    from sqlalchemy import func
+    from .. import review_queue, state_machine
+    from ..models import Course, Documentation
+
+    doc = review_queue.settle(
+        doc_id, observer_id, 'approve',
+        values={'approved_at': datetime.utcnow(),
+                'revision_number': func.coalesce(Documentation.revision_number, 0) + 1},
+    )
+    if doc is None:
+        return False
+    state_machine.COURSE.apply('approve', doc.course_id, returning=(Course.title, Course.trainer_id))
+    return True
+
+
+def _reset(doc_ids, course_ids=()):
+    from sqlalchemy import update
+    from ..models import Course, Documentation, db
+
+    db.session.execute(update(Documentation).where(Documentation.id.in_(doc_ids))
+                       .values(status='Pending', approved_at=None))
+    if course_ids:
+        db.session.execute(update(Course).where(Course.id.in_(course_ids)).values(status='In Review'))
+    db.session.commit()
+
+
+def _round_trips(counter, docs, observer_id):
+    from ..models import db
+
+    print(f'{"round trips":<24}{"statements":>11}{"ms":>8}')
+    doc_ids = [doc_id for doc_id, _ in docs]
+    course_ids = [course_id for _, course_id in docs]
+    for label, approve in (('ORM (before)', _orm_approve),
+                           ('state_machine (after)', lambda doc_id: _cas_approve(doc_id, observer_id))):
+        statements, seconds = 0, 0.0
+        for doc_id in doc_ids:
+            db.session.expire_all()
+            counter.reset()
+            with timed() as t:
+                approve(doc_id)
+            statements += counter.count
+            seconds += t['seconds']
+            db.session.commit()
+        print(f'{label:<24}{statements / len(doc_ids):>11.1f}{seconds / len(doc_ids) * 1000:>8.2f}')
+        _reset(doc_ids, course_ids)
+
+
+def _contention(app, docs, observer_ids):
+    from ..models import Documentation, db
+
+    print(f'{"contention":<24}{"threads":>8}{"docs":>6}{"winners":>9}{"errors":>8}')
+    for label, cas in (('ORM (before)', False), ('state_machine (after)', True)):
+        winners, errors, lock = [], [], threading.Lock()
+        for doc_id, _ in docs:
+            barrier = threading.Barrier(len(observer_ids))
+
+            def observer(observer_id):
+                with app.app_context():
+                    try:
+                        db.session.get(Documentation, doc_id)  # the page the observer looked at
+                        barrier.wait()
+                        won = _cas_approve(doc_id, observer_id) if cas else _orm_approve(doc_id)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        with lock:
+                            errors.append(doc_id)
+                        return
+                    if won:
+                        with lock:
+                            winners.append(doc_id)
+
+            threads = [threading.Thread(target=observer, args=(observer_id,)) for observer_id in observer_ids]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        print(f'{label:<24}{len(observer_ids):>8}{len(docs):>6}{len(winners):>9}{len(errors):>8}')
+        with app.app_context():
+            _reset([doc_id for doc_id, _ in docs], [course_id for _, course_id in docs])
+
+
+def _batch(counter, owner_id, course_ids):
+    from .. import state_machine
+    from ..models import Course, db
+
+    print(f'{"batch approve":<24}{"courses":>8}{"statements":>11}{"ms":>8}')
+    for label, many in (('apply() per course', False), ('apply_many()', True)):
+        counter.reset()
+        with timed() as t:
+            if many:
+                moved = state_machine.COURSE.apply_many('schedule', course_ids, Course.user_id == owner_id)
+            else:
+                moved = [row for course_id in course_ids
+                         if (row := state_machine.COURSE.apply('schedule', course_id, Course.user_id == owner_id))]
+        print(f'{label:<24}{len(moved):>8}{counter.count:>11}{t["seconds"] * 1000:>8.2f}')
+        db.session.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+
+    app, counter = bootstrap()
+
+    from sqlalchemy import func, select
+    from ..seed import SCALES, seed_database
+    from ..models import Course, Documentation, db
+    from ..queries import pending_documentation_query
+
+    with app.app_context():
+        seed_database(**SCALES['small'], random_seed=42, search_index=False)
+        observers = [make_user('observer') for _ in range(args.threads)]
+        db.session.add_all(observers)
+        db.session.commit()
+        observer_ids = [user.id for user in observers]
+        docs = [(doc.id, doc.course_id) for doc in pending_documentation_query()
+                .join(Documentation.course).filter(Course.status == 'In Review').limit(ROUNDS)]
+        owner_id = db.session.scalar(
+            select(Course.user_id).where(Course.status == 'In Review')
+            .group_by(Course.user_id).order_by(func.count().desc()).limit(1)
+        )
+        batch = db.session.scalars(select(Course.id).where(Course.status == 'In Review', Course.user_id == owner_id)
+                                   .limit(args.batch)).all()
+
+        _round_trips(counter, docs, observer_ids[0])
+        print()
+    _contention(app, docs, observer_ids)
+    print()
+    with app.app_context():
+        _batch(counter, owner_id, batch)
+
+
+if __name__ == '__main__':
+    main()
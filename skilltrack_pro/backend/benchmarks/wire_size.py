@@ -0,0 +1,104 @@
+"""Bytes on the wire and requests per dashboard load, with and without compression and fingerprinting.
+
+    python -m skilltrack_pro.backend.benchmarks.wire_size [--scale small|medium|production]
+
+Loads each role's dashboard the way a browser would: the page, then every
+stylesheet and script it links. A repeat visit reuses cached assets.
+Assets served with a max-age are not requested again. Assets without one
+are revalidated with a conditional request (a 304 with no body, but still a
+round trip). Bodies are counted as sent, i.e. compressed when the response
+is. Each configuration runs in its own process, because compression and
+fingerprinting are set up when the app is created.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import zlib
+
+PAGES = (('admin', '/admin/dashboard'), ('observer', '/observer/dashboard'), ('trainer', '/trainer/dashboard'),
+         ('admin', '/admin/approved_courses'))
+CONFIGS = (
+    ('before: no compression, plain static URLs', {'COMPRESS_RESPONSES': 'false', 'STATIC_FINGERPRINT': 'false'}),
+    ('after: compression + fingerprinted static', {'COMPRESS_RESPONSES': 'true', 'STATIC_FINGERPRINT': 'true'}),
+)
+_ASSET = re.compile(r'<(?:link[^>]+href|script[^>]+src)="(/static/[^"]+)"')
+
+
+def _cached_by_browser(response):
+    return (response.cache_control.max_age or 0) > 0
+
+
+def _decoded(response):
+    """Body text of a possibly compressed test response."""
+    data = response.get_data()
+    if response.content_encoding == 'gzip':
+        data = zlib.decompress(data, 31)
+    elif response.content_encoding == 'br':
+        import brotli
+        data = brotli.decompress(data)
+    return data.decode()
+
+
+def child(scale):
+    from .common import bootstrap, login
+
+    app, _ = bootstrap()
+
+    from ..seed import SCALES, pick_sample, seed_database
+
+    with app.app_context():
+        seed_database(**SCALES[scale], random_seed=42, search_index=False)
+        sample = pick_sample()
+    headers = {'Accept-Encoding': 'br, gzip'}
+    results = []
+    for role, url in PAGES:
+        client = app.test_client()
+        login(client, sample[role])
+        page = client.get(url, headers=headers)
+        asset_urls = _ASSET.findall(_decoded(page))
+        assets = [client.get(asset_url, headers=headers) for asset_url in asset_urls]
+        first_bytes = len(page.get_data()) + sum(len(asset.get_data()) for asset in assets)
+
+        repeat_requests, repeat_bytes = 1, len(client.get(url, headers=headers).get_data())
+        for asset_url, asset in zip(asset_urls, assets):
+            if _cached_by_browser(asset):
+                continue
+            revalidated = client.get(asset_url, headers={**headers, 'If-None-Match': asset.headers.get('ETag', ''),
+                                                        'If-Modified-Since': asset.headers.get('Last-Modified', '')})
+            repeat_requests += 1
+            repeat_bytes += len(revalidated.get_data())
+        results.append({
+            'page': url, 'encoding': page.content_encoding or 'identity',
+            'html_bytes': len(page.get_data()), 'html_raw_bytes': len(_decoded(page).encode()),
+            'first_requests': 1 + len(assets), 'first_bytes': first_bytes,
+            'repeat_requests': repeat_requests, 'repeat_bytes': repeat_bytes,
+        })
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='small')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.scale)
+        return
+
+    for label, env in CONFIGS:
+        result = subprocess.run([sys.executable, '-m', __spec__.name, '--child', '--scale', args.scale],
+                                env={**os.environ, **env}, capture_output=True, text=True, check=True)
+        print(label)
+        print(f'  {"page":<26}{"encoding":>9}{"HTML KiB":>10}{"(raw)":>8}'
+              f'{"first: reqs":>13}{"KiB":>8}{"repeat: reqs":>14}{"KiB":>8}')
+        for r in json.loads(result.stdout.strip().splitlines()[-1]):
+            print(f'  {r["page"]:<26}{r["encoding"]:>9}{r["html_bytes"] / 1024:>10.1f}{r["html_raw_bytes"] / 1024:>8.1f}'
+                  f'{r["first_requests"]:>13}{r["first_bytes"] / 1024:>8.1f}'
+                  f'{r["repeat_requests"]:>14}{r["repeat_bytes"] / 1024:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
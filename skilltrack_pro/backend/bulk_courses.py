@@ -0,0 +1,378 @@
+"""Bulk course import and bulk scheduling from CSV, JSON or NDJSON files.
+
+Rows are validated one at a time as they are read, and the valid ones are
+written with executemany every IMPORT_BATCH_SIZE rows, so a 10k-row file
+costs a few dozen statements instead of tens of thousands. Invalid rows are
+skipped and listed in the report. Everything runs in one transaction: a file
+that turns out to be unreadable halfway leaves the database untouched.
+"""
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import insert, select, update
+from .models import Course, Trainer, User, db
+from .search import index_new_entities
+from .scheduling import load_indexes, session_end, validate_duration
+from . import changes, course_stats, data_version, events, state_machine
+
+# Rows written per executemany (and course ids looked up per IN list)
+IMPORT_BATCH_SIZE = 1000
+# Row errors listed in a report; the count beyond this is still reported
+MAX_REPORTED_ERRORS = 500
+TITLE_MAX_LENGTH = 200
+
+FORMATS = {'csv': 'csv', 'json': 'json', 'ndjson': 'ndjson', 'jsonl': 'ndjson'}
+MIMETYPES = {'text/csv': 'csv', 'application/json': 'json', 'application/x-ndjson': 'ndjson'}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be read (unknown format, malformed JSON, bad encoding)."""
+
+
+class BulkReport:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def error(self, row, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        # Schedule errors found during a batch lookup arrive after later rows' errors
+        self.errors.sort(key=lambda error: error['row'])
+        return self
+
+    def to_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'errors_truncated': self.rejected > len(self.errors),
+            'seconds': round(self.seconds or 0, 3),
+            'rows_per_second': round(self.rows / self.seconds) if self.seconds else None,
+        }
+
+
+def detect_format(filename=None, mimetype=None, requested=None):
+    """'csv', 'json' or 'ndjson' from an explicit choice, the file extension or the mimetype."""
+    if requested:
+        fmt = FORMATS.get(requested.lower())
+    elif filename and '.' in filename:
+        fmt = FORMATS.get(filename.rsplit('.', 1)[1].lower())
+    else:
+        fmt = MIMETYPES.get(mimetype)
+    if fmt is None:
+        raise ImportFormatError('Upload a .csv, .json or .ndjson file')
+    return fmt
+
+
+def read_rows(stream, fmt):
+    """Yield (row_number, row) from a binary stream; JSON arrays are parsed whole, the rest streamed.
+
+    Row numbers count data rows from 1 (the CSV header is not a row). A row
+    that is not an object is yielded as None so it can be reported.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    number = 0
+    try:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, row
+        elif fmt == 'ndjson':
+            for line in text:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield number, row if isinstance(row, dict) else None
+        else:
+            try:
+                data = json.load(text)
+            except ValueError as e:
+                raise ImportFormatError(f'Invalid JSON: {e}')
+            if not isinstance(data, list):
+                raise ImportFormatError('A JSON import must be an array of objects')
+            for number, row in enumerate(data, start=1):
+                yield number, row if isinstance(row, dict) else None
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFormatError(f'Unreadable file after row {number}: {e}')
+
+
+def parse_schedule_time(value):
+    """Naive UTC datetime from ISO 8601 text ('2025-03-01 09:30', '2025-03-01T09:30:00Z', ...)."""
+    stamp = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return stamp
+
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _trainer_lookup():
+    """Trainer ids by their own id and by the lower-cased email of their account."""
+    by_key = {}
+    for trainer_id, email in db.session.execute(select(Trainer.id, User.email).join(User, Trainer.user_id == User.id)):
+        by_key[str(trainer_id)] = trainer_id
+        if email:
+            by_key[email.lower()] = trainer_id
+    return by_key
+
+
+def _course_values(row, trainers):
+    """Column values for one import row, or (None, error message)."""
+    if row is None:
+        return None, 'Row is not an object'
+    title = _text(row, 'title')
+    if not title:
+        return None, 'Title is required'
+    if len(title) > TITLE_MAX_LENGTH:
+        return None, f'Title is longer than {TITLE_MAX_LENGTH} characters'
+    values = {'title': title, 'description': _text(row, 'description'), 'trainer_id': None,
+              'scheduled_time': None, 'scheduled_end': None}
+
+    trainer = _text(row, 'trainer_id') or _text(row, 'trainer_email')
+    if trainer:
+        values['trainer_id'] = trainers.get(trainer.lower())
+        if values['trainer_id'] is None:
+            return None, f'Unknown trainer {trainer}'
+    scheduled = _text(row, 'scheduled_time')
+    if scheduled:
+        try:
+            values['scheduled_time'] = parse_schedule_time(scheduled)
+        except ValueError:
+            return None, f'Invalid scheduled_time {scheduled!r}; use YYYY-MM-DD HH:MM'
+    try:
+        values['duration_minutes'] = validate_duration(_text(row, 'duration_minutes'))
+    except ValueError as e:
+        return None, str(e)
+    values['scheduled_end'] = session_end(values['scheduled_time'], values['duration_minutes'])
+    return values, None
+
+
+def _reject_conflicts(sessions, report):
+    """Report sessions that double-book their trainer; returns the row numbers rejected.
+
+    ``sessions`` are (row_number, course_id, trainer_id, start, end) tuples.
+    They are checked in file order against the trainers' stored sessions and
+    against the earlier accepted rows of the batch. Earlier batches are
+    already written, so the lookup sees them.
+
+    The stored slots of the batch's own courses are left out, since those
+    courses are moving, so a row may take a slot another row of the same
+    batch vacates. A course whose row is rejected keeps its stored slot; the
+    batch is then checked again with that slot back in place, until a pass
+    rejects no further rows.
+    """
+    sessions = [session for session in sessions if session[2] is not None and session[3] is not None]
+    if not sessions:
+        return set()
+    indexes = load_indexes({session[2] for session in sessions},
+                           min(session[3] for session in sessions), max(session[4] for session in sessions))
+    stored = {}
+    moving = {session[1] for session in sessions}
+    for trainer_id, index in indexes.items():
+        for start, end, course_id in index.remove(moving):
+            stored[course_id] = (trainer_id, start, end)
+
+    rejected = {}
+    while True:
+        trial = {trainer_id: index.copy() for trainer_id, index in indexes.items()}
+        for course_id in {session[1] for session in sessions if session[0] in rejected} & stored.keys():
+            trainer_id, start, end = stored[course_id]
+            trial[trainer_id].add(start, end, course_id)
+        newly_rejected = False
+        for number, course_id, trainer_id, start, end in sessions:
+            if number in rejected:
+                continue
+            if trial[trainer_id].overlapping(start, end, ignore_key=course_id):
+                rejected[number] = f'Trainer is already booked between {start:%Y-%m-%d %H:%M} and {end:%H:%M}'
+                newly_rejected = True
+            else:
+                trial[trainer_id].add(start, end, course_id)
+        if not newly_rejected:
+            break
+    for number in sorted(rejected):
+        report.error(number, rejected[number])
+    return set(rejected)
+
+
+def import_courses(rows, owner_id, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """Create a 'Requested' course owned by ``owner_id`` for every valid row.
+
+    ``rows`` yields (row_number, row) pairs as produced by read_rows. Columns:
+    title (required), description, trainer_id or trainer_email,
+    scheduled_time and duration_minutes. Rows that would double-book their
+    trainer are rejected. New courses are added to the search index in the
+    same batches. Returns a BulkReport; nothing is written when ``dry_run``.
+    """
+    report = BulkReport(dry_run)
+    trainers = _trainer_lookup()
+    batch = []
+
+    def flush():
+        rejected = _reject_conflicts([(number, values['id'], values['trainer_id'], values['scheduled_time'],
+                                       values['scheduled_end']) for number, values in batch], report)
+        accepted = [values for number, values in batch if number not in rejected]
+        report.accepted += len(accepted)
+        if accepted and not dry_run:
+            # Core insert: the ORM variant splits a batch wherever a row has a None value
+            db.session.execute(insert(Course.__table__), accepted)
+            changes.record(changes.COURSE, changes.CREATED,
+                           [(values['id'], values['id'], values['status']) for values in accepted])
+            index_new_entities('course', [(values['id'], values['title'], values['description'])
+                                          for values in accepted])
+        batch.clear()
+
+    try:
+        for number, row in rows:
+            report.rows += 1
+            values, error = _course_values(row, trainers)
+            if error:
+                report.error(number, error)
+                continue
+            values.update(id=uuid.uuid4(), user_id=owner_id, status='Requested')
+            batch.append((number, values))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    _commit(report)
+    return report.finish()
+
+
+def schedule_courses(rows, owner_id, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """Assign time slots to many of ``owner_id``'s 'In Review' courses and approve them.
+
+    Each row needs course_id and scheduled_time; duration_minutes is
+    optional and defaults to the course's current duration. Rows naming an
+    unknown course, a course of another admin, a course that is not In
+    Review, a course already listed earlier in the file or a slot that would
+    double-book the trainer are reported and skipped. Courses are looked up
+    batch by batch, approved with one state_machine UPDATE per batch and
+    given their slots with executemany.
+
+    Within a batch of ``batch_size`` rows, courses can swap or shift slots:
+    a row may take a slot that another row of the batch moves its course
+    out of (see _reject_conflicts). Batches are written in file order, so a
+    slot vacated by a later batch is still taken while an earlier one is
+    checked.
+    """
+    report = BulkReport(dry_run)
+    seen = set()
+    pending = []
+
+    def flush():
+        courses = {row.id: row for row in db.session.execute(
+            select(Course.id, Course.status, Course.trainer_id, Course.duration_minutes)
+            .where(Course.id.in_([course_id for _, course_id, _, _ in pending]), Course.user_id == owner_id)
+        )}
+        sessions = []
+        for number, course_id, scheduled_time, duration in pending:
+            course = courses.get(course_id)
+            if course is None:
+                report.error(number, f'Course {course_id} not found')
+            elif course.status != 'In Review':
+                report.error(number, f'Course {course_id} is {course.status}, not In Review')
+            else:
+                duration = duration or course.duration_minutes
+                sessions.append((number, course_id, course.trainer_id, scheduled_time,
+                                 session_end(scheduled_time, duration), duration))
+        rejected = _reject_conflicts([session[:5] for session in sessions], report)
+        updates = [(number, {'id': course_id, 'scheduled_time': start, 'scheduled_end': end,
+                             'duration_minutes': duration})
+                   for number, course_id, _, start, end, duration in sessions if number not in rejected]
+        if updates and not dry_run:
+            # One compare-and-set UPDATE approves the batch; a course moved since the lookup is skipped
+            approved = {row.id for row in state_machine.COURSE.apply_many(
+                'schedule', [values['id'] for _, values in updates], Course.user_id == owner_id)}
+            for number, values in updates:
+                if values['id'] not in approved:
+                    report.error(number, f"Course {values['id']} left In Review during the import")
+            updates = [(number, values) for number, values in updates if values['id'] in approved]
+            if updates:
+                # Vacate the old slots first: the exclusion constraint is checked row by row, so a
+                # course taking a slot that a later row of the executemany vacates would collide
+                db.session.execute(
+                    update(Course).where(Course.id.in_([values['id'] for _, values in updates]))
+                    .values(scheduled_time=None, scheduled_end=None),
+                    execution_options={'synchronize_session': False},
+                )
+                db.session.execute(update(Course), [values for _, values in updates])
+        report.accepted += len(updates)
+        pending.clear()
+
+    try:
+        for number, row in rows:
+            report.rows += 1
+            if row is None:
+                report.error(number, 'Row is not an object')
+                continue
+            raw_id, raw_time = _text(row, 'course_id'), _text(row, 'scheduled_time')
+            if not raw_id or not raw_time:
+                report.error(number, 'course_id and scheduled_time are required')
+                continue
+            try:
+                course_id = uuid.UUID(raw_id)
+            except ValueError:
+                report.error(number, f'Invalid course_id {raw_id!r}')
+                continue
+            try:
+                scheduled_time = parse_schedule_time(raw_time)
+            except ValueError:
+                report.error(number, f'Invalid scheduled_time {raw_time!r}; use YYYY-MM-DD HH:MM')
+                continue
+            raw_duration = _text(row, 'duration_minutes')
+            try:
+                duration = validate_duration(raw_duration) if raw_duration else None
+            except ValueError as e:
+                report.error(number, str(e))
+                continue
+            if course_id in seen:
+                report.error(number, f'Course {course_id} is listed more than once')
+                continue
+            seen.add(course_id)
+            pending.append((number, course_id, scheduled_time, duration))
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    _commit(report)
+    return report.finish()
+
+
+def _commit(report):
+    if report.dry_run or not report.accepted:
+        db.session.rollback()
+        return
+    data_version.bump(data_version.COURSES)
+    events.courses_reloaded()
+    db.session.commit()
+    course_stats.invalidate()
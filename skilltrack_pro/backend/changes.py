@@ -0,0 +1,142 @@
+"""Append-only change log behind /api/changes.
+
+Every course or documentation row that is created or takes a
+state_machine transition gets an entry, written in the transaction that
+makes the change. A client keeps the cursor of the last entry it saw and
+asks for what happened since, instead of reloading whole lists.
+
+Entries are queued on the session and inserted from before_commit, right
+after bumping the CHANGES data version. That UPDATE holds the version
+row's lock until commit, so transactions write their entries one at a
+time and ids become visible in increasing order. A reader that has seen
+cursor N will never later find a committed entry below N.
+
+compact() keeps the log bounded. Entries older than COMPACT_AFTER_DAYS
+are dropped unless they are the newest for their entity, which leaves
+about one entry per course and document plus the recent history. A
+client holding any old cursor still learns the latest status of
+everything that changed since.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, event, exists, func, insert, or_, select
+from sqlalchemy.orm import aliased
+from . import data_version
+from .models import ChangeLogEntry, Course, db
+
+COURSE = 'course'
+DOCUMENTATION = 'documentation'
+CREATED = 'created'
+
+# Entries per /api/changes response; clients follow has_more for the rest
+PAGE_SIZE = 500
+# Superseded entries older than this are removed by compact()
+COMPACT_AFTER_DAYS = 30
+# Ids examined per DELETE (and transaction) while compacting
+COMPACT_BATCH = 5000
+
+_SESSION_KEY = 'pending_changes'
+
+
+def record(entity_type, action, entries):
+    """Queue one entry per (entity_id, course_id, status) in the caller's transaction."""
+    session = db.session()
+    if not session.in_transaction():
+        # Tie the entries to a transaction, so even a rollback before any query drops them
+        session.begin()
+    session.info.setdefault(_SESSION_KEY, []).extend(
+        {'entity_type': entity_type, 'entity_id': entity_id, 'course_id': course_id,
+         'action': action, 'status': status}
+        for entity_id, course_id, status in entries
+    )
+
+
+def course_created(course):
+    record(COURSE, CREATED, [(course.id, course.id, course.status)])
+
+
+def documentation_created(doc):
+    record(DOCUMENTATION, CREATED, [(doc.id, doc.course_id, doc.status)])
+
+
+def head():
+    """Cursor of the newest committed entry, 0 for an empty log."""
+    return db.session.scalar(select(func.coalesce(func.max(ChangeLogEntry.id), 0)))
+
+
+def since(cursor, limit=PAGE_SIZE, trainer_id=None):
+    """Return (entries after ``cursor`` oldest first, next cursor, has_more).
+
+    With ``trainer_id`` only entries of that trainer's courses and of open,
+    unassigned requests are returned (the course_stats rule), plus every
+    accept, so a trainer's client can drop requests someone else took. The
+    next cursor skips past filtered-out entries. It never passes the head read
+    before the query, so nothing committed later can be skipped.
+    """
+    upper = head()
+    query = (
+        select(ChangeLogEntry)
+        .where(ChangeLogEntry.id > cursor, ChangeLogEntry.id <= upper)
+        .order_by(ChangeLogEntry.id)
+        .limit(limit)
+    )
+    if trainer_id is not None:
+        query = query.join(Course, Course.id == ChangeLogEntry.course_id).where(or_(
+            Course.trainer_id == trainer_id,
+            and_(Course.trainer_id.is_(None), Course.status == 'Requested'),
+            and_(ChangeLogEntry.entity_type == COURSE, ChangeLogEntry.action == 'accept'),
+        ))
+    entries = db.session.scalars(query).all()
+    has_more = len(entries) == limit
+    return entries, entries[-1].id if has_more else max(upper, cursor), has_more
+
+
+def compact(older_than_days=COMPACT_AFTER_DAYS, batch=COMPACT_BATCH):
+    """Delete entries older than ``older_than_days`` that a newer entry of the same entity supersedes.
+
+    Walks the ids in windows of ``batch``, committing after each, so no
+    transaction holds many row locks. Returns the number of entries removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    first, last = db.session.execute(
+        select(func.min(ChangeLogEntry.id), func.max(ChangeLogEntry.id)).where(ChangeLogEntry.created_at < cutoff)
+    ).one()
+    if last is None:
+        return 0
+    newer = aliased(ChangeLogEntry)
+    superseded = exists().where(
+        newer.entity_type == ChangeLogEntry.entity_type,
+        newer.entity_id == ChangeLogEntry.entity_id,
+        newer.id > ChangeLogEntry.id,
+    )
+    removed = 0
+    for start in range(first, last + 1, batch):
+        result = db.session.execute(
+            delete(ChangeLogEntry)
+            .where(ChangeLogEntry.id.between(start, min(start + batch - 1, last)), superseded),
+            execution_options={'synchronize_session': False},
+        )
+        db.session.commit()
+        removed += result.rowcount
+    return removed
+
+
+def _before_commit(session):
+    entries = session.info.pop(_SESSION_KEY, None)
+    if not entries:
+        return
+    data_version.bump(data_version.CHANGES)
+    now = datetime.utcnow()
+    # Core insert: the ORM variant splits a batch wherever a row has a None value
+    session.execute(insert(ChangeLogEntry.__table__), [dict(entry, created_at=now) for entry in entries])
+
+
+def _after_transaction_end(session, transaction):
+    # Still queued when the outermost transaction ends: it was rolled back
+    if transaction.parent is None:
+        session.info.pop(_SESSION_KEY, None)
+
+
+def init_app(app):
+    """Write queued change-log entries when sessions commit."""
+    event.listen(db.session, 'before_commit', _before_commit)
+    event.listen(db.session, 'after_transaction_end', _after_transaction_end)
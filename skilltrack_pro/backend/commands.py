@@ -0,0 +1,104 @@
+import os
+import click
+from sqlalchemy import make_url
+from .trainer_directory import sync_trainer_directory
+from .feedback_rollups import rebuild_rollups, check_rollups
+from .storage import import_legacy_upload, collect_orphan_blobs
+from .models import Documentation, User, db
+from .jobs import run_worker
+from .search import rebuild_index
+from .seed import SCALES, seed_database
+from .changes import COMPACT_AFTER_DAYS, compact
+
+
+def _seeding_allowed():
+    """True for a database without users, or the benchmark database named by BENCH_DATABASE_URL."""
+    bench_url = os.environ.get('BENCH_DATABASE_URL')
+    if bench_url and make_url(bench_url) == db.engine.url:
+        return True
+    return db.session.query(User.id).first() is None
+
+
+def register_commands(app):
+    """Attach the maintenance commands to ``flask``."""
+
+    @app.cli.command('sync-trainers')
+    def sync_trainers_command():
+        """Mirror Supabase trainer accounts into the local directory."""
+        result = sync_trainer_directory()
+        click.echo(f"Trainer directory synced: {result['added']} added, "
+                   f"{result['updated']} updated, {result['removed']} removed")
+
+    @app.cli.command('rebuild-feedback-rollups')
+    def rebuild_feedback_rollups_command():
+        """Recompute the feedback summary tables from the feedback rows."""
+        rebuild_rollups()
+        click.echo('Feedback rollups rebuilt')
+
+    @app.cli.command('check-feedback-rollups')
+    def check_feedback_rollups_command():
+        """Compare the feedback summary tables against the feedback rows."""
+        mismatches = check_rollups()
+        for row in mismatches:
+            click.echo(f"{row['table']} {row['key']}: expected {row['expected']}, found {row['actual']}")
+        if mismatches:
+            raise SystemExit(1)
+        click.echo('Feedback rollups are consistent')
+
+    @app.cli.command('import-legacy-uploads')
+    def import_legacy_uploads_command():
+        """Move per-course uploads into the content-addressed blob store."""
+        migrated = 0
+        for doc in Documentation.query.filter(Documentation.content_hash.is_(None)):
+            if import_legacy_upload(doc):
+                migrated += 1
+        db.session.commit()
+        click.echo(f'{migrated} documents now point at shared blobs')
+
+    @app.cli.command('collect-orphan-blobs')
+    def collect_orphan_blobs_command():
+        """Delete blob files that no document references any more."""
+        click.echo(f'{collect_orphan_blobs()} orphaned blob files removed')
+
+    @app.cli.command('process-documents')
+    @click.option('--processes', type=int, default=None, help='Worker processes (default: CPU count).')
+    @click.option('--once', is_flag=True, help='Exit when the queue is empty.')
+    def process_documents_command(processes, once):
+        """Run the background worker for uploaded documentation."""
+        handled = run_worker(processes=processes, once=once)
+        click.echo(f'{handled} document jobs processed')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Re-index all courses, trainers and extracted document text."""
+        click.echo(f'{rebuild_index()} search documents indexed')
+
+    @app.cli.command('compact-change-log')
+    @click.option('--older-than-days', type=int, default=COMPACT_AFTER_DAYS, show_default=True,
+                  help='Only compact entries older than this.')
+    def compact_change_log_command(older_than_days):
+        """Drop change-log entries superseded by a newer entry of the same course or document."""
+        click.echo(f'{compact(older_than_days)} change-log entries removed')
+
+    @app.cli.command('seed')
+    @click.option('--scale', type=click.Choice(list(SCALES)), default='small', show_default=True)
+    @click.option('--trainers', type=int, default=None, help='Override the preset trainer count.')
+    @click.option('--courses', type=int, default=None, help='Override the preset course count.')
+    @click.option('--random-seed', type=int, default=None, help='Make the generated data reproducible.')
+    @click.option('--skip-search-index', is_flag=True, help='Leave the search index alone (much faster).')
+    @click.option('--yes', is_flag=True, help='Seed a database that already has users.')
+    def seed_command(scale, trainers, courses, random_seed, skip_search_index, yes):
+        """Fill the database with synthetic users, courses, documentation and feedback."""
+        if not yes and not _seeding_allowed():
+            raise click.ClickException(
+                f'{db.engine.url.render_as_string()} already has users. Seed it anyway with --yes, '
+                'or point DATABASE_URL at an empty database or BENCH_DATABASE_URL.'
+            )
+        options = dict(SCALES[scale])
+        if trainers is not None:
+            options['trainers'] = trainers
+        if courses is not None:
+            options['courses'] = courses
+        counts = seed_database(**options, random_seed=random_seed, search_index=not skip_search_index,
+                               progress=click.echo)
+        click.echo('Seeded ' + ', '.join(f'{count} {table}' for table, count in counts.items()))
@@ -0,0 +1,111 @@
+"""gzip / brotli compression of responses, negotiated with Accept-Encoding.
+
+Buffered bodies are compressed in one go once they reach COMPRESS_MIN_BYTES.
+Streamed bodies (JSON lists, exports) are compressed chunk by chunk, with a
+flush after each chunk so rows still reach the client as they are produced.
+Brotli is used when the optional ``brotli`` package is installed and the
+client accepts it; otherwise gzip. File downloads passed straight through to
+the server (send_file, X-Sendfile) and event streams are left alone.
+"""
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this gain less from compression than they cost in CPU and headers
+COMPRESS_MIN_BYTES = 500
+GZIP_LEVEL = 6
+# Brotli quality 5 compresses better than gzip -6 at similar speed; 11 is too slow per request
+BROTLI_QUALITY = 5
+
+# Text formats; images, PDFs and office documents are compressed already
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript', 'text/xml',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'application/xml',
+    'image/svg+xml',
+}
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b''):
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data=b''):
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+ENCODERS = {'br': _Brotli, 'gzip': _Gzip}
+
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' or None for a request's parsed Accept-Encoding header."""
+    best, best_quality = None, 0
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _streamed(original, body, encoder):
+    try:
+        for data in body:
+            if data:
+                yield encoder.chunk(data)
+        yield encoder.finish()
+    finally:
+        # Release what the original stream holds (e.g. its database connection)
+        if hasattr(original, 'close'):
+            original.close()
+
+
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        original = response.response
+        response.response = _streamed(original, response.iter_encoded(), ENCODERS[encoding]())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+        response.set_data(ENCODERS[encoding]().finish(data))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes are a different representation of the same content
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Register the compression hook if COMPRESS_RESPONSES is set."""
+    if app.config.get('COMPRESS_RESPONSES'):
+        app.after_request(compress_response)
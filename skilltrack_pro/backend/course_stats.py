@@ -0,0 +1,76 @@
+import threading
+import time
+from sqlalchemy import func, or_, and_
+from .models import Course, db
+
+# Course statuses shown on the dashboards, mapped to their JSON/template keys
+STATUS_KEYS = {
+    'Requested': 'requested',
+    'In Review': 'in_review',
+    'Approved': 'approved',
+    'Rejected': 'rejected',
+    'Completed': 'completed',
+}
+
+CACHE_TTL_SECONDS = 30
+
+_cache = {}
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _count_by_status(trainer_id=None):
+    """Run a single GROUP BY status query, optionally scoped to a trainer."""
+    query = db.session.query(Course.status, func.count(Course.id))
+    if trainer_id is not None:
+        # Trainers also see unassigned course requests they could pick up
+        query = query.filter(or_(
+            Course.trainer_id == trainer_id,
+            and_(Course.trainer_id == None, Course.status == 'Requested')
+        ))
+    counts = {key: 0 for key in STATUS_KEYS.values()}
+    for status, count in query.group_by(Course.status):
+        key = STATUS_KEYS.get(status)
+        if key:
+            counts[key] = count
+    return counts
+
+
+def get_course_counts(trainer_id=None):
+    """Return course counts per status for the admin (all courses) or one trainer.
+
+    Results are cached in-process for CACHE_TTL_SECONDS; status transitions
+    call invalidate() so the next dashboard view sees fresh numbers.
+    """
+    global _hits, _misses
+    key = ('trainer', str(trainer_id)) if trainer_id is not None else ('admin',)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now:
+            _hits += 1
+            return dict(entry[1])
+        _misses += 1
+
+    counts = _count_by_status(trainer_id)
+    with _lock:
+        _cache[key] = (now + CACHE_TTL_SECONDS, counts)
+    return dict(counts)
+
+
+def invalidate():
+    """Drop every cached count; call after a course status changes."""
+    with _lock:
+        _cache.clear()
+
+
+def cache_info():
+    """Hit/miss counters for the stats cache."""
+    with _lock:
+        return {
+            'hits': _hits,
+            'misses': _misses,
+            'entries': len(_cache),
+            'ttl_seconds': CACHE_TTL_SECONDS,
+        }
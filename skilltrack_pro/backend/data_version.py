@@ -0,0 +1,90 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import request, make_response
+from flask_login import current_user
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from .models import DataVersion, db
+
+# Scopes bumped by the blueprints whenever the matching rows change
+COURSES = 'courses'
+DOCUMENTATION = 'documentation'
+TRAINERS = 'trainers'
+# Bumped by principal.invalidate_principal; workers drop principals loaded before it
+USERS = 'users'
+# Bumped by changes.py before each change-log write; the row lock orders the entries
+CHANGES = 'changes'
+
+
+def bump(*scopes):
+    """Increment the version of each scope inside the caller's transaction.
+
+    Call before db.session.commit() so the stamp changes atomically with the
+    data it describes.
+    """
+    now = datetime.utcnow()
+    for scope in scopes:
+        result = db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.key == scope)
+            .values(version=DataVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(DataVersion(key=scope, version=1, updated_at=now))
+        except IntegrityError:
+            # Another transaction created the row first; bump that one instead
+            db.session.execute(
+                update(DataVersion)
+                .where(DataVersion.key == scope)
+                .values(version=DataVersion.version + 1, updated_at=now)
+            )
+
+
+def current(*scopes):
+    """Return (token, last_modified) for the given scopes with one primary-key query."""
+    rows = db.session.query(DataVersion.key, DataVersion.version, DataVersion.updated_at).filter(
+        DataVersion.key.in_(scopes)
+    ).all()
+    versions = {key: (version, updated_at) for key, version, updated_at in rows}
+    token = '.'.join(str(versions.get(scope, (0, None))[0]) for scope in scopes)
+    stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    return token, max(stamps) if stamps else None
+
+
+def conditional(*scopes):
+    """Answer GETs with 304 Not Modified while the scopes' versions are unchanged.
+
+    The ETag covers the data version and the requesting user, so per-user
+    payloads never validate against another user's cached copy. The wrapped
+    view only runs when the client's copy is stale.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token, last_modified = current(*scopes)
+            raw = f'{request.endpoint}:{current_user.get_id()}:{token}'
+            etag = hashlib.sha1(raw.encode()).hexdigest()[:20]
+            if last_modified:
+                last_modified = last_modified.replace(microsecond=0)
+
+            if request.if_none_match:
+                # Weak match: compressed responses carry the ETag as W/"..."
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(
+                    last_modified and request.if_modified_since
+                    and request.if_modified_since.replace(tzinfo=None) >= last_modified
+                )
+
+            response = make_response('', 304) if not_modified else make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from sqlalchemy import event, exc, make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+# SQLALCHEMY_ENGINE_OPTIONS per deployment shape, chosen with DB_POOL_PROFILE.
+# 'direct' talks to Postgres (or Supabase's session pooler, port 5432) and keeps
+# a small pool per worker process. 'transaction' is for Supabase's transaction
+# pooler / PgBouncer in transaction mode (port 6543): the pooler hands each
+# transaction to whichever server connection is free, so connections are
+# recycled sooner and server-side prepared statements must be off. 'null'
+# opens a connection per checkout, for one-shot CLI commands.
+POOL_PROFILES = {
+    'direct': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        # Reuse the most recent connection so idle extras age out server-side
+        'pool_use_lifo': True,
+    },
+    'transaction': {
+        'pool_size': 5,
+        'max_overflow': 20,
+        'pool_timeout': 10,
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+    },
+    'null': {
+        'poolclass': NullPool,
+        'pool_pre_ping': False,
+    },
+}
+
+# Environment overrides for the sizing of whichever profile is active
+POOL_ENV_OVERRIDES = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+}
+
+# Upper bounds (milliseconds) of the checkout wait histogram
+WAIT_BUCKETS_MS = (1, 5, 25, 100, 500, 2000)
+
+
+class PoolMetrics:
+    """Process-wide counters for connection checkouts and the time spent waiting for one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.wait_count = 0
+            self.wait_seconds = 0.0
+            self.wait_max_seconds = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds += seconds
+            self.wait_max_seconds = max(self.wait_max_seconds, seconds)
+            self.wait_buckets[index] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.in_use = max(0, self.in_use - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool=None):
+        """Counters plus, when given the live pool, its current size and overflow."""
+        with self._lock:
+            data = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'wait_count': self.wait_count,
+                'wait_ms_total': round(self.wait_seconds * 1000, 3),
+                'wait_ms_avg': round(self.wait_seconds * 1000 / self.wait_count, 3) if self.wait_count else 0.0,
+                'wait_ms_max': round(self.wait_max_seconds * 1000, 3),
+                'wait_histogram_ms': {
+                    **{f'le_{bound}': count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                    'inf': self.wait_buckets[-1],
+                },
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                'pool_size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(0, pool.overflow()),
+                'max_overflow': pool._max_overflow,
+                'peak_overflow': max(0, data['peak_in_use'] - pool.size()),
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout takes to get a connection.
+
+    The pool events only fire once a connection has been handed out, so the
+    time spent queueing behind other checkouts (or opening an overflow
+    connection) is measured around _do_get here.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+def _apply_overrides(options, environ):
+    for name, key in POOL_ENV_OVERRIDES.items():
+        value = environ.get(name)
+        if value not in (None, ''):
+            options[key] = int(value)
+
+
+def pool_capacity(profile='direct', environ=None):
+    """Most connections one process holds at once under ``profile``; None when unpooled."""
+    environ = os.environ if environ is None else environ
+    options = dict(POOL_PROFILES[profile])
+    if 'poolclass' in options:
+        return None
+    _apply_overrides(options, environ)
+    return options['pool_size'] + options['max_overflow']
+
+
+def engine_options(database_url, profile='direct', environ=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``profile``, with DB_POOL_* overrides from ``environ``."""
+    environ = os.environ if environ is None else environ
+    if profile not in POOL_PROFILES:
+        raise ValueError(f'Unknown DB_POOL_PROFILE {profile!r}; expected one of {", ".join(POOL_PROFILES)}')
+    if not database_url:
+        return {}
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite lives in one connection; keep SQLAlchemy's default pool for it
+        return {}
+
+    options = dict(POOL_PROFILES[profile])
+    if 'poolclass' not in options:
+        options['poolclass'] = InstrumentedQueuePool
+        _apply_overrides(options, environ)
+
+    if profile == 'transaction' and url.get_driver_name() == 'psycopg':
+        # psycopg 3 prepares statements server-side after a few executions; those
+        # would land on a different backend connection behind the pooler.
+        # (psycopg2 never uses server-side prepared statements.)
+        options['connect_args'] = {'prepare_threshold': None}
+    return options
+
+
+def instrument_engine(engine):
+    """Feed ``engine``'s pool events into pool_metrics."""
+    event.listen(engine, 'connect', pool_metrics.on_connect)
+    event.listen(engine, 'checkout', pool_metrics.on_checkout)
+    event.listen(engine, 'checkin', pool_metrics.on_checkin)
+    event.listen(engine, 'invalidate', pool_metrics.on_invalidate)
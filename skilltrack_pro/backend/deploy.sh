@@ -42,7 +42,7 @@ echo "2. Create new Web Service"
 echo "3. Connect your GitHub repository"
 echo "4. Use these settings:"
 echo "   - Build Command: pip install -r requirements.txt"
-echo "   - Start Command: gunicorn wsgi:app"
+echo "   - Start Command: gunicorn wsgi:app -c gunicorn.conf.py"
 echo "5. Add environment variables:"
 echo "   - DATABASE_URL"
 echo "   - SUPABASE_URL"
@@ -0,0 +1,105 @@
+"""Pure functions that inspect an uploaded document.
+
+They run inside worker processes (see jobs.py), so they only take plain
+arguments and return plain dicts; nothing here touches Flask or the database.
+"""
+import re
+import zipfile
+from xml.etree import ElementTree
+
+# Keep extracted text bounded; reviewers only need enough to skim and search
+MAX_TEXT_CHARS = 500_000
+
+PDF_MAGIC = b'%PDF-'
+ZIP_MAGIC = b'PK\x03\x04'
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # legacy .doc / .ppt
+
+_PDF_PAGE = re.compile(rb'/Type\s*/Page(?!s)')
+
+
+def _read_magic(path):
+    with open(path, 'rb') as f:
+        return f.read(8)
+
+
+def validate_format(path, extension):
+    """True when the file's leading bytes match what its extension claims."""
+    magic = _read_magic(path)
+    if extension == 'pdf':
+        return magic.startswith(PDF_MAGIC)
+    if extension in ('docx', 'pptx'):
+        if not magic.startswith(ZIP_MAGIC) or not zipfile.is_zipfile(path):
+            return False
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+        part = 'word/document.xml' if extension == 'docx' else 'ppt/presentation.xml'
+        return '[Content_Types].xml' in names and part in names
+    if extension in ('doc', 'ppt'):
+        return magic.startswith(OLE_MAGIC)
+    return False
+
+
+def _xml_text(data, tag_suffix):
+    root = ElementTree.fromstring(data)
+    return ' '.join(el.text for el in root.iter() if el.tag.endswith(tag_suffix) and el.text)
+
+
+def _analyze_pdf(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        # Without pypdf we can still count page objects, but not extract text
+        with open(path, 'rb') as f:
+            return len(_PDF_PAGE.findall(f.read())), None
+    reader = PdfReader(path)
+    parts, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return len(reader.pages), '\n'.join(parts)
+
+
+def _analyze_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        text = _xml_text(archive.read('word/document.xml'), '}t')
+        pages = None
+        if 'docProps/app.xml' in archive.namelist():
+            match = re.search(rb'<Pages>(\d+)</Pages>', archive.read('docProps/app.xml'))
+            pages = int(match.group(1)) if match else None
+    return pages, text
+
+
+def _analyze_pptx(path):
+    slide_name = re.compile(r'ppt/slides/slide(\d+)\.xml$')
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            (int(m.group(1)), name) for name in archive.namelist() if (m := slide_name.match(name))
+        )
+        text = '\n'.join(_xml_text(archive.read(name), '}t') for _, name in slides)
+    return len(slides), text
+
+
+ANALYZERS = {
+    'pdf': _analyze_pdf,
+    'docx': _analyze_docx,
+    'pptx': _analyze_pptx,
+}
+
+
+def analyze_document(path, extension):
+    """Validate a document and pull out its page count and text.
+
+    Returns {'format_valid', 'page_count', 'extracted_text'}. Legacy binary
+    .doc/.ppt files are only validated.
+    """
+    extension = extension.lower()
+    result = {'format_valid': validate_format(path, extension), 'page_count': None, 'extracted_text': None}
+    analyzer = ANALYZERS.get(extension)
+    if result['format_valid'] and analyzer:
+        pages, text = analyzer(path)
+        result['page_count'] = pages
+        result['extracted_text'] = text[:MAX_TEXT_CHARS] if text else None
+    return result
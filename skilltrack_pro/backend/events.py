@@ -0,0 +1,382 @@
+"""Live dashboard updates pushed to browsers over server-sent events.
+
+Blueprints call course_status_changed() / documentation_status_changed()
+next to data_version.bump(). The change is queued on the session and only
+leaves the process once the transaction commits; a rollback drops it. The
+broker fans every change out to the open /api/events streams, and each
+stream turns it into what its user's dashboard shows: count deltas, a row
+to update, a review to add to or remove from the queue. Changes the
+dashboard does not show are skipped.
+
+LocalBroker delivers within one process, which is enough for tests and a
+single worker. PostgresBroker sends the change with NOTIFY inside the
+committing transaction. One LISTEN connection per process then feeds that
+process's streams, so every gunicorn worker sees every change. An idle
+stream costs one thread (or greenlet) waiting on its queue, and a heartbeat
+comment every HEARTBEAT_SECONDS.
+"""
+import itertools
+import json
+import logging
+import queue
+import select
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from flask import current_app, has_app_context
+from sqlalchemy import event, make_url, text
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel shared by every process
+CHANNEL = 'skilltrack_events'
+# Comment lines sent on idle streams so proxies and browsers keep them open
+HEARTBEAT_SECONDS = 20
+# Events a slow stream may fall behind before it is told to resync
+SUBSCRIBER_BUFFER = 100
+# Recent events kept per process so a reconnecting stream can catch up
+REPLAY_EVENTS = 500
+# Browser reconnect delay sent with every stream
+RETRY_MS = 3000
+LISTEN_RECONNECT_SECONDS = 5
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_BYTES = 7900
+
+_SESSION_KEY = 'pending_events'
+_RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """One open stream's queue of (event_id, event) pairs."""
+
+    def __init__(self):
+        self.queue = queue.Queue(SUBSCRIBER_BUFFER)
+        self.overflowed = False
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class LocalBroker:
+    """In-process fan-out of committed events to every subscription."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=REPLAY_EVENTS)
+        self._boot = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, last_event_id=None):
+        """Register a stream; return (subscription, missed events or None if it cannot catch up)."""
+        subscription = Subscription()
+        with self._lock:
+            self._subscribers.add(subscription)
+            missed = [] if not last_event_id else self._since(last_event_id)
+        return subscription, missed
+
+    def _since(self, last_event_id):
+        boot, _, sequence = last_event_id.partition('-')
+        if boot != self._boot or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if self._recent and int(self._recent[0][0].partition('-')[2]) > sequence + 1:
+            return None  # the buffer has moved past it
+        return [item for item in self._recent if int(item[0].partition('-')[2]) > sequence]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def deliver(self, event):
+        """Hand ``event`` to every current subscription."""
+        with self._lock:
+            item = (f'{self._boot}-{next(self._sequence)}', event)
+            self._recent.append(item)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(item)
+
+    def prepare(self, session, events):
+        """Called before the transaction commits."""
+
+    def committed(self, events):
+        """Called once the transaction has committed."""
+        self.published += len(events)
+        for event in events:
+            self.deliver(event)
+
+
+class PostgresBroker(LocalBroker):
+    """Fan-out across processes with Postgres LISTEN/NOTIFY."""
+
+    def __init__(self, dsn):
+        super().__init__()
+        self.dsn = dsn
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def prepare(self, session, events):
+        # Sent with the transaction: listeners only hear about committed changes
+        for event in events:
+            payload = json.dumps(event, separators=(',', ':'))
+            if len(payload.encode()) > MAX_NOTIFY_BYTES:
+                payload = json.dumps(_RESYNC)
+            session.execute(text('SELECT pg_notify(:channel, :payload)'), {'channel': CHANNEL, 'payload': payload})
+        self.published += len(events)
+
+    def committed(self, events):
+        """Delivered through the LISTEN connection instead."""
+
+    def subscribe(self, last_event_id=None):
+        self._start_listener()
+        return super().subscribe(last_event_id)
+
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = psycopg2.connect(self.dsn)
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                if connected_before:
+                    # Changes made while reconnecting were missed
+                    self.deliver(_RESYNC)
+                connected_before = True
+                while True:
+                    if select.select([connection], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                        with connection.cursor() as cursor:
+                            cursor.execute('SELECT 1')  # notice a dropped connection
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self.deliver(json.loads(connection.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Event listener lost its connection; reconnecting')
+                time.sleep(LISTEN_RECONNECT_SECONDS)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+def create_broker(mode, database_url):
+    """Broker for EVENTS_BROKER: 'postgres', 'local', 'off', or 'auto' (postgres for a Postgres URL)."""
+    if mode == 'off':
+        return None
+    if mode == 'auto':
+        mode = 'postgres' if (database_url or '').startswith(('postgres://', 'postgresql')) else 'local'
+    if mode == 'postgres':
+        url = make_url(database_url).set(drivername='postgresql')
+        return PostgresBroker(url.render_as_string(hide_password=False))
+    return LocalBroker()
+
+
+def get_broker():
+    return current_app.extensions.get('events') if has_app_context() else None
+
+
+def publish(event_type, data):
+    """Queue an event in the caller's transaction; it is sent once the transaction commits."""
+    if get_broker() is None:
+        return
+    session = db.session()
+    if not session.in_transaction():
+        # Tie the event to a transaction, so even a rollback before any query drops it
+        session.begin()
+    session.info.setdefault(_SESSION_KEY, []).append({'type': event_type, **data})
+
+
+def course_status_changed(course, previous_status, previous_trainer_id=None, trainer_name=None):
+    """Publish a course's move from ``previous_status`` to its current status and trainer."""
+    publish('course', {
+        'id': str(course.id),
+        'title': course.title,
+        'status': course.status,
+        'previous_status': previous_status,
+        'trainer_id': str(course.trainer_id) if course.trainer_id else None,
+        'previous_trainer_id': str(previous_trainer_id) if previous_trainer_id else None,
+        'trainer_name': trainer_name,
+    })
+
+
+def documentation_status_changed(doc, previous_status, course, trainer_name=None, review_url=None):
+    """Publish a document's move from ``previous_status`` (None for a new upload) to its current status.
+
+    ``doc`` and ``course`` may be ORM objects or state_machine rows; ``course``
+    is only needed for its title and may be None.
+    """
+    publish('documentation', {
+        'id': str(doc.id),
+        'course_id': str(doc.course_id),
+        'course_title': course.title if course is not None else None,
+        'trainer_name': trainer_name,
+        'status': doc.status,
+        'previous_status': previous_status,
+        'has_file': bool(doc.file_path),
+        'submitted_at': doc.submitted_at.strftime('%Y-%m-%d') if doc.submitted_at else None,
+        'review_url': review_url,
+    })
+
+
+def courses_reloaded():
+    """Tell every dashboard to reload, for bulk changes too large to send one by one."""
+    publish('resync', {})
+
+
+class Audience:
+    """What one user's dashboard shows; turns broadcast events into that dashboard's updates."""
+
+    def __init__(self, role, trainer_id=None):
+        self.role = role
+        self.trainer_id = str(trainer_id) if trainer_id else None
+
+    def view(self, event):
+        """Return (event name, data) for this dashboard, or None if it shows nothing of ``event``."""
+        if event['type'] == 'course':
+            return self._course(event)
+        if event['type'] == 'documentation':
+            return self._documentation(event)
+        return None
+
+    def _counts_course(self, status, trainer_id):
+        if status is None:
+            return False
+        if self.role == 'trainer':
+            # Same rule as course_stats: own courses plus unassigned requests
+            return trainer_id == self.trainer_id or (trainer_id is None and status == 'Requested')
+        return True
+
+    def _course(self, event):
+        if self.role not in ('admin', 'trainer'):
+            return None
+        counts = _deltas(
+            event['previous_status'] if self._counts_course(event['previous_status'], event['previous_trainer_id']) else None,
+            event['status'] if self._counts_course(event['status'], event['trainer_id']) else None,
+        )
+        if self.role == 'trainer' and not counts:
+            return None
+        return 'course', {key: event[key] for key in ('id', 'title', 'status', 'trainer_id', 'trainer_name')} | {'counts': counts}
+
+    def _documentation(self, event):
+        if self.role != 'observer':
+            return None
+        # Pending documents are only reviewable (and counted) once a file is attached
+        previous, current = (
+            status if status is not None and (status != 'Pending' or event['has_file']) else None
+            for status in (event['previous_status'], event['status'])
+        )
+        counts = _deltas(previous, current)
+        review_queue = None
+        if current == 'Pending' and previous != 'Pending':
+            review_queue = 'add'
+        elif previous == 'Pending' and current != 'Pending':
+            review_queue = 'remove'
+        if not counts and review_queue is None:
+            return None
+        data = {key: event[key] for key in ('id', 'course_title', 'trainer_name', 'submitted_at', 'review_url')}
+        return 'documentation', data | {'counts': counts, 'queue': review_queue}
+
+
+def _deltas(previous, current):
+    counts = Counter()
+    if previous != current:
+        if previous:
+            counts[previous] -= 1
+        if current:
+            counts[current] += 1
+    return dict(counts)
+
+
+def _frame(name, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id else []
+    lines += [f'event: {name}', f'data: {json.dumps(data, separators=(",", ":"))}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream(broker, audience, last_event_id=None):
+    """SSE body for one dashboard.
+
+    The generator subscribes when the server starts sending the body and
+    unsubscribes when the client goes away, so a response that is never
+    sent never holds a subscription.
+    """
+    def generate():
+        subscription, missed = broker.subscribe(last_event_id)
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            if missed is None:
+                yield _frame('resync', {})
+                return
+            backlog = iter(missed)
+            while True:
+                item = next(backlog, None)
+                if item is None:
+                    try:
+                        item = subscription.get(HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ': keepalive\n\n'
+                        continue
+                event_id, event = item
+                if subscription.overflowed or event['type'] == 'resync':
+                    yield _frame('resync', {})
+                    return
+                view = audience.view(event)
+                if view:
+                    yield _frame(*view, event_id=event_id)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return generate()
+
+
+def _before_commit(session):
+    events = session.info.get(_SESSION_KEY)
+    if events:
+        get_broker().prepare(session, events)
+
+
+def _after_commit(session):
+    events = session.info.pop(_SESSION_KEY, None)
+    if events:
+        get_broker().committed(events)
+
+
+def _after_transaction_end(session, transaction):
+    # Still queued when the outermost transaction ends: it was rolled back
+    if transaction.parent is None:
+        session.info.pop(_SESSION_KEY, None)
+
+
+def init_app(app):
+    """Create the EVENTS_BROKER broker and send queued events when sessions commit."""
+    broker = create_broker(app.config.get('EVENTS_BROKER', 'auto'),
+                           app.config.get('EVENTS_DATABASE_URL') or app.config.get('SQLALCHEMY_DATABASE_URI'))
+    if broker is None:
+        return
+    app.extensions['events'] = broker
+    event.listen(db.session, 'before_commit', _before_commit)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_transaction_end', _after_transaction_end)
@@ -0,0 +1,271 @@
+"""Streaming CSV and XLSX exports of courses, documentation history and feedback.
+
+Rows come from a server-side cursor (see utils.iter_query_rows) and are
+encoded and handed to the response a chunk at a time. Memory use therefore
+does not grow with the size of the export. XLSX is written as a streamed zip
+with inline strings, so no spreadsheet library or temporary file is needed.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from .models import (
+    Course, CourseFeedbackSummary, Documentation, DocumentationFeedbackSummary, Feedback, Trainer, User,
+)
+from .utils import iter_query_rows
+
+# Rows per server-side cursor fetch, and rows encoded per response chunk
+EXPORT_FETCH_ROWS = 1000
+EXPORT_CHUNK_ROWS = 500
+
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Spreadsheet apps run cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Control characters XML 1.0 cannot carry
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _courses(filters):
+    owner = aliased(User)
+    statement = (
+        select(Course.id, Course.title, Course.status, Trainer.name, owner.email,
+               Course.scheduled_time, Course.scheduled_end, Course.duration_minutes,
+               CourseFeedbackSummary.rating_sum, CourseFeedbackSummary.rating_count,
+               CourseFeedbackSummary.comment_count)
+        .join(owner, Course.user_id == owner.id)
+        .outerjoin(Trainer, Course.trainer_id == Trainer.id)
+        .outerjoin(CourseFeedbackSummary, CourseFeedbackSummary.course_id == Course.id)
+        .order_by(Course.scheduled_time)
+    )
+    return _filtered(statement, filters, Course.status, Course.scheduled_time)
+
+
+def _course_row(row):
+    course_id, title, status, trainer, owner, start, end, duration, rating_sum, rating_count, comments = row
+    return (str(course_id), title, status, trainer or 'Unassigned', owner, start, end, duration,
+            _average(rating_sum, rating_count), comments or 0)
+
+
+def _documentation(filters):
+    statement = (
+        select(Documentation.id, Course.id, Course.title, Trainer.name, Documentation.revision_number,
+               Documentation.status, Documentation.submitted_at, Documentation.approved_at,
+               Documentation.rejected_at, Documentation.original_filename, Documentation.page_count,
+               DocumentationFeedbackSummary.rating_sum, DocumentationFeedbackSummary.rating_count,
+               DocumentationFeedbackSummary.comment_count)
+        .join(Course, Documentation.course_id == Course.id)
+        .outerjoin(Trainer, Course.trainer_id == Trainer.id)
+        .outerjoin(DocumentationFeedbackSummary,
+                   DocumentationFeedbackSummary.documentation_id == Documentation.id)
+        .order_by(Documentation.submitted_at)
+    )
+    return _filtered(statement, filters, Documentation.status, Documentation.submitted_at)
+
+
+def _documentation_row(row):
+    (doc_id, course_id, title, trainer, revision, status, submitted, approved, rejected,
+     filename, pages, rating_sum, rating_count, comments) = row
+    return (str(doc_id), str(course_id), title, trainer or 'Unassigned', revision or 0, status,
+            submitted, approved, rejected, filename, pages, _average(rating_sum, rating_count), comments or 0)
+
+
+def _feedback(filters):
+    statement = (
+        select(Feedback.id, Feedback.created_at, Feedback.rating, Feedback.comments, Documentation.id,
+               Documentation.revision_number, Course.id, Course.title, Course.status, Trainer.name)
+        .join(Documentation, Feedback.documentation_id == Documentation.id)
+        .join(Course, Documentation.course_id == Course.id)
+        .outerjoin(Trainer, Course.trainer_id == Trainer.id)
+        .order_by(Feedback.id)
+    )
+    return _filtered(statement, filters, Course.status, Feedback.created_at)
+
+
+def _feedback_row(row):
+    feedback_id, created, rating, comments, doc_id, revision, course_id, title, status, trainer = row
+    return (feedback_id, created, rating, comments, str(doc_id), revision or 0, str(course_id), title,
+            status, trainer or 'Unassigned')
+
+
+# name -> (header, statement builder, row formatter); the status filter applies to
+# the course for courses and feedback and to the revision for documentation
+EXPORTS = {
+    'courses': (
+        ('course_id', 'title', 'status', 'trainer', 'owner_email', 'scheduled_time', 'scheduled_end',
+         'duration_minutes', 'average_rating', 'feedback_count'),
+        _courses, _course_row,
+    ),
+    'documentation': (
+        ('documentation_id', 'course_id', 'course_title', 'trainer', 'revision', 'status', 'submitted_at',
+         'approved_at', 'rejected_at', 'original_filename', 'page_count', 'average_rating', 'feedback_count'),
+        _documentation, _documentation_row,
+    ),
+    'feedback': (
+        ('feedback_id', 'created_at', 'rating', 'comments', 'documentation_id', 'revision', 'course_id',
+         'course_title', 'course_status', 'trainer'),
+        _feedback, _feedback_row,
+    ),
+}
+
+
+def _average(rating_sum, rating_count):
+    return round(rating_sum / rating_count, 2) if rating_count else None
+
+
+def _filtered(statement, filters, status_column, date_column):
+    if filters.get('status'):
+        statement = statement.where(status_column == filters['status'])
+    if filters.get('trainer_id'):
+        statement = statement.where(Course.trainer_id == filters['trainer_id'])
+    if filters.get('start'):
+        statement = statement.where(date_column >= filters['start'])
+    if filters.get('end'):
+        statement = statement.where(date_column < filters['end'])
+    return statement
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_cell(value):
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def generate_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # A BOM makes Excel read the file as UTF-8
+    buffer.write('﻿')
+    writer.writerow(header)
+    for chunk in _chunks(rows, EXPORT_CHUNK_ROWS):
+        writer.writerows([_csv_cell(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _Drain:
+    """Write-only file whose contents are taken out after every chunk.
+
+    zipfile accepts unseekable output and writes data descriptors after each
+    member instead of seeking back to patch the header.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(_XML_ILLEGAL.sub("", _text(value)))}</t></is></c>'
+
+
+def generate_xlsx(header, rows, sheet_name):
+    out = _Drain()
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        yield out.take()
+        # force_zip64: the sheet's final size is unknown while it is being written
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(('<row>' + ''.join(_xlsx_cell(name) for name in header) + '</row>').encode('utf-8'))
+            for chunk in _chunks(rows, EXPORT_CHUNK_ROWS):
+                sheet.write(''.join(
+                    '<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>' for row in chunk
+                ).encode('utf-8'))
+                yield out.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield out.take()
+
+
+def export_stream(name, fmt, filters):
+    """Byte chunks of export ``name`` ('courses', ...) as ``fmt`` ('csv' or 'xlsx'), filtered by ``filters``.
+
+    ``filters`` may hold status, trainer_id, and start/end datetimes (start
+    inclusive, end exclusive); each export filters on its own date column.
+    """
+    header, build, format_row = EXPORTS[name]
+    rows = (format_row(row) for row in iter_query_rows(build(filters), yield_per=EXPORT_FETCH_ROWS))
+    if fmt == 'xlsx':
+        return generate_xlsx(header, rows, sheet_name=name)
+    return generate_csv(header, rows)
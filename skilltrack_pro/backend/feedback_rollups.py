@@ -0,0 +1,108 @@
+from sqlalchemy import update, insert, delete, select, func
+from sqlalchemy.exc import IntegrityError
+from .models import Feedback, Documentation, CourseFeedbackSummary, DocumentationFeedbackSummary, db
+
+SUMMARY_COLUMNS = ('rating_sum', 'rating_count', 'comment_count')
+
+
+def _parse_rating(rating):
+    if rating in (None, ''):
+        return None
+    try:
+        return int(rating)
+    except (TypeError, ValueError):
+        return None
+
+
+def _apply_delta(model, key_column, key, deltas, extra=None):
+    """Add ``deltas`` to one summary row, creating it on first use."""
+    values = {name: getattr(model, name) + amount for name, amount in deltas.items()}
+    result = db.session.execute(update(model).where(key_column == key).values(**values))
+    if result.rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(model).values({key_column.key: key, **(extra or {}), **deltas}))
+    except IntegrityError:
+        # Created concurrently; fall back to the increment
+        db.session.execute(update(model).where(key_column == key).values(**values))
+
+
+def record_feedback(documentation, comments, rating=None, created_at=None):
+    """Add a Feedback row and update both rollups in the caller's transaction.
+
+    The caller commits. Returns the new Feedback.
+    """
+    rating = _parse_rating(rating)
+    feedback = Feedback(documentation_id=documentation.id, comments=comments, rating=rating)
+    if created_at is not None:
+        feedback.created_at = created_at
+    db.session.add(feedback)
+
+    deltas = {
+        'rating_sum': rating or 0,
+        'rating_count': 1 if rating is not None else 0,
+        'comment_count': 1,
+    }
+    _apply_delta(DocumentationFeedbackSummary, DocumentationFeedbackSummary.documentation_id,
+                 documentation.id, deltas, extra={'course_id': documentation.course_id})
+    _apply_delta(CourseFeedbackSummary, CourseFeedbackSummary.course_id, documentation.course_id, deltas)
+    return feedback
+
+
+def _aggregate(group_columns):
+    """SELECT group_columns, rating_sum, rating_count, comment_count over all feedback."""
+    return (
+        select(
+            *group_columns,
+            func.coalesce(func.sum(Feedback.rating), 0).label('rating_sum'),
+            func.count(Feedback.rating).label('rating_count'),
+            func.count(Feedback.id).label('comment_count'),
+        )
+        .join(Documentation, Feedback.documentation_id == Documentation.id)
+        .group_by(*group_columns)
+    )
+
+
+def rebuild_rollups():
+    """Recompute both summary tables from the feedback table in one transaction."""
+    db.session.execute(delete(DocumentationFeedbackSummary))
+    db.session.execute(delete(CourseFeedbackSummary))
+    db.session.execute(
+        insert(DocumentationFeedbackSummary).from_select(
+            ['documentation_id', 'course_id', *SUMMARY_COLUMNS],
+            _aggregate([Documentation.id, Documentation.course_id])
+        )
+    )
+    db.session.execute(
+        insert(CourseFeedbackSummary).from_select(
+            ['course_id', *SUMMARY_COLUMNS],
+            _aggregate([Documentation.course_id])
+        )
+    )
+    db.session.commit()
+
+
+def _compare(expected_rows, summary_model, key_name):
+    expected = {row[0]: tuple(row[1:]) for row in expected_rows}
+    actual = {
+        getattr(row, key_name): tuple(getattr(row, name) for name in SUMMARY_COLUMNS)
+        for row in summary_model.query
+    }
+    empty = (0, 0, 0)
+    return [
+        {'table': summary_model.__tablename__, 'key': str(key),
+         'expected': expected.get(key, empty), 'actual': actual.get(key, empty)}
+        for key in expected.keys() | actual.keys()
+        if expected.get(key, empty) != actual.get(key, empty)
+    ]
+
+
+def check_rollups():
+    """Return a list of summary rows that disagree with the feedback table."""
+    doc_rows = db.session.execute(_aggregate([Documentation.id]))
+    course_rows = db.session.execute(_aggregate([Documentation.course_id]))
+    return (
+        _compare(doc_rows, DocumentationFeedbackSummary, 'documentation_id')
+        + _compare(course_rows, CourseFeedbackSummary, 'course_id')
+    )
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+from flask import render_template
+from markupsafe import Markup
+from . import data_version
+
+# Rendered fragments kept per process; least recently used ones are dropped first
+MAX_FRAGMENTS = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def render(template, scope, versions, load):
+    """Return ``template`` rendered with ``load()``'s context, reusing the HTML while the data is unchanged.
+
+    ``scope`` says whose view it is: a role name for lists every user of the
+    role sees alike, or a user/trainer id for personal ones. ``versions``
+    are the data_version scopes the fragment shows, so a bump in any worker
+    makes every worker re-render. ``load`` runs only on a miss, which skips
+    the queries along with the rendering.
+    """
+    global _hits, _misses
+    # Read the stamp before loading: a write that lands in between leaves
+    # newer HTML under an older stamp, which the next request re-renders
+    token, _ = data_version.current(*versions)
+    key = (template, str(scope))
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] == token:
+            _cache.move_to_end(key)
+            _hits += 1
+            return Markup(entry[1])
+        _misses += 1
+
+    html = render_template(template, **load())
+    with _lock:
+        _cache[key] = (token, html)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_FRAGMENTS:
+            _cache.popitem(last=False)
+    return Markup(html)
+
+
+def invalidate():
+    """Drop every cached fragment."""
+    with _lock:
+        _cache.clear()
+
+
+def cache_info():
+    """Hit/miss counters for the fragment cache."""
+    with _lock:
+        return {
+            'hits': _hits,
+            'misses': _misses,
+            'entries': len(_cache),
+            'bytes': sum(len(html) for _, html in _cache.values()),
+            'max_entries': MAX_FRAGMENTS,
+        }
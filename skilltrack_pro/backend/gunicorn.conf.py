@@ -0,0 +1,35 @@
+"""Gunicorn settings: per-worker concurrency sized to the database pool and the event streams.
+
+    gunicorn wsgi:app -c gunicorn.conf.py
+
+An open /api/events stream holds a thread (or greenlet) for as long as the
+dashboard stays open, but no database connection. Each worker therefore
+gets one thread per allowed stream (EVENTS_MAX_STREAMS) plus one per
+connection its pool can hand out (DB_POOL_SIZE + DB_MAX_OVERFLOW). Any
+more would only queue on the pool until DB_POOL_TIMEOUT.
+
+WEB_WORKER_CLASS=gevent runs each request in a greenlet instead. Use it
+once a worker should hold more than a few dozen streams. It needs the
+gevent and psycogreen packages; psycopg2 is patched after the fork so
+database calls yield to other greenlets.
+"""
+import os
+from db_pool import pool_capacity
+
+# Same default as app.py
+EVENTS_MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', 25))
+
+# NullPool opens connections on demand; size threads as for the default pool
+_connections = pool_capacity(os.getenv('DB_POOL_PROFILE', 'direct')) or pool_capacity('direct')
+
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    worker_connections = _connections + EVENTS_MAX_STREAMS
+else:
+    threads = _connections + EVENTS_MAX_STREAMS
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, update
+from .models import DocumentJob, Documentation, db
+from .storage import resolve_path
+from .document_processing import analyze_document
+from .search import index_documentation
+
+# Seconds a single job may run before its worker process is killed
+JOB_TIMEOUT_SECONDS = 120
+# Base delay before a failed job is retried; doubles with every attempt
+RETRY_BACKOFF_SECONDS = 30
+# How long the worker sleeps when the queue is empty
+POLL_INTERVAL_SECONDS = 2
+
+
+def enqueue_document_processing(doc):
+    """Queue post-upload processing for ``doc`` in the caller's transaction."""
+    doc.processing_status = 'queued'
+    job = DocumentJob(documentation_id=doc.id, kind='analyze', status='queued', run_after=datetime.utcnow())
+    db.session.add(job)
+    return job
+
+
+def _fail_abandoned(stale, now):
+    """Fail jobs whose worker died during their last attempt, and their documents."""
+    jobs = (
+        DocumentJob.query
+        .filter(DocumentJob.status == 'running', DocumentJob.locked_at < stale,
+                DocumentJob.attempts >= DocumentJob.max_attempts)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        job.status = 'failed'
+        job.last_error = f'Worker stopped responding during attempt {job.attempts}'
+        job.locked_at = None
+        job.locked_by = None
+        job.finished_at = now
+    if jobs:
+        db.session.execute(
+            update(Documentation)
+            .where(Documentation.id.in_([job.documentation_id for job in jobs]))
+            .values(processing_status='failed'),
+            execution_options={'synchronize_session': False},
+        )
+
+
+def claim_jobs(limit, worker_id):
+    """Lock up to ``limit`` runnable jobs for this worker and mark them running.
+
+    Jobs stuck in 'running' past the timeout (their worker died) are picked
+    up again while they have attempts left, and failed otherwise. SKIP
+    LOCKED lets several workers poll the same table.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=JOB_TIMEOUT_SECONDS * 2)
+    _fail_abandoned(stale, now)
+    jobs = (
+        DocumentJob.query
+        .filter(or_(
+            and_(DocumentJob.status == 'queued', DocumentJob.run_after <= now),
+            and_(DocumentJob.status == 'running', DocumentJob.locked_at < stale,
+                 DocumentJob.attempts < DocumentJob.max_attempts),
+        ))
+        .order_by(DocumentJob.run_after)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_at = now
+        job.locked_by = worker_id
+    db.session.commit()
+    return jobs
+
+
+def _job_arguments(job):
+    doc = db.session.get(Documentation, job.documentation_id)
+    if doc is None or not doc.file_path:
+        raise ValueError('Documentation has no file')
+    name = doc.original_filename or doc.file_path
+    extension = name.rsplit('.', 1)[-1] if '.' in name else ''
+    return resolve_path(doc.file_path), extension
+
+
+def _finish(job, result):
+    doc = db.session.get(Documentation, job.documentation_id)
+    doc.format_valid = result['format_valid']
+    doc.page_count = result['page_count']
+    doc.extracted_text = result['extracted_text']
+    doc.processing_status = 'done'
+    if doc.extracted_text:
+        index_documentation(doc)
+    job.status = 'done'
+    job.last_error = None
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _fail(job, error):
+    job.last_error = error
+    job.locked_at = None
+    job.locked_by = None
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+        doc = db.session.get(Documentation, job.documentation_id)
+        if doc is not None:
+            doc.processing_status = 'failed'
+    else:
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+    db.session.commit()
+
+
+def run_worker(processes=None, once=False):
+    """Process queued jobs in a pool of worker processes until interrupted.
+
+    Must run inside an application context. With ``once`` the loop stops as
+    soon as the queue is empty. Returns the number of jobs handled.
+    """
+    processes = processes or os.cpu_count() or 1
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    pool = multiprocessing.Pool(processes)
+    handled = 0
+    try:
+        while True:
+            jobs = claim_jobs(processes, worker_id)
+            if not jobs:
+                if once:
+                    return handled
+                time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            pending = []
+            for job in jobs:
+                try:
+                    pending.append((job, pool.apply_async(analyze_document, _job_arguments(job))))
+                except Exception as e:
+                    _fail(job, str(e))
+
+            deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+            timed_out = False
+            for job, async_result in pending:
+                try:
+                    result = async_result.get(timeout=max(0, deadline - time.monotonic()))
+                except multiprocessing.TimeoutError:
+                    timed_out = True
+                    _fail(job, f'Timed out after {JOB_TIMEOUT_SECONDS}s')
+                except Exception as e:
+                    _fail(job, f'{type(e).__name__}: {e}')
+                else:
+                    _finish(job, result)
+                handled += 1
+
+            if timed_out:
+                # A hung analysis keeps its process busy forever; start from a clean pool
+                pool.terminate()
+                pool.join()
+                pool = multiprocessing.Pool(processes)
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,266 @@
+"""Per-request latency, SQL and Supabase timings, exposed in Prometheus text format.
+
+Enabled with METRICS_ENABLED. When it is off nothing is registered: no
+request hooks, no cursor listeners and no /metrics route, so the only cost
+left is the no-op ``supabase_call`` context manager around outbound calls.
+Counters live in process memory, so each gunicorn worker reports its own
+series; Prometheus sums them per instance label.
+"""
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import Response, abort, request
+from sqlalchemy import event
+from .db_pool import WAIT_BUCKETS_MS, pool_metrics
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+# The same statement shape this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+_enabled = False
+# Stats of the request being served on this thread, None outside requests
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0, 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, value_sum) in sorted(self.series.items()):
+            base = _labels(self.label_names, labels)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le=bound)} {count}')
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le="+Inf")} {total}')
+            lines.append(f'{self.name}_count{base} {total}')
+            lines.append(f'{self.name}_sum{base} {value_sum:.6f}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = Counter()
+
+    def inc(self, labels, amount=1):
+        self.series[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{_labels(self.label_names, labels)} {_number(value)}')
+        return lines
+
+
+def _number(value):
+    return f'{value:.6f}' if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, le=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+_lock = threading.Lock()
+request_duration = Histogram(
+    'skilltrack_http_request_duration_seconds', 'Time to handle a request, by endpoint.',
+    ('endpoint', 'method', 'status'), LATENCY_BUCKETS)
+request_statements = Histogram(
+    'skilltrack_db_statements_per_request', 'SQL statements issued per request.',
+    ('endpoint',), STATEMENT_BUCKETS)
+db_statements = CounterMetric(
+    'skilltrack_db_statements_total', 'SQL statements issued, by endpoint.', ('endpoint',))
+db_seconds = CounterMetric(
+    'skilltrack_db_seconds_total', 'Time spent executing SQL, by endpoint.', ('endpoint',))
+supabase_duration = Histogram(
+    'skilltrack_supabase_call_duration_seconds', 'Outbound Supabase API calls, by operation.',
+    ('operation', 'outcome'), LATENCY_BUCKETS)
+supabase_seconds = CounterMetric(
+    'skilltrack_supabase_seconds_total', 'Time spent in Supabase calls, by endpoint.', ('endpoint',))
+n_plus_one = CounterMetric(
+    'skilltrack_n_plus_one_total',
+    f'Requests that ran one statement shape {N_PLUS_ONE_THRESHOLD}+ times, by endpoint and shape.',
+    ('endpoint', 'shape'))
+_reported_shapes = set()
+
+
+class RequestStats:
+    __slots__ = ('start', 'statements', 'db_seconds', 'supabase_seconds', 'shapes', 'status')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.supabase_seconds = 0.0
+        self.shapes = Counter()
+        self.status = 500
+
+
+@contextmanager
+def supabase_call(operation):
+    """Time an outbound Supabase call under ``operation`` (e.g. 'auth.sign_in')."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            supabase_duration.observe((operation, outcome), elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.supabase_seconds += elapsed
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a failed statement leaves nothing behind
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, 'metrics_start', None)
+    if stats is not None and start is not None:
+        elapsed = time.perf_counter() - start
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        # Parameters are bound separately, so the SQL text is the statement's shape
+        stats.shapes[statement] += 1
+
+
+def _start_request():
+    _current.set(RequestStats())
+
+
+def _record_status(response):
+    stats = _current.get()
+    if stats is not None:
+        stats.status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    stats = _current.get()
+    if stats is None:
+        return
+    _current.set(None)
+    elapsed = time.perf_counter() - stats.start
+    endpoint = request.endpoint or 'unmatched'
+    repeated = [(shape, count) for shape, count in stats.shapes.items() if count >= N_PLUS_ONE_THRESHOLD]
+    with _lock:
+        request_duration.observe((endpoint, request.method, str(stats.status)), elapsed)
+        request_statements.observe((endpoint,), stats.statements)
+        db_statements.inc((endpoint,), stats.statements)
+        db_seconds.inc((endpoint,), stats.db_seconds)
+        if stats.supabase_seconds:
+            supabase_seconds.inc((endpoint,), stats.supabase_seconds)
+        new_shapes = []
+        for shape, count in repeated:
+            digest = hashlib.sha1(shape.encode()).hexdigest()[:12]
+            n_plus_one.inc((endpoint, digest))
+            if (endpoint, digest) not in _reported_shapes:
+                _reported_shapes.add((endpoint, digest))
+                new_shapes.append((digest, count, shape))
+    for digest, count, shape in new_shapes:
+        logger.warning('Likely N+1 in %s: statement %s ran %d times in one request: %s',
+                       endpoint, digest, count, ' '.join(shape.split())[:500])
+
+
+def _pool_lines():
+    pool = db.engine.pool
+    snapshot = pool_metrics.snapshot(pool)
+    lines = []
+    for key, kind, help_text in (
+        ('checkouts', 'counter', 'Connections handed out by the pool.'),
+        ('connects', 'counter', 'New database connections opened.'),
+        ('invalidations', 'counter', 'Connections discarded as broken.'),
+        ('timeouts', 'counter', 'Checkouts that gave up waiting for a connection.'),
+        ('in_use', 'gauge', 'Connections currently checked out.'),
+        ('overflow', 'gauge', 'Connections open beyond pool_size.'),
+    ):
+        if key in snapshot:
+            name = f'skilltrack_db_pool_{key}' + ('_total' if kind == 'counter' else '')
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {snapshot[key]}']
+    name = 'skilltrack_db_pool_wait_seconds'
+    lines += [f'# HELP {name} Time a checkout waited for a connection.', f'# TYPE {name} histogram']
+    cumulative = 0
+    for bound in WAIT_BUCKETS_MS:
+        cumulative += snapshot['wait_histogram_ms'][f'le_{bound}']
+        lines.append(f'{name}_bucket{{le="{bound / 1000}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {snapshot["wait_count"]}')
+    lines.append(f'{name}_count {snapshot["wait_count"]}')
+    lines.append(f'{name}_sum {snapshot["wait_ms_total"] / 1000:.6f}')
+    return lines
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        lines = []
+        for metric in (request_duration, request_statements, db_statements, db_seconds,
+                       supabase_duration, supabase_seconds, n_plus_one):
+            lines += metric.render()
+    lines += _pool_lines()
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Install the request hooks, cursor listeners and /metrics route if METRICS_ENABLED."""
+    global _enabled
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    _enabled = True
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    token = app.config.get('METRICS_TOKEN')
+
+    def metrics():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,88 @@
+"""indexes for hot query predicates
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 15:58:51.204026
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+PENDING_WITH_FILE = "status = 'Pending' AND file_path <> ''"
+
+# (table, index name, columns, partial index predicate)
+INDEXES = [
+    ('courses', 'ix_courses_status', ['status'], None),
+    ('courses', 'ix_courses_trainer_id_status', ['trainer_id', 'status'], None),
+    ('courses', 'ix_courses_user_id_status', ['user_id', 'status'], None),
+    ('documentation', 'ix_documentation_course_id_revision', ['course_id', 'revision_number', 'submitted_at'], None),
+    ('documentation', 'ix_documentation_course_id_submitted_at', ['course_id', 'submitted_at'], None),
+    ('documentation', 'ix_documentation_status', ['status'], None),
+    ('documentation', 'ix_documentation_pending_submitted_at', ['submitted_at'], sa.text(PENDING_WITH_FILE)),
+    ('documentation', 'ix_documentation_approved_at', ['approved_at'], sa.text("status = 'Approved'")),
+    ('documentation', 'ix_documentation_rejected_at', ['rejected_at'], sa.text("status = 'Rejected'")),
+    ('feedback', 'ix_feedback_documentation_id_created_at', ['documentation_id', 'created_at'], None),
+]
+INDEXED_TABLES = ['courses', 'documentation', 'feedback']
+
+
+def _check_trainer_user_ids():
+    # Admin-added trainers used to be stored under the admin's own user id;
+    # those rows have to be re-pointed at the trainer's account before the
+    # unique constraint can be created.
+    if context.is_offline_mode():
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT user_id, COUNT(*) FROM trainers GROUP BY user_id HAVING COUNT(*) > 1'
+    )).all()
+    if duplicates:
+        listing = ', '.join(f'{user_id} ({count} trainers)' for user_id, count in duplicates)
+        raise RuntimeError(f'trainers.user_id is not unique: {listing}. '
+                           'Re-assign or merge those trainer rows, then run the upgrade again.')
+
+
+def _is_postgresql():
+    return op.get_context().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if _is_postgresql():
+        # CONCURRENTLY keeps the tables writable while the indexes build; it cannot run inside a
+        # transaction. A build that fails leaves an INVALID index: drop it before upgrading again.
+        with op.get_context().autocommit_block():
+            for table, name, columns, where in INDEXES:
+                op.create_index(name, table, columns, unique=False, postgresql_where=where,
+                                postgresql_concurrently=True)
+    else:
+        for table in INDEXED_TABLES:
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                for index_table, name, columns, where in INDEXES:
+                    if index_table == table:
+                        batch_op.create_index(name, columns, unique=False, sqlite_where=where)
+
+    _check_trainer_user_ids()
+    with op.batch_alter_table('trainers', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_trainers_user_id', ['user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('trainers', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_trainers_user_id', type_='unique')
+
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            for table, name, _, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        for table in reversed(INDEXED_TABLES):
+            with op.batch_alter_table(table, schema=None) as batch_op:
+                for index_table, name, _, _ in reversed(INDEXES):
+                    if index_table == table:
+                        batch_op.drop_index(name)
@@ -0,0 +1,85 @@
+"""course durations and trainer schedule exclusion
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:12:40.381925
+
+"""
+from datetime import timedelta
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# Same statement as models.COURSE_SCHEDULE_EXCLUSION_DDL
+EXCLUSION_DDL = (
+    "ALTER TABLE courses ADD CONSTRAINT ex_courses_trainer_schedule EXCLUDE USING gist "
+    "(trainer_id WITH =, tsrange(scheduled_time, scheduled_end) WITH &&) "
+    "WHERE (trainer_id IS NOT NULL AND scheduled_time IS NOT NULL)"
+)
+
+courses = sa.table(
+    'courses',
+    sa.column('id', sa.Uuid()),
+    sa.column('scheduled_time', sa.DateTime()),
+    sa.column('scheduled_end', sa.DateTime()),
+)
+
+
+def _backfill_scheduled_end_sqlite(bind):
+    # SQLite's datetime() would write a different text format than SQLAlchemy's, so compute in Python
+    rows = bind.execute(sa.select(courses.c.id, courses.c.scheduled_time)
+                        .where(courses.c.scheduled_time.isnot(None))).all()
+    if rows:
+        bind.execute(courses.update().where(courses.c.id == sa.bindparam('course_id'))
+                     .values(scheduled_end=sa.bindparam('end')),
+                     [{'course_id': course_id, 'end': start + timedelta(minutes=60)} for course_id, start in rows])
+
+
+def _check_double_bookings(bind):
+    # The exclusion constraint cannot be created while a trainer has overlapping sessions
+    overlaps = bind.execute(sa.text(
+        "SELECT a.trainer_id, a.id, b.id FROM courses a JOIN courses b "
+        "ON a.trainer_id = b.trainer_id AND a.id < b.id "
+        "AND a.scheduled_time < b.scheduled_end AND b.scheduled_time < a.scheduled_end "
+        "LIMIT 20"
+    )).all()
+    if overlaps:
+        listing = ', '.join(f'trainer {trainer_id}: {first} / {second}' for trainer_id, first, second in overlaps)
+        raise RuntimeError(f'Trainers are double-booked: {listing}. '
+                           'Reschedule or unassign those courses, then run the upgrade again.')
+
+
+def upgrade():
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), server_default='60', nullable=False))
+        batch_op.add_column(sa.Column('scheduled_end', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_courses_scheduled_time', ['scheduled_time'], unique=False)
+        batch_op.create_index('ix_courses_trainer_id_scheduled_time', ['trainer_id', 'scheduled_time'], unique=False)
+
+    # Existing courses get the default 60 minutes
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute("UPDATE courses SET scheduled_end = scheduled_time + interval '60 minutes' "
+                   "WHERE scheduled_time IS NOT NULL")
+        if not context.is_offline_mode():
+            _check_double_bookings(op.get_bind())
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        op.execute(EXCLUSION_DDL)
+    elif not context.is_offline_mode():
+        _backfill_scheduled_end_sqlite(op.get_bind())
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE courses DROP CONSTRAINT IF EXISTS ex_courses_trainer_schedule')
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_index('ix_courses_trainer_id_scheduled_time')
+        batch_op.drop_index('ix_courses_scheduled_time')
+        batch_op.drop_column('scheduled_end')
+        batch_op.drop_column('duration_minutes')
@@ -0,0 +1,34 @@
+"""documentation review leases
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:02:14.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documentation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.UUID(), nullable=True))
+        batch_op.add_column(sa.Column('claim_expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_documentation_claimed_by', 'users', ['claimed_by'], ['id'])
+        batch_op.create_index('ix_documentation_claimed_by', ['claimed_by', 'claim_expires_at'], unique=False,
+                              postgresql_where=sa.text('claimed_by IS NOT NULL'),
+                              sqlite_where=sa.text('claimed_by IS NOT NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('documentation', schema=None) as batch_op:
+        batch_op.drop_index('ix_documentation_claimed_by')
+        batch_op.drop_constraint('fk_documentation_claimed_by', type_='foreignkey')
+        batch_op.drop_column('claim_expires_at')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,53 @@
+"""change log and course updated_at
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 21:40:52.104377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+courses = sa.table('courses', sa.column('id', sa.Uuid()), sa.column('updated_at', sa.DateTime()))
+documentation = sa.table('documentation', sa.column('course_id', sa.Uuid()), sa.column('submitted_at', sa.DateTime()))
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.UUID(), nullable=False),
+    sa.Column('course_id', sa.UUID(), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.create_index('ix_change_log_entity', ['entity_type', 'entity_id', 'id'], unique=False)
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # The latest documentation submission is the best record of when an existing course last changed
+    op.execute(courses.update().values(updated_at=(
+        sa.select(sa.func.max(documentation.c.submitted_at))
+        .where(documentation.c.course_id == courses.c.id)
+        .scalar_subquery()
+    )))
+
+
+def downgrade():
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('change_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_change_log_entity')
+
+    op.drop_table('change_log')
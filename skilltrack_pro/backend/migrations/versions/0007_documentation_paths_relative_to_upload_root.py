@@ -0,0 +1,36 @@
+"""documentation paths relative to UPLOAD_ROOT
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 23:12:40.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+documentation = sa.table('documentation', sa.column('file_path', sa.String(255)))
+# Uploads used to live in static/uploads/ and were stored with this prefix
+STATIC_PREFIX = 'uploads/'
+
+
+def upgrade():
+    op.execute(
+        documentation.update()
+        .where(documentation.c.file_path.like(STATIC_PREFIX + '%'))
+        .values(file_path=sa.func.substr(documentation.c.file_path, len(STATIC_PREFIX) + 1))
+    )
+
+
+def downgrade():
+    op.execute(
+        documentation.update()
+        .where(documentation.c.file_path != '')
+        .values(file_path=sa.literal(STATIC_PREFIX) + documentation.c.file_path)
+    )
@@ -1,4 +1,5 @@
 import uuid
+from sqlalchemy import DDL, event, func, literal_column
 from sqlalchemy.dialects.postgresql import UUID
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
@@ -42,6 +43,11 @@ class Trainer(db.Model):
     # Relationship: a Trainer can have many courses assigned
     courses = db.relationship('Course', backref='trainer', lazy=True)
 
+    # Each user has at most one trainer profile; also serves the per-request user_id lookup
+    __table_args__ = (
+        db.UniqueConstraint('user_id', name='uq_trainers_user_id'),
+    )
+
     def __repr__(self):
         return f'<Trainer {self.name}>'
 
@@ -53,6 +59,12 @@ class Course(db.Model):
     description = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(50), default='Requested')  # Requested, In Review, Approved, etc.
     scheduled_time = db.Column(db.DateTime, nullable=True)
+    # Session length; scheduled_end is scheduled_time plus this, kept by scheduling.py
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60, server_default='60')
+    scheduled_end = db.Column(db.DateTime, nullable=True)
+    # Set on insert and on every UPDATE, ORM or Core (state_machine, bulk_courses)
+    updated_at = db.Column(db.DateTime, nullable=True, default=db.func.current_timestamp(),
+                           onupdate=db.func.current_timestamp())
 
     # Owner of course (admin user who added)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
@@ -62,9 +74,38 @@ class Course(db.Model):
     # One-to-many with documentation
     documents = db.relationship('Documentation', backref='course', lazy=True)
 
+    __table_args__ = (
+        # Admin pages list courses by status alone
+        db.Index('ix_courses_status', 'status'),
+        # Trainer pages and stats: a trainer's courses, optionally in one status
+        db.Index('ix_courses_trainer_id_status', 'trainer_id', 'status'),
+        # Admin pages: courses the admin requested, in one status
+        db.Index('ix_courses_user_id_status', 'user_id', 'status'),
+        # Calendar windows and conflict checks, per trainer and across the org
+        db.Index('ix_courses_trainer_id_scheduled_time', 'trainer_id', 'scheduled_time'),
+        db.Index('ix_courses_scheduled_time', 'scheduled_time'),
+    )
+
     def __repr__(self):
         return f'<Course {self.title}>'
 
+# On Postgres the database itself refuses to double-book a trainer: no two
+# scheduled courses of one trainer may have overlapping [start, end) ranges.
+# btree_gist lets the GiST index compare trainer_id with '='.
+COURSE_SCHEDULE_EXCLUSION_DDL = (
+    "ALTER TABLE courses ADD CONSTRAINT ex_courses_trainer_schedule EXCLUDE USING gist "
+    "(trainer_id WITH =, tsrange(scheduled_time, scheduled_end) WITH &&) "
+    "WHERE (trainer_id IS NOT NULL AND scheduled_time IS NOT NULL)"
+)
+event.listen(
+    Course.__table__, 'after_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql')
+)
+event.listen(
+    Course.__table__, 'after_create',
+    DDL(COURSE_SCHEDULE_EXCLUSION_DDL).execute_if(dialect='postgresql')
+)
+
 class Documentation(db.Model):
     __tablename__ = 'documentation'
 
@@ -76,13 +117,83 @@ class Documentation(db.Model):
     approved_at = db.Column(db.DateTime, nullable=True)
     rejected_at = db.Column(db.DateTime, nullable=True)
     revision_number = db.Column(db.Integer, default=0)
+    # Content-addressed blob behind file_path (see storage.py); NULL for legacy uploads
+    content_hash = db.Column(db.String(64), db.ForeignKey('stored_blobs.sha256', name='fk_documentation_content_hash'), nullable=True)
+    original_filename = db.Column(db.String(255), nullable=True)
+    # Filled in by the background document processor (see jobs.py)
+    processing_status = db.Column(db.String(20), nullable=True)  # queued, done, failed
+    format_valid = db.Column(db.Boolean, nullable=True)
+    page_count = db.Column(db.Integer, nullable=True)
+    extracted_text = db.Column(db.Text, nullable=True)
+    # Observer holding the review lease in work-queue mode (see review_queue.py)
+    claimed_by = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', name='fk_documentation_claimed_by'), nullable=True)
+    claim_expires_at = db.Column(db.DateTime, nullable=True)
 
     # One-to-many relationship with feedback
     feedbacks = db.relationship('Feedback', backref='documentation', lazy='dynamic', cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Latest revision per course (queries.latest_documentation_by_course, provide_feedback)
+        db.Index('ix_documentation_course_id_revision', 'course_id', 'revision_number', 'submitted_at'),
+        # A course's revision history, newest submission first
+        db.Index('ix_documentation_course_id_submitted_at', 'course_id', 'submitted_at'),
+        db.Index('ix_documentation_status', 'status'),
+        # The observer queues only ever read one status each; partial indexes keep them small
+        db.Index('ix_documentation_pending_submitted_at', 'submitted_at',
+                 postgresql_where=db.text("status = 'Pending' AND file_path <> ''"),
+                 sqlite_where=db.text("status = 'Pending' AND file_path <> ''")),
+        db.Index('ix_documentation_approved_at', 'approved_at',
+                 postgresql_where=db.text("status = 'Approved'"),
+                 sqlite_where=db.text("status = 'Approved'")),
+        db.Index('ix_documentation_rejected_at', 'rejected_at',
+                 postgresql_where=db.text("status = 'Rejected'"),
+                 sqlite_where=db.text("status = 'Rejected'")),
+        # An observer's own claims; only the few leased rows are indexed
+        db.Index('ix_documentation_claimed_by', 'claimed_by', 'claim_expires_at',
+                 postgresql_where=db.text('claimed_by IS NOT NULL'),
+                 sqlite_where=db.text('claimed_by IS NOT NULL')),
+    )
+
     def __repr__(self):
         return f'<Documentation {self.id} for Course {self.course_id}>'
 
+class StoredBlob(db.Model):
+    """One uploaded file's bytes, stored once under its SHA-256 and shared by reference."""
+    __tablename__ = 'stored_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    extension = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f'<StoredBlob {self.sha256[:12]} refs={self.ref_count}>'
+
+class DocumentJob(db.Model):
+    """Durable queue entry for post-upload processing of a Documentation file."""
+    __tablename__ = 'document_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    documentation_id = db.Column(UUID(as_uuid=True), db.ForeignKey('documentation.id'), nullable=False, index=True)
+    kind = db.Column(db.String(50), nullable=False, default='analyze')
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_document_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f'<DocumentJob {self.id} {self.kind} {self.status}>'
+
 class Feedback(db.Model):
     __tablename__ = 'feedback'
 
@@ -92,5 +203,155 @@ class Feedback(db.Model):
     rating = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
 
+    __table_args__ = (
+        # Feedback for a set of documents, newest first (queries.feedbacks_by_documentation)
+        db.Index('ix_feedback_documentation_id_created_at', 'documentation_id', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<Feedback {self.id} for Documentation {self.documentation_id}>'
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+
+    # Scope name, e.g. 'courses' or 'documentation'
+    key = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f'<DataVersion {self.key}={self.version}>'
+
+class ChangeLogEntry(db.Model):
+    """One created or changed course or documentation row; the id is the /api/changes cursor."""
+    __tablename__ = 'change_log'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # course, documentation
+    entity_id = db.Column(UUID(as_uuid=True), nullable=False)
+    # The entity's course (the course itself for a course); no foreign key, the log outlives rows
+    course_id = db.Column(UUID(as_uuid=True), nullable=False)
+    action = db.Column(db.String(20), nullable=False)  # created, or a state_machine transition name
+    status = db.Column(db.String(50), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        # Compaction keeps the newest entry of each entity
+        db.Index('ix_change_log_entity', 'entity_type', 'entity_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<ChangeLogEntry {self.id} {self.entity_type} {self.action}>'
+
+class TrainerDirectoryEntry(db.Model):
+    """Local mirror of Supabase auth users whose role is 'trainer'."""
+    __tablename__ = 'trainer_directory'
+
+    supabase_user_id = db.Column(UUID(as_uuid=True), primary_key=True)
+    email = db.Column(db.String(150), nullable=True)
+    username = db.Column(db.String(150), nullable=True)
+    # Lower-cased copies used for indexed prefix search
+    name_key = db.Column(db.String(150), nullable=True)
+    email_key = db.Column(db.String(150), nullable=True)
+    remote_updated_at = db.Column(db.DateTime, nullable=True)
+    synced_at = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('ix_trainer_directory_name_key', 'name_key', postgresql_ops={'name_key': 'varchar_pattern_ops'}),
+        db.Index('ix_trainer_directory_email_key', 'email_key', postgresql_ops={'email_key': 'varchar_pattern_ops'}),
+    )
+
+    # Same shape the templates used for Supabase users
+    @property
+    def id(self):
+        return self.supabase_user_id
+
+    @property
+    def name(self):
+        return self.username or self.email
+
+    @property
+    def status(self):
+        return 'Active'
+
+    def __repr__(self):
+        return f'<TrainerDirectoryEntry {self.email}>'
+
+class CourseFeedbackSummary(db.Model):
+    """Running feedback totals per course, maintained alongside Feedback inserts."""
+    __tablename__ = 'course_feedback_summary'
+
+    course_id = db.Column(UUID(as_uuid=True), db.ForeignKey('courses.id'), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CourseFeedbackSummary {self.course_id}>'
+
+class DocumentationFeedbackSummary(db.Model):
+    """Running feedback totals per documentation revision."""
+    __tablename__ = 'documentation_feedback_summary'
+
+    documentation_id = db.Column(UUID(as_uuid=True), db.ForeignKey('documentation.id'), primary_key=True)
+    course_id = db.Column(UUID(as_uuid=True), db.ForeignKey('courses.id'), nullable=False, index=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DocumentationFeedbackSummary {self.documentation_id}>'
+
+def search_vector(title, body):
+    """Weighted tsvector over a title (A) and body (B); shared by the GIN index and queries."""
+    english = literal_column("'english'")
+    empty = literal_column("''")
+    return (
+        func.setweight(func.to_tsvector(english, func.coalesce(title, empty)), literal_column("'A'"))
+        .op('||')(func.setweight(func.to_tsvector(english, func.coalesce(body, empty)), literal_column("'B'")))
+    )
+
+class SearchDocument(db.Model):
+    """Searchable text for one course, trainer or documentation revision."""
+    __tablename__ = 'search_documents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # course, trainer, documentation
+    entity_id = db.Column(UUID(as_uuid=True), nullable=False)
+    title = db.Column(db.String(300), nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.UniqueConstraint('entity_type', 'entity_id', name='uq_search_documents_entity'),
+    )
+
+    def __repr__(self):
+        return f'<SearchDocument {self.entity_type} {self.entity_id}>'
+
+# Full-text GIN index over the same expression as search_vector(); only Postgres has
+# tsvector, other databases fall back to the SearchTerm postings below
+SEARCH_FTS_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_fts ON search_documents USING gin "
+    "((setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(body, '')), 'B')))"
+)
+event.listen(
+    SearchDocument.__table__, 'after_create',
+    DDL(SEARCH_FTS_INDEX_DDL).execute_if(dialect='postgresql')
+)
+
+class SearchTerm(db.Model):
+    """Inverted-index posting used when the database has no full-text search."""
+    __tablename__ = 'search_terms'
+
+    term = db.Column(db.String(100), primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('search_documents.id', ondelete='CASCADE'), primary_key=True)
+    weight = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_search_terms_document_id', 'document_id'),
+    )
+
+    def __repr__(self):
+        return f'<SearchTerm {self.term} -> {self.document_id}>'
@@ -0,0 +1,215 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from flask import session, has_request_context
+from flask_login import UserMixin
+from . import data_version
+from .models import User, Trainer, db
+
+# How long a principal is trusted before it is re-read from the database
+PRINCIPAL_TTL_SECONDS = 300
+# Upper bound on principals kept per worker process
+PRINCIPAL_CACHE_SIZE = 2048
+# How long a worker reuses the USERS data version before re-reading it; bounds how
+# long a role or trainer change made through another worker goes unnoticed
+PRINCIPAL_VERSION_SECONDS = 2
+
+SESSION_KEY = 'principal'
+
+TrainerRef = namedtuple('TrainerRef', ['id', 'name'])
+
+
+class Principal(UserMixin):
+    """Lightweight stand-in for User on the request hot path.
+
+    Carries just what the blueprints read from current_user, plus the
+    trainer id so trainer routes need no extra lookup. ``version`` is the
+    USERS data version it was loaded under.
+    """
+
+    def __init__(self, id, username, role, trainer_id=None, trainer_name=None, version=None):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.trainer_id = trainer_id
+        self.trainer_name = trainer_name
+        self.version = version
+
+    def get_id(self):
+        return str(self.id)
+
+    def to_payload(self):
+        return {
+            'id': str(self.id),
+            'username': self.username,
+            'role': self.role,
+            'trainer_id': str(self.trainer_id) if self.trainer_id else None,
+            'trainer_name': self.trainer_name,
+            'version': self.version,
+            'issued': time.time(),
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(
+            id=uuid.UUID(payload['id']),
+            username=payload['username'],
+            role=payload['role'],
+            trainer_id=uuid.UUID(payload['trainer_id']) if payload.get('trainer_id') else None,
+            trainer_name=payload.get('trainer_name'),
+            version=payload.get('version'),
+        )
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+
+class _PrincipalCache:
+    """Bounded LRU of principals with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now and entry[1].version == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, principal):
+        key = principal.get_id()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+
+class _SharedVersion:
+    """The USERS data version, re-read at most every PRINCIPAL_VERSION_SECONDS."""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self._value = None
+        self._read_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not None and now - self._read_at < self.max_age:
+                return self._value
+        value, _ = data_version.current(data_version.USERS)
+        with self._lock:
+            self._value, self._read_at = value, now
+        return value
+
+    def expire(self):
+        with self._lock:
+            self._value = None
+
+
+_cache = _PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_TTL_SECONDS)
+_version = _SharedVersion(PRINCIPAL_VERSION_SECONDS)
+
+
+def _load_from_db(user_id, version):
+    row = (
+        db.session.query(User.id, User.username, User.role, Trainer.id, Trainer.name)
+        .outerjoin(Trainer, Trainer.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return Principal(*row, version=version)
+
+
+def _remember(principal):
+    _cache.put(principal)
+    if has_request_context():
+        session[SESSION_KEY] = principal.to_payload()
+
+
+def load_principal(user_id):
+    """Flask-Login user loader: signed session payload, then LRU, then Postgres.
+
+    Payloads and cached principals are only trusted while the shared USERS
+    data version still matches the one they were loaded under, so a change
+    made through any worker reaches every worker and every session cookie
+    within PRINCIPAL_VERSION_SECONDS.
+    """
+    try:
+        user_uuid = uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+    user_id = str(user_uuid)
+    version = _version.get()
+
+    payload = session.get(SESSION_KEY)
+    if payload and payload.get('id') == user_id and payload.get('version') == version:
+        if time.time() - payload.get('issued', 0) < PRINCIPAL_TTL_SECONDS:
+            return Principal.from_payload(payload)
+
+    principal = _cache.get(user_id, version)
+    if principal is None:
+        principal = _load_from_db(user_uuid, version)
+        if principal is None:
+            return None
+    _remember(principal)
+    return principal
+
+
+def remember_user(user):
+    """Seed the session and cache right after login_user()."""
+    _cache.invalidate(user.id)
+    principal = _load_from_db(user.id, _version.get())
+    if principal is not None:
+        _remember(principal)
+
+
+def invalidate_principal(user_id):
+    """Forget a user's cached principal after a role or trainer change.
+
+    Bumps the USERS data version in the caller's transaction, so call it
+    before db.session.commit(); other workers and the user's own session
+    cookie drop their copies once the commit lands.
+    """
+    data_version.bump(data_version.USERS)
+    _version.expire()
+    _cache.invalidate(user_id)
+    payload = session.get(SESSION_KEY) if has_request_context() else None
+    if payload and payload.get('id') == str(user_id):
+        session.pop(SESSION_KEY, None)
+
+
+def current_trainer_ref(principal):
+    """Trainer id and name for a principal, without a query when already known."""
+    trainer_id = getattr(principal, 'trainer_id', None)
+    if trainer_id is None:
+        return None
+    return TrainerRef(trainer_id, principal.trainer_name)
+
+
+def cache_info():
+    return {
+        'hits': _cache.hits,
+        'misses': _cache.misses,
+        'entries': len(_cache._entries),
+        'ttl_seconds': PRINCIPAL_TTL_SECONDS,
+    }
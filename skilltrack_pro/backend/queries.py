@@ -0,0 +1,106 @@
+from collections import defaultdict
+from sqlalchemy import Select, and_, select, func
+from sqlalchemy.orm import joinedload
+from .models import Course, Documentation, Feedback
+
+
+def _documentation_with_course():
+    """Documentation query that loads its course and the course trainer in the same SELECT."""
+    return Documentation.query.options(
+        joinedload(Documentation.course).joinedload(Course.trainer)
+    )
+
+
+def pending_documentation_query():
+    """Pending documents that actually have a file attached, oldest first."""
+    return _documentation_with_course().filter(
+        and_(Documentation.status == 'Pending', Documentation.file_path.isnot(None), Documentation.file_path != '')
+    ).order_by(Documentation.submitted_at)
+
+
+def claimed_documentation_query(observer_id, now):
+    """Pending documents whose review lease ``observer_id`` holds at ``now``, oldest first."""
+    return _documentation_with_course().filter(
+        Documentation.claimed_by == observer_id,
+        Documentation.claim_expires_at > now,
+        Documentation.status == 'Pending',
+    ).order_by(Documentation.submitted_at)
+
+
+def approved_documentation_query():
+    return _documentation_with_course().filter(
+        Documentation.status == 'Approved'
+    ).order_by(Documentation.approved_at.desc())
+
+
+def rejected_documentation_query():
+    return _documentation_with_course().filter(
+        Documentation.status == 'Rejected'
+    ).order_by(Documentation.rejected_at.desc())
+
+
+def documentation_with_course(doc_id):
+    """Load one document together with its course and trainer, or 404."""
+    return _documentation_with_course().filter(Documentation.id == doc_id).first_or_404()
+
+
+def _ids(ids):
+    """A SELECT of ids as is, anything else as a list; None when that list is empty."""
+    if isinstance(ids, Select):
+        return ids
+    return list(ids) or None
+
+
+def latest_documentation_ids(course_ids, status=None):
+    """SELECT of the id of each course's latest documentation revision.
+
+    Ranks each course's documents with ROW_NUMBER() over revision_number
+    (newest submission breaking ties) and keeps rank 1. With ``status`` only
+    documents in that status are considered. ``course_ids`` is a list of ids
+    or, for large sets, a SELECT of them, e.g.
+    select(Course.id).where(Course.status == 'Rejected'), which keeps the
+    ids in the database instead of binding one parameter per course.
+    """
+    rank = func.row_number().over(
+        partition_by=Documentation.course_id,
+        order_by=(Documentation.revision_number.desc(), Documentation.submitted_at.desc())
+    )
+    ranked = select(Documentation.id, rank.label('rank')).where(Documentation.course_id.in_(course_ids))
+    if status is not None:
+        ranked = ranked.where(Documentation.status == status)
+    ranked = ranked.subquery()
+    return select(ranked.c.id).where(ranked.c.rank == 1)
+
+
+def latest_documentation_by_course(course_ids, status=None):
+    """Latest revision of documentation for each course, in one query.
+
+    Takes the same arguments as latest_documentation_ids(). Returns a dict
+    of course id -> Documentation; courses without documentation are
+    missing from the dict.
+    """
+    course_ids = _ids(course_ids)
+    if course_ids is None:
+        return {}
+    latest = Documentation.query.filter(Documentation.id.in_(latest_documentation_ids(course_ids, status)))
+    return {doc.course_id: doc for doc in latest}
+
+
+def feedbacks_by_documentation(doc_ids):
+    """Fetch feedback for many documents in one query, newest first.
+
+    Returns a dict of documentation id -> list of Feedback; documents without
+    feedback are simply missing from the dict.
+    """
+    doc_ids = _ids(doc_ids)
+    grouped = defaultdict(list)
+    if doc_ids is None:
+        return grouped
+    feedbacks = (
+        Feedback.query
+        .filter(Feedback.documentation_id.in_(doc_ids))
+        .order_by(Feedback.created_at.desc())
+    )
+    for fb in feedbacks:
+        grouped[fb.documentation_id].append(fb)
+    return grouped
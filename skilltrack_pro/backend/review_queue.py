@@ -0,0 +1,130 @@
+"""Observer work queue: pending documents claimed under a time-limited lease.
+
+With REVIEW_QUEUE_MODE=claim, observers no longer pick from the shared
+pending list. Each observer claims the next few documents, oldest first,
+and holds them for LEASE_SECONDS. A claim is one UPDATE over a
+SELECT ... FOR UPDATE SKIP LOCKED: concurrent observers skip the rows
+another claim is taking, so they get disjoint documents without waiting.
+Deciding a document releases its lease. An abandoned lease just expires,
+and the document is claimable again; no sweeper is needed.
+
+Decisions are guarded in both modes. settle() only records a decision on
+a document that is still pending and not leased to another observer, so
+two observers can never both decide the same document.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select, update
+from . import state_machine
+from .models import Documentation, db
+from .queries import claimed_documentation_query
+
+# How long a claimed document stays reserved for its observer
+LEASE_SECONDS = 15 * 60
+# Documents claimed per "claim next" by default, and the most one observer may hold
+CLAIM_BATCH = 5
+MAX_CLAIMED = 20
+
+
+def _claimable(now):
+    return and_(
+        Documentation.status == 'Pending',
+        Documentation.file_path.isnot(None),
+        Documentation.file_path != '',
+        or_(Documentation.claimed_by.is_(None), Documentation.claim_expires_at <= now),
+    )
+
+
+def _free_for(observer_id, now):
+    return or_(
+        Documentation.claimed_by.is_(None),
+        Documentation.claimed_by == observer_id,
+        Documentation.claim_expires_at <= now,
+    )
+
+
+def claimed_reviews(observer_id):
+    """Documents ``observer_id`` holds a live lease on, with course and trainer loaded."""
+    return claimed_documentation_query(observer_id, datetime.utcnow()).all()
+
+
+def claim_reviews(observer_id, limit=CLAIM_BATCH):
+    """Lease up to ``limit`` more pending documents to ``observer_id``; return the ids claimed.
+
+    Never takes an observer past MAX_CLAIMED live leases. Commits.
+    """
+    now = datetime.utcnow()
+    held = db.session.scalar(
+        select(func.count(Documentation.id)).where(
+            Documentation.claimed_by == observer_id,
+            Documentation.claim_expires_at > now,
+            Documentation.status == 'Pending',
+        )
+    )
+    limit = min(limit, MAX_CLAIMED - held)
+    if limit <= 0:
+        return []
+    candidates = (
+        select(Documentation.id)
+        .where(_claimable(now))
+        .order_by(Documentation.submitted_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.session.execute(
+        update(Documentation)
+        .where(Documentation.id.in_(candidates))
+        .values(claimed_by=observer_id, claim_expires_at=now + timedelta(seconds=LEASE_SECONDS))
+        .returning(Documentation.id),
+        execution_options={'synchronize_session': False},
+    ).scalars().all()
+    db.session.commit()
+    return claimed
+
+
+def claim(doc_id, observer_id):
+    """Lease one document (or renew the caller's lease); False if another observer holds it. Commits."""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(Documentation)
+        .where(Documentation.id == doc_id, Documentation.status == 'Pending', _free_for(observer_id, now))
+        .values(claimed_by=observer_id, claim_expires_at=now + timedelta(seconds=LEASE_SECONDS)),
+        execution_options={'synchronize_session': False},
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def release(doc_id, observer_id):
+    """Give a leased document back to the queue before the lease runs out. Commits."""
+    db.session.execute(
+        update(Documentation)
+        .where(Documentation.id == doc_id, Documentation.claimed_by == observer_id)
+        .values(claimed_by=None, claim_expires_at=None),
+        execution_options={'synchronize_session': False},
+    )
+    db.session.commit()
+
+
+def settle(doc_id, observer_id, decision, values=None, returning=()):
+    """Record ``decision`` ('approve' or 'reject') on ``doc_id`` in the caller's transaction and drop its lease.
+
+    The DOCUMENTATION transition only matches a document that is still
+    pending and not leased to another observer. Returns the changed row
+    (see state_machine.StateMachine.apply), or None, changing nothing, when
+    the document was decided already or is leased to someone else. The
+    UPDATE takes the row lock, so of two concurrent decisions only the
+    first matches. The second re-checks the row after the first commits
+    and finds it no longer pending.
+    """
+    return state_machine.DOCUMENTATION.apply(
+        decision, doc_id, _free_for(observer_id, datetime.utcnow()),
+        values={'claimed_by': None, 'claim_expires_at': None, **(values or {})},
+        returning=returning,
+    )
+
+
+def leased_until(doc, observer_id):
+    """When another observer's live lease on ``doc`` runs out, or None if ``observer_id`` may decide it."""
+    if doc.claimed_by in (None, observer_id) or doc.claim_expires_at is None:
+        return None
+    return doc.claim_expires_at if doc.claim_expires_at > datetime.utcnow() else None
@@ -1,44 +1,41 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import uuid
+from flask import Blueprint, abort, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from .models import Trainer, Course, Documentation, Feedback, db
-from sqlalchemy import or_
-from datetime import datetime
-from .supabase_client import supabase  # Import your initialized Supabase client
+from .models import User, Trainer, Course, CourseFeedbackSummary, db
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from . import changes, course_stats, data_version, events, fragment_cache, state_machine
+from .trainer_directory import search_trainers
+from .principal import invalidate_principal
+from .queries import latest_documentation_by_course, latest_documentation_ids, feedbacks_by_documentation
+from .search import index_course, index_trainer
+from .scheduling import ScheduleConflict, schedule, validate_duration
+from .bulk_courses import ImportFormatError, detect_format, import_courses, parse_schedule_time, read_rows, schedule_courses
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
-def get_all_trainers():
-    try:
-        response = supabase.auth.admin.list_users()
-        if response.error:
-            raise Exception(response.error.message)
-        # Filter users with role 'trainer' in user_metadata
-        trainers = [user for user in response.data['users'] if user['user_metadata'].get('role') == 'trainer']
-        return trainers
-    except Exception as e:
-        print(f"Failed to get trainers from Supabase: {e}")
-        return []
+# Row errors shown as flash messages after a bulk upload; the API returns all of them
+MAX_FLASHED_ERRORS = 5
+# Data the approved/rejected course lists show; every admin sees the same lists
+COURSE_LIST_VERSIONS = (data_version.COURSES, data_version.DOCUMENTATION, data_version.TRAINERS)
 
 # Dashboard - show summary counts of courses by status
 @admin_bp.route('/dashboard')
 @login_required
 def dashboard():
-    requested_count = Course.query.filter_by(status='Requested').count()
-    in_review_count = Course.query.filter_by(status='In Review').count()
-    approved_count = Course.query.filter_by(status='Approved').count()
-    rejected_count = Course.query.filter_by(status='Rejected').count()
-    completed_count = Course.query.filter_by(status='Completed').count()
+    counts = course_stats.get_course_counts()
 
     return render_template(
         'admin_dashboard.html',
-        requested_count=requested_count,
-        in_review_count=in_review_count,
-        approved_count=approved_count,
-        rejected_count=rejected_count,
-        completed_count=completed_count
+        requested_count=counts['requested'],
+        in_review_count=counts['in_review'],
+        approved_count=counts['approved'],
+        rejected_count=counts['rejected'],
+        completed_count=counts['completed']
     )
 
-# Manage Trainers - list (from Supabase), add new locally or via Supabase API, filter
+# Manage Trainers - list (Supabase mirror), add new locally or via Supabase API, filter
 @admin_bp.route('/trainers', methods=['GET', 'POST'])
 @login_required
 def manage_trainers():
@@ -49,35 +46,44 @@ def manage_trainers():
         # Optional: Call your add_trainer() helper here to register in Supabase Auth with role 'trainer'
         # For now, we add locally as backup or for profile storing
         if trainer_name and trainer_email:
-            # You can add logic to add trainer to Supabase here
-            new_trainer = Trainer(name=trainer_name, user_id=current_user.id, status='Active')
+            # A trainer profile belongs to the trainer's own account (one per user)
+            user = User.query.filter_by(email=trainer_email.strip()).first()
+            if user is None:
+                flash('No user is registered with that email', 'danger')
+                return redirect(url_for('admin.manage_trainers'))
+            if Trainer.query.filter_by(user_id=user.id).first():
+                flash('That user already has a trainer profile', 'warning')
+                return redirect(url_for('admin.manage_trainers'))
+            new_trainer = Trainer(name=trainer_name, user_id=user.id, status='Active')
             db.session.add(new_trainer)
+            db.session.flush()
+            index_trainer(new_trainer)
+            data_version.bump(data_version.TRAINERS)
             db.session.commit()
             flash('Trainer added successfully', 'success')
             return redirect(url_for('admin.manage_trainers'))
 
-    # Fetch trainers from Supabase Auth
-    supabase_trainers = get_all_trainers()
-
-    # Optionally filter trainers on name/email from Supabase list
-    if search_query:
-        supabase_trainers = [
-            t for t in supabase_trainers if search_query.lower() in t['user_metadata'].get('username', '').lower()
-            or search_query.lower() in t.get('email', '').lower()
-        ]
+    # Trainers come from the local mirror of Supabase Auth, searched by name/email prefix
+    trainers = search_trainers(search_query)
 
-    return render_template('admin_trainers.html', trainers=supabase_trainers)
+    return render_template('admin_trainers.html', trainers=trainers)
 
 # Edit Trainer info (local DB)
 @admin_bp.route('/trainers/<uuid:id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_trainer(id):
-    trainer = Trainer.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    # Any signed-in user reaches this blueprint; only admins may change another user's trainer profile
+    if current_user.role != 'admin':
+        abort(403)
+    trainer = Trainer.query.filter_by(id=id).first_or_404()
     if request.method == 'POST':
         trainer.name = request.form.get('name', trainer.name)
         status = request.form.get('status')
         if status in ['Active', 'Inactive']:
             trainer.status = status
+        index_trainer(trainer)
+        data_version.bump(data_version.TRAINERS)
+        invalidate_principal(trainer.user_id)
         db.session.commit()
         flash('Trainer updated successfully', 'success')
         return redirect(url_for('admin.manage_trainers'))
@@ -100,38 +106,64 @@ def request_course():
             status='Requested'
         )
         db.session.add(new_course)
+        db.session.flush()
+        index_course(new_course)
+        changes.course_created(new_course)
+        events.course_status_changed(new_course, None)
+        data_version.bump(data_version.COURSES)
         db.session.commit()
+        course_stats.invalidate()
         flash('Course request submitted', 'success')
         return redirect(url_for('admin.dashboard'))
 
-    trainers = get_all_trainers()  # Get trainers live
+    trainers = search_trainers()
     return render_template('admin_course_request.html', trainers=trainers)
 
 @admin_bp.route('/courses/schedule', methods=['GET', 'POST'])
 @login_required
 def schedule_course():
     if request.method == 'POST':
-        course_id = request.form.get('course_id')
+        course_id = request.form.get('course_id', type=uuid.UUID)
         datetime_str = request.form.get('datetime')
 
         # Fetch course owned by current admin and in 'In Review' status
-        course = Course.query.filter_by(status='In Review', user_id=current_user.id).all()
+        course = Course.query.filter_by(id=course_id, status='In Review', user_id=current_user.id).first()
+        if course is None:
+            flash('Course not found or no longer awaiting a time slot', 'danger')
+            return redirect(url_for('admin.schedule_course'))
 
         try:
-            if datetime_str:
-                try:
-                    parsed_datetime = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S.%f')
-                except ValueError:
-                    parsed_datetime = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-                course.scheduled_time = parsed_datetime
-            else:
-                course.scheduled_time = None
+            start = parse_schedule_time(datetime_str) if datetime_str else None
         except ValueError as e:
             flash(f'Invalid datetime format. Use YYYY-MM-DD HH:MM:SS. Error: {str(e)}', 'danger')
             return redirect(url_for('admin.schedule_course'))
 
-        course.status = 'Approved'
-        db.session.commit()
+        try:
+            schedule(course, start, validate_duration(request.form.get('duration_minutes')))
+        except (ScheduleConflict, ValueError) as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('admin.schedule_course'))
+
+        try:
+            # The slot was checked against this trainer; a course moved or reassigned meanwhile matches nothing
+            moved = state_machine.COURSE.apply(
+                'schedule', course.id, Course.user_id == current_user.id,
+                Course.trainer_id.is_not_distinct_from(course.trainer_id),
+                returning=(Course.title, Course.trainer_id),
+            )
+            if moved is None:
+                db.session.rollback()
+                flash('Course not found or no longer awaiting a time slot', 'danger')
+                return redirect(url_for('admin.schedule_course'))
+            events.course_status_changed(moved, moved.previous_status, moved.trainer_id)
+            data_version.bump(data_version.COURSES)
+            db.session.commit()
+        except IntegrityError:
+            # ex_courses_trainer_schedule: a concurrent booking took the slot
+            db.session.rollback()
+            flash('The trainer was booked for that time in the meantime', 'danger')
+            return redirect(url_for('admin.schedule_course'))
+        course_stats.invalidate()
         flash('Time slot assigned successfully', 'success')
         return redirect(url_for('admin.dashboard'))
 
@@ -140,63 +172,91 @@ def schedule_course():
     return render_template('admin_schedule.html', courses=courses)
 
 
+@admin_bp.route('/courses/import', methods=['POST'])
+@login_required
+def import_courses_file():
+    _run_bulk_upload(import_courses, 'courses imported')
+    return redirect(url_for('admin.request_course'))
+
+@admin_bp.route('/courses/schedule/bulk', methods=['POST'])
+@login_required
+def schedule_courses_file():
+    _run_bulk_upload(schedule_courses, 'courses scheduled')
+    return redirect(url_for('admin.schedule_course'))
+
+def _run_bulk_upload(action, done_message):
+    if current_user.role != 'admin':
+        abort(403)
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Choose a CSV or JSON file to upload', 'danger')
+        return
+    try:
+        rows = read_rows(upload.stream, detect_format(upload.filename, upload.mimetype))
+        report = action(rows, current_user.id)
+    except ImportFormatError as e:
+        flash(str(e), 'danger')
+        return
+    flash(f'{report.accepted} of {report.rows} {done_message}', 'success' if report.accepted else 'warning')
+    for error in report.errors[:MAX_FLASHED_ERRORS]:
+        flash(f"Row {error['row']}: {error['error']}", 'danger')
+    if report.rejected > MAX_FLASHED_ERRORS:
+        flash(f'{report.rejected - MAX_FLASHED_ERRORS} more rows were skipped', 'danger')
+
 # View rejected courses and feedback
 @admin_bp.route('/rejected_courses')
 @login_required
 def rejected_courses():
-    rejected_courses = Course.query.filter_by(status='Rejected').all()
+    table = fragment_cache.render('fragments/rejected_courses_table.html', 'admin', COURSE_LIST_VERSIONS,
+                                  _rejected_courses)
+    return render_template('admin_rejected_courses.html', table=table)
 
-    course_feedback = {}
-    for course in rejected_courses:
-        latest_doc = Documentation.query.filter_by(course_id=course.id).order_by(
-            Documentation.revision_number.desc()).first()
-        if latest_doc:
-            feedbacks = Feedback.query.filter_by(documentation_id=latest_doc.id).all()
-            course_feedback[course.id] = feedbacks
+def _rejected_courses():
+    rejected_courses = Course.query.options(joinedload(Course.trainer)).filter_by(status='Rejected').all()
 
-    return render_template('admin_rejected_courses.html',
-                           rejected_courses=rejected_courses,
-                           course_feedback=course_feedback)
+    # Ids stay in the database: binding one parameter per course outgrows SQLite's limit
+    rejected_ids = select(Course.id).where(Course.status == 'Rejected')
+    latest_docs = latest_documentation_by_course(rejected_ids)
+    feedbacks = feedbacks_by_documentation(latest_documentation_ids(rejected_ids))
+    course_feedback = {
+        course_id: feedbacks[doc.id]
+        for course_id, doc in latest_docs.items() if doc.id in feedbacks
+    }
+    return {'rejected_courses': rejected_courses, 'course_feedback': course_feedback}
 
 # View approved courses and latest approved docs
 @admin_bp.route('/approved_courses')
 @login_required
 def approved_courses():
-    courses = Course.query.filter_by(status='Approved').all()
+    table = fragment_cache.render('fragments/approved_courses_table.html', 'admin', COURSE_LIST_VERSIONS,
+                                  _approved_courses)
+    return render_template('admin_approved_courses.html', table=table)
 
-    approved_docs_map = {}
-    for c in courses:
-        latest_doc = Documentation.query.filter_by(course_id=c.id, status='Approved').order_by(
-            Documentation.revision_number.desc()).first()
-        if latest_doc:
-            approved_docs_map[c.id] = latest_doc
+def _approved_courses():
+    courses = Course.query.options(joinedload(Course.trainer)).filter_by(status='Approved').all()
 
-    return render_template('admin_approved_courses.html', courses=courses, approved_docs_map=approved_docs_map)
+    approved_ids = select(Course.id).where(Course.status == 'Approved')
+    approved_docs_map = latest_documentation_by_course(approved_ids, status='Approved')
+    return {'courses': courses, 'approved_docs_map': approved_docs_map}
 
 # Feedback summary page
 @admin_bp.route('/feedback')
 @login_required
 def feedback():
-    feedback_data = []
-    courses = Course.query.filter_by(user_id=current_user.id, status='Completed').all()
-    for course in courses:
-        total_rating = 0
-        total_feedback = 0
-        comments_count = 0
-
-        for doc in course.documents:
-            for feedback in doc.feedbacks:
-                if feedback.rating is not None:
-                    total_rating += feedback.rating
-                    total_feedback += 1
-                comments_count += 1
-
-        avg_rating = round(total_rating / total_feedback, 2) if total_feedback > 0 else 0
+    rows = (
+        db.session.query(Course.title, CourseFeedbackSummary.rating_sum,
+                         CourseFeedbackSummary.rating_count, CourseFeedbackSummary.comment_count)
+        .outerjoin(CourseFeedbackSummary, CourseFeedbackSummary.course_id == Course.id)
+        .filter(Course.user_id == current_user.id, Course.status == 'Completed')
+    )
 
+    feedback_data = []
+    for title, rating_sum, rating_count, comment_count in rows:
+        avg_rating = round(rating_sum / rating_count, 2) if rating_count else 0
         feedback_data.append({
-            "course": course.title,
+            "course": title,
             "average_rating": avg_rating,
-            "comments": comments_count
+            "comments": comment_count or 0
         })
 
     return render_template('admin_feedback.html', feedback_summary=feedback_data)
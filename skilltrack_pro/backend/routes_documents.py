@@ -0,0 +1,82 @@
+import mimetypes
+import os
+from flask import Blueprint, Response, abort, current_app, request, send_file
+from flask_login import current_user, login_required
+from .models import Course, Documentation, db
+from .storage import resolve_path
+
+documents_bp = Blueprint('documents', __name__, url_prefix='/documents')
+
+# DOCUMENT_SEND_MODE values: Python streams the file itself, or the front-end proxy does
+SEND_MODE_PYTHON = 'python'
+SEND_MODE_X_SENDFILE = 'x-sendfile'   # Apache mod_xsendfile, lighttpd
+SEND_MODE_X_ACCEL = 'x-accel'         # nginx internal location
+
+
+def _offloaded_response(doc, path, download_name, as_attachment):
+    """Headers-only response that tells the proxy to send the file.
+
+    The proxy serves the bytes (including Range requests), so the worker is
+    released as soon as the headers are written.
+    """
+    mode = current_app.config['DOCUMENT_SEND_MODE']
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    response = Response(mimetype=mimetype)
+    if mode == SEND_MODE_X_ACCEL:
+        prefix = current_app.config['DOCUMENT_ACCEL_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f'{prefix}/{doc.file_path}'
+    else:
+        response.headers['X-Sendfile'] = path
+    disposition = 'attachment' if as_attachment else 'inline'
+    response.headers['Content-Disposition'] = f'{disposition}; filename="{download_name}"'
+    response.set_etag(doc.content_hash or f'{doc.id}-{int(os.path.getmtime(path))}')
+    return response.make_conditional(request)
+
+
+def _may_download(course_trainer_id):
+    """Admins and observers read every document; a trainer only those of their own courses."""
+    if current_user.role in ('admin', 'observer'):
+        return True
+    trainer_id = getattr(current_user, 'trainer_id', None)
+    return current_user.role == 'trainer' and trainer_id is not None and trainer_id == course_trainer_id
+
+
+@documents_bp.route('/<uuid:doc_id>/download')
+@login_required
+def download(doc_id):
+    row = (
+        db.session.query(Documentation, Course.trainer_id)
+        .join(Course, Course.id == Documentation.course_id)
+        .filter(Documentation.id == doc_id)
+        .first()
+    )
+    if row is None or not row[0].file_path:
+        abort(404)
+    doc, course_trainer_id = row
+    if not _may_download(course_trainer_id):
+        abort(403)
+    try:
+        path = resolve_path(doc.file_path)
+    except ValueError:
+        abort(404)
+    if not os.path.isfile(path):
+        abort(404)
+
+    download_name = doc.original_filename or os.path.basename(doc.file_path)
+    as_attachment = request.args.get('download') == '1'
+
+    if current_app.config['DOCUMENT_SEND_MODE'] in (SEND_MODE_X_SENDFILE, SEND_MODE_X_ACCEL):
+        response = _offloaded_response(doc, path, download_name, as_attachment)
+    else:
+        # conditional=True gives If-None-Match/If-Modified-Since and Range support;
+        # blob-backed documents use their SHA-256 as a strong ETag
+        response = send_file(
+            path,
+            download_name=download_name,
+            as_attachment=as_attachment,
+            conditional=True,
+            etag=doc.content_hash or True,
+            max_age=None,
+        )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,86 +1,142 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_required
-from .models import Documentation, Feedback, Course, Trainer, db
-from sqlalchemy import and_
+from flask import Blueprint, abort, current_app, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from .models import Course, Documentation, db
 from datetime import datetime
+from . import course_stats, data_version, events, fragment_cache, review_queue, state_machine
+from .feedback_rollups import record_feedback
+from .queries import (
+    pending_documentation_query,
+    approved_documentation_query,
+    rejected_documentation_query,
+    documentation_with_course,
+    feedbacks_by_documentation,
+)
 
 observer_bp = Blueprint('observer', __name__, url_prefix='/observer')
 
+# Data the review lists show: documents and feedback, course titles, trainer names.
+# Every observer sees the same lists, so they share one cached copy.
+REVIEW_LIST_VERSIONS = (data_version.DOCUMENTATION, data_version.COURSES, data_version.TRAINERS)
+
+def _dashboard_lists():
+    # Documents with actual files and status Pending, Approved, Rejected
+    pending_docs = pending_documentation_query().all()
+    approved_docs = approved_documentation_query().all()
+    rejected_docs = rejected_documentation_query().all()
+    return {
+        'pending_docs': pending_docs,
+        'approved_docs': approved_docs,
+        'rejected_docs': rejected_docs,
+        'rejected_feedback': feedbacks_by_documentation(doc.id for doc in rejected_docs),
+    }
+
 @observer_bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Documents with actual files and status Pending, Approved, Rejected
-    pending_docs = Documentation.query.filter(
-        and_(Documentation.status == 'Pending', Documentation.file_path.isnot(None), Documentation.file_path != '')
-    ).all()
-    approved_docs = Documentation.query.filter_by(status='Approved').all()
-    rejected_docs = Documentation.query.filter_by(status='Rejected').all()
-
-    return render_template(
-        'observer_dashboard.html',
-        pending_docs=pending_docs,
-        approved_docs=approved_docs,
-        rejected_docs=rejected_docs
-    )
+    lists = fragment_cache.render('fragments/observer_dashboard_lists.html', 'observer',
+                                  REVIEW_LIST_VERSIONS, _dashboard_lists)
+    return render_template('observer_dashboard.html', lists=lists)
 
 @observer_bp.route('/review/<uuid:doc_id>', methods=['GET', 'POST'])
 @login_required
 def review_documentation(doc_id):
-    doc = Documentation.query.get_or_404(doc_id)
-    course = Course.query.get(doc.course_id)
-    trainer = Trainer.query.get(course.trainer_id)
-
     if request.method == 'POST':
-        action = request.form.get('action')
-        feedback_text = request.form.get('feedback', '').strip()
-
-        if action == 'approve':
-            doc.status = 'Approved'
-            doc.approved_at = datetime.utcnow()
-            course.status = 'Approved'
-            flash('Documentation approved successfully.', 'success')
-
-        elif action == 'reject':
-            if not feedback_text:
-                flash('Please provide feedback when rejecting a document.', 'danger')
-                return redirect(url_for('observer.review_documentation', doc_id=doc_id))
-            doc.status = 'Rejected'
-            doc.rejected_at = datetime.utcnow()
-            course.status = 'Rejected'
-            feedback = Feedback(
-                documentation_id=doc.id,
-                comments=feedback_text,
-                created_at=datetime.utcnow()
-            )
-            db.session.add(feedback)
-            flash('Documentation rejected and feedback recorded.', 'warning')
-
-        # Increment revision number
-        doc.revision_number = (doc.revision_number or 0) + 1
-
-        db.session.commit()
-        return redirect(url_for('observer.dashboard'))
-
-    feedbacks = Feedback.query.filter_by(documentation_id=doc.id).order_by(Feedback.created_at.desc()).all()
+        return _decide(doc_id)
+
+    doc = documentation_with_course(doc_id)
+    course = doc.course
+    trainer = course.trainer
+
+    if _claim_mode() and doc.status == 'Pending':
+        # Opening a document in work-queue mode takes (or renews) its lease
+        review_queue.claim(doc.id, current_user.id)
+        db.session.refresh(doc)
+    feedbacks = feedbacks_by_documentation([doc.id]).get(doc.id, [])
 
     return render_template(
         'review_documentation.html',
         doc=doc,
         course=course,
         trainer=trainer,
-        feedbacks=feedbacks
+        feedbacks=feedbacks,
+        leased_until=review_queue.leased_until(doc, current_user.id),
     )
 
+def _decide(doc_id):
+    action = request.form.get('action')
+    feedback_text = request.form.get('feedback', '').strip()
+    if action not in ('approve', 'reject'):
+        flash('Unknown review action.', 'danger')
+        return redirect(url_for('observer.review_documentation', doc_id=doc_id))
+    if action == 'reject' and not feedback_text:
+        flash('Please provide feedback when rejecting a document.', 'danger')
+        return redirect(url_for('observer.review_documentation', doc_id=doc_id))
+
+    now = datetime.utcnow()
+    decided_at = {'approve': Documentation.approved_at, 'reject': Documentation.rejected_at}[action]
+    # One compare-and-set UPDATE: only one observer's decision lands, however many submit at once
+    doc = review_queue.settle(
+        doc_id, current_user.id, action,
+        values={decided_at.key: now, 'revision_number': func.coalesce(Documentation.revision_number, 0) + 1},
+        returning=(Documentation.file_path, Documentation.submitted_at),
+    )
+    if doc is None:
+        db.session.rollback()
+        if db.session.get(Documentation, doc_id) is None:
+            abort(404)
+        flash('This document was already reviewed or is being reviewed by another observer.', 'warning')
+        return redirect(url_for('observer.pending_reviews'))
+    # None for a course the decision may not move, e.g. one already Completed
+    course = state_machine.COURSE.apply(action, doc.course_id, returning=(Course.title, Course.trainer_id))
+
+    if action == 'reject':
+        record_feedback(doc, feedback_text, created_at=now)
+        flash('Documentation rejected and feedback recorded.', 'warning')
+    else:
+        flash('Documentation approved successfully.', 'success')
+
+    if course is not None:
+        events.course_status_changed(course, course.previous_status, course.trainer_id)
+    events.documentation_status_changed(doc, doc.previous_status, course)
+    data_version.bump(data_version.COURSES, data_version.DOCUMENTATION)
+    db.session.commit()
+    course_stats.invalidate()
+    return redirect(url_for('observer.dashboard'))
+
+def _claim_mode():
+    return current_app.config.get('REVIEW_QUEUE_MODE') == 'claim'
+
 @observer_bp.route('/pending_reviews')
 @login_required
 def pending_reviews():
-    pending_docs = Documentation.query.filter(
-        and_(Documentation.status == 'Pending', Documentation.file_path.isnot(None), Documentation.file_path != '')
-    ).all()
-    return render_template('pending_reviews.html', pending_docs=pending_docs)
+    if _claim_mode():
+        return render_template('review_queue.html', docs=review_queue.claimed_reviews(current_user.id),
+                               claim_batch=review_queue.CLAIM_BATCH, max_claimed=review_queue.MAX_CLAIMED)
+    table = fragment_cache.render('fragments/pending_reviews_table.html', 'observer', REVIEW_LIST_VERSIONS,
+                                  lambda: {'pending_docs': pending_documentation_query().all()})
+    return render_template('pending_reviews.html', table=table)
 
 @observer_bp.route('/completed_reviews')
 @login_required
 def completed_reviews():
-    completed_docs = Documentation.query.filter_by(status='Approved').all()
-    return render_template('completed_reviews.html', completed_docs=completed_docs)
+    table = fragment_cache.render('fragments/completed_reviews_table.html', 'observer', REVIEW_LIST_VERSIONS,
+                                  lambda: {'completed_docs': approved_documentation_query().all()})
+    return render_template('completed_reviews.html', table=table)
+
+@observer_bp.route('/queue/claim', methods=['POST'])
+@login_required
+def claim_reviews():
+    claimed = review_queue.claim_reviews(current_user.id, request.form.get('count', review_queue.CLAIM_BATCH, type=int))
+    if claimed:
+        flash(f'Claimed {len(claimed)} document(s) for review.', 'success')
+    else:
+        flash('Nothing left to claim right now.', 'info')
+    return redirect(url_for('observer.pending_reviews'))
+
+@observer_bp.route('/queue/<uuid:doc_id>/release', methods=['POST'])
+@login_required
+def release_review(doc_id):
+    review_queue.release(doc_id, current_user.id)
+    flash('Document returned to the queue.', 'info')
+    return redirect(url_for('observer.pending_reviews'))
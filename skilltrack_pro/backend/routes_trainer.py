@@ -1,9 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy import or_
-import os
-from .models import Course, Trainer, Feedback, Documentation, db
+from sqlalchemy.exc import IntegrityError
+from .models import Course, Trainer, Documentation, db
+from . import changes, course_stats, data_version, events, fragment_cache, state_machine
+from .principal import current_trainer_ref, invalidate_principal, TrainerRef
+from .feedback_rollups import record_feedback
+from .storage import store_upload, UploadTooLarge
+from .jobs import enqueue_document_processing
+from .search import index_trainer
+from .queries import feedbacks_by_documentation
+from .scheduling import ScheduleConflict, check_assignment
 
 trainer_bp = Blueprint('trainer', __name__, url_prefix='/trainer')
 
@@ -13,43 +21,54 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def get_or_create_current_trainer():
-    """Fetch or create a Trainer record for the logged-in user."""
+    """Return the (id, name) of the logged-in user's Trainer, creating it if needed.
+
+    The trainer id normally comes with the cached principal, so this only
+    touches the database the first time a trainer signs in.
+    """
+    trainer = current_trainer_ref(current_user)
+    if trainer:
+        return trainer
     trainer = Trainer.query.filter_by(user_id=current_user.id).first()
     if not trainer:
-        default_name = getattr(current_user, 'username', None) or (getattr(current_user, 'email', '') or 'Trainer').split('@')
+        default_name = getattr(current_user, 'username', None) or 'Trainer'
         trainer = Trainer(name=default_name, user_id=current_user.id, status='Active')
         db.session.add(trainer)
-        db.session.commit()
-    return trainer
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Another request created the profile first (uq_trainers_user_id)
+            db.session.rollback()
+            trainer = Trainer.query.filter_by(user_id=current_user.id).one()
+        else:
+            index_trainer(trainer)
+            data_version.bump(data_version.TRAINERS)
+    invalidate_principal(current_user.id)
+    db.session.commit()
+    return TrainerRef(trainer.id, trainer.name)
 
 @trainer_bp.route('/dashboard')
 @login_required
 def dashboard():
     trainer = get_or_create_current_trainer()
-    requested_count = Course.query.filter(
-        (Course.trainer_id == None) | (Course.trainer_id == trainer.id),
-        Course.status == 'Requested'
-    ).count()
-    in_review_count = Course.query.filter_by(trainer_id=trainer.id, status='In Review').count()
-    approved_count = Course.query.filter_by(trainer_id=trainer.id, status='Approved').count()
-    completed_count = Course.query.filter_by(trainer_id=trainer.id, status='Completed').count()
-    rejected_count = Course.query.filter_by(trainer_id=trainer.id, status='Rejected').count()
+    counts = course_stats.get_course_counts(trainer_id=trainer.id)
 
     return render_template(
         'trainer_dashboard.html',
-        requested_count=requested_count,
-        in_review_count=in_review_count,
-        approved_count=approved_count,
-        completed_count=completed_count,
-        rejected_count=rejected_count,
+        requested_count=counts['requested'],
+        in_review_count=counts['in_review'],
+        approved_count=counts['approved'],
+        completed_count=counts['completed'],
+        rejected_count=counts['rejected'],
     )
 
 @trainer_bp.route('/my_courses')
 @login_required
 def my_courses():
     trainer = get_or_create_current_trainer()
-    courses = Course.query.filter_by(trainer_id=trainer.id).all()
-    return render_template('trainer_my_courses.html', courses=courses)
+    table = fragment_cache.render('fragments/trainer_courses_table.html', trainer.id, (data_version.COURSES,),
+                                  lambda: {'courses': Course.query.filter_by(trainer_id=trainer.id).all()})
+    return render_template('trainer_my_courses.html', table=table)
 
 @trainer_bp.route('/course_requests')
 @login_required
@@ -77,17 +96,42 @@ def course_requests():
 def accept_course_request(course_id):
     trainer = get_or_create_current_trainer()
     course = Course.query.filter_by(id=course_id, status='Requested').first_or_404()
-    course.trainer_id = trainer.id
-    course.status = 'In Review'
-
-    initial_doc = Documentation(
-        course_id=course_id,
-        file_path='',
-        status='Pending',
-        revision_number=1
-    )
-    db.session.add(initial_doc)
-    db.session.commit()
+    try:
+        # Imported requests may already carry a time slot
+        check_assignment(course, trainer.id)
+    except ScheduleConflict as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('trainer.course_requests'))
+    previous_trainer_id = course.trainer_id
+    try:
+        # Compare-and-set on status and trainer: a request taken or declined meanwhile matches nothing
+        moved = state_machine.COURSE.apply(
+            'accept', course.id, Course.trainer_id.is_not_distinct_from(previous_trainer_id),
+            values={'trainer_id': trainer.id}, returning=(Course.title, Course.trainer_id),
+        )
+        if moved is None:
+            db.session.rollback()
+            flash('This request was accepted or changed by someone else.', 'warning')
+            return redirect(url_for('trainer.course_requests'))
+        events.course_status_changed(moved, moved.previous_status, previous_trainer_id, trainer_name=trainer.name)
+
+        initial_doc = Documentation(
+            course_id=course.id,
+            file_path='',
+            status='Pending',
+            revision_number=1
+        )
+        db.session.add(initial_doc)
+        db.session.flush()
+        changes.documentation_created(initial_doc)
+        data_version.bump(data_version.COURSES, data_version.DOCUMENTATION)
+        db.session.commit()
+    except IntegrityError:
+        # ex_courses_trainer_schedule: the slot was booked concurrently
+        db.session.rollback()
+        flash('You were booked for that time in the meantime', 'danger')
+        return redirect(url_for('trainer.course_requests'))
+    course_stats.invalidate()
     flash('Course request accepted and moved to In Review.', 'success')
     return redirect(url_for('trainer.course_requests'))
 
@@ -95,9 +139,20 @@ def accept_course_request(course_id):
 @login_required
 def decline_course_request(course_id):
     course = Course.query.filter_by(id=course_id, status='Requested').first_or_404()
-    course.trainer_id = None
-    # Optionally add declined status or keep 'Requested'
+    previous_trainer_id = course.trainer_id
+    # Keeps 'Requested' and gives the request back to every trainer
+    moved = state_machine.COURSE.apply(
+        'decline', course.id, Course.trainer_id.is_not_distinct_from(previous_trainer_id),
+        values={'trainer_id': None}, returning=(Course.title, Course.trainer_id),
+    )
+    if moved is None:
+        db.session.rollback()
+        flash('This request was accepted or changed by someone else.', 'warning')
+        return redirect(url_for('trainer.course_requests'))
+    events.course_status_changed(moved, moved.previous_status, previous_trainer_id)
+    data_version.bump(data_version.COURSES)
     db.session.commit()
+    course_stats.invalidate()
     flash('Course request declined.', 'info')
     return redirect(url_for('trainer.course_requests'))
 
@@ -126,22 +181,35 @@ def upload_documentation(course_id):
 
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'docs', str(course.id))
-            os.makedirs(upload_folder, exist_ok=True)
-            abs_path = os.path.join(upload_folder, filename)
-            file.save(abs_path)
-
-            relative_path = os.path.join('uploads', 'docs', str(course.id), filename).replace('\\', '/')
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            try:
+                # Identical bytes are stored once and shared between revisions/courses
+                content_hash, _, relative_path = store_upload(file.stream, extension)
+            except UploadTooLarge as e:
+                db.session.rollback()
+                flash(str(e), 'danger')
+                return redirect(request.url)
 
             next_revision = (latest_doc.revision_number if latest_doc else 0) + 1
 
             new_doc = Documentation(
                 course_id=course.id,
                 file_path=relative_path,
+                content_hash=content_hash,
+                original_filename=filename,
                 status='Pending',
                 revision_number=next_revision,
             )
             db.session.add(new_doc)
+            db.session.flush()
+            # Validation, page counting and text extraction run in the job worker
+            enqueue_document_processing(new_doc)
+            changes.documentation_created(new_doc)
+            events.documentation_status_changed(
+                new_doc, None, course, trainer_name=trainer.name,
+                review_url=url_for('observer.review_documentation', doc_id=new_doc.id),
+            )
+            data_version.bump(data_version.DOCUMENTATION)
             db.session.commit()
 
             flash('Documentation uploaded and set to Pending for review.', 'success')
@@ -157,22 +225,43 @@ def submit_for_review(course_id):
     trainer = get_or_create_current_trainer()
     course = Course.query.filter_by(id=course_id, trainer_id=trainer.id).first_or_404()
 
-    if course.status == 'Rejected':
-        course.status = 'In Review'
-
     latest_doc = (
         Documentation.query
         .filter_by(course_id=course.id)
         .order_by(Documentation.submitted_at.desc())
         .first()
     )
-    if latest_doc:
-        latest_doc.status = 'Pending'
-        db.session.commit()
-        flash('Documentation submitted for observer review.', 'success')
-    else:
+    if latest_doc is None:
         flash('No documentation found to submit.', 'danger')
+        return redirect(url_for('trainer.upload_documentation', course_id=course_id))
 
+    # A rejected document goes back to Pending; a new revision is Pending already
+    doc = state_machine.DOCUMENTATION.apply(
+        'resubmit', latest_doc.id,
+        returning=(Documentation.file_path, Documentation.submitted_at),
+    )
+    moved = state_machine.COURSE.apply(
+        'resubmit', course.id, Course.trainer_id == trainer.id, returning=(Course.title, Course.trainer_id),
+    )
+    if doc is None and moved is None:
+        db.session.rollback()
+        if latest_doc.status == 'Pending':
+            flash('Documentation is already awaiting review.', 'info')
+        else:
+            flash(f'{latest_doc.status} documentation cannot be resubmitted; upload a new revision.', 'info')
+        return redirect(url_for('trainer.upload_documentation', course_id=course_id))
+
+    if moved is not None:
+        events.course_status_changed(moved, moved.previous_status, moved.trainer_id, trainer_name=trainer.name)
+    if doc is not None:
+        events.documentation_status_changed(
+            doc, doc.previous_status, course, trainer_name=trainer.name,
+            review_url=url_for('observer.review_documentation', doc_id=doc.id),
+        )
+    data_version.bump(data_version.COURSES, data_version.DOCUMENTATION)
+    db.session.commit()
+    course_stats.invalidate()
+    flash('Documentation submitted for observer review.', 'success')
     return redirect(url_for('trainer.upload_documentation', course_id=course_id))
 
 @trainer_bp.route('/approvals_feedback')
@@ -196,8 +285,8 @@ def provide_feedback(course_id):
 
         latest_doc = Documentation.query.filter_by(course_id=course.id).order_by(Documentation.revision_number.desc()).first()
         if latest_doc:
-            feedback = Feedback(documentation_id=latest_doc.id, comments=comments, rating=rating)
-            db.session.add(feedback)
+            record_feedback(latest_doc, comments, rating)
+            data_version.bump(data_version.DOCUMENTATION)
             db.session.commit()
             flash('Feedback submitted.', 'success')
         else:
@@ -206,9 +295,9 @@ def provide_feedback(course_id):
 
     existing_feedbacks = []
     docs = Documentation.query.filter_by(course_id=course.id).all()
+    feedbacks = feedbacks_by_documentation(doc.id for doc in docs)
     for doc in docs:
-        doc_feedbacks = Feedback.query.filter_by(documentation_id=doc.id).all()
-        existing_feedbacks.extend(doc_feedbacks)
+        existing_feedbacks.extend(feedbacks.get(doc.id, []))
 
     return render_template('trainer_feedback.html', course=course, feedbacks=existing_feedbacks)
 
@@ -0,0 +1,160 @@
+"""Trainer double-booking checks and calendar window queries.
+
+A scheduled course occupies its trainer over [scheduled_time, scheduled_end).
+Two sessions conflict when their ranges overlap. Sessions are capped at
+MAX_SESSION_MINUTES, so every session overlapping a window starts at most that
+long before the window. That bound turns an overlap test into a range scan on
+the (trainer_id, scheduled_time) and (scheduled_time) indexes, in SQL and in
+IntervalIndex alike. On Postgres the ex_courses_trainer_schedule exclusion
+constraint also rejects conflicting writes that race past these checks.
+"""
+import bisect
+from datetime import timedelta
+from sqlalchemy import select
+from .models import Course, Trainer, db
+
+DEFAULT_DURATION_MINUTES = 60
+MAX_SESSION_MINUTES = 12 * 60
+MAX_SESSION = timedelta(minutes=MAX_SESSION_MINUTES)
+# Widest window the calendar endpoints serve in one request (a month view plus margins)
+MAX_CALENDAR_DAYS = 62
+
+
+class ScheduleConflict(Exception):
+    """The trainer already has sessions overlapping the requested slot."""
+
+    def __init__(self, conflicts):
+        titles = ', '.join(f"'{title}' at {start:%Y-%m-%d %H:%M}" for _, title, start, _ in conflicts[:3])
+        super().__init__(f'Trainer is already booked: {titles}')
+        self.conflicts = conflicts
+
+
+def session_end(start, duration_minutes):
+    return start + timedelta(minutes=duration_minutes) if start else None
+
+
+def validate_duration(value):
+    """Duration in minutes from form or file input; raises ValueError when out of range."""
+    if value in (None, ''):
+        return DEFAULT_DURATION_MINUTES
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid duration {value!r}; use whole minutes')
+    if not 1 <= minutes <= MAX_SESSION_MINUTES:
+        raise ValueError(f'Duration must be between 1 and {MAX_SESSION_MINUTES} minutes')
+    return minutes
+
+
+def _overlapping(start, end):
+    # scheduled_time > start - MAX_SESSION keeps this a bounded index range scan
+    return (
+        Course.scheduled_time < end,
+        Course.scheduled_time > start - MAX_SESSION,
+        Course.scheduled_end > start,
+    )
+
+
+def find_conflicts(trainer_id, start, end, exclude_course_id=None):
+    """(id, title, start, end) of ``trainer_id``'s sessions overlapping [start, end)."""
+    statement = (
+        select(Course.id, Course.title, Course.scheduled_time, Course.scheduled_end)
+        .where(Course.trainer_id == trainer_id, *_overlapping(start, end))
+        .order_by(Course.scheduled_time)
+    )
+    if exclude_course_id is not None:
+        statement = statement.where(Course.id != exclude_course_id)
+    return db.session.execute(statement).all()
+
+
+def schedule(course, start, duration_minutes=None, trainer_id=None):
+    """Give ``course`` the slot [start, start + duration), or raise ScheduleConflict.
+
+    ``trainer_id`` defaults to the course's current trainer. An unassigned
+    course is never in conflict. The caller commits.
+    """
+    duration = duration_minutes or course.duration_minutes or DEFAULT_DURATION_MINUTES
+    end = session_end(start, duration)
+    trainer_id = trainer_id if trainer_id is not None else course.trainer_id
+    if trainer_id is not None and start is not None:
+        conflicts = find_conflicts(trainer_id, start, end, exclude_course_id=course.id)
+        if conflicts:
+            raise ScheduleConflict(conflicts)
+    course.scheduled_time = start
+    course.duration_minutes = duration
+    course.scheduled_end = end
+
+
+def check_assignment(course, trainer_id):
+    """Raise ScheduleConflict if giving an already scheduled ``course`` to ``trainer_id`` double-books them."""
+    if course.scheduled_time is None:
+        return
+    conflicts = find_conflicts(trainer_id, course.scheduled_time, course.scheduled_end, exclude_course_id=course.id)
+    if conflicts:
+        raise ScheduleConflict(conflicts)
+
+
+class IntervalIndex:
+    """Sessions of one trainer sorted by start, for checking many proposed slots at once.
+
+    Overlap lookups bisect to the starts within MAX_SESSION before the slot,
+    so each costs O(log n + k) and stays correct even if stored sessions
+    overlap each other (legacy data, or SQLite without the constraint).
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._sessions = []
+
+    def add(self, start, end, key=None):
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._sessions.insert(i, (start, end, key))
+
+    def remove(self, keys):
+        """Drop the sessions whose key is in ``keys``; returns them as (start, end, key)."""
+        removed = [session for session in self._sessions if session[2] in keys]
+        if removed:
+            self._sessions = [session for session in self._sessions if session[2] not in keys]
+            self._starts = [session[0] for session in self._sessions]
+        return removed
+
+    def copy(self):
+        index = IntervalIndex()
+        index._starts = list(self._starts)
+        index._sessions = list(self._sessions)
+        return index
+
+    def overlapping(self, start, end, ignore_key=None):
+        lo = bisect.bisect_right(self._starts, start - MAX_SESSION)
+        hi = bisect.bisect_left(self._starts, end)
+        return [session for session in self._sessions[lo:hi]
+                if session[1] > start and (ignore_key is None or session[2] != ignore_key)]
+
+
+def load_indexes(trainer_ids, window_start, window_end):
+    """IntervalIndex per trainer with their sessions overlapping the window, in one query."""
+    indexes = {trainer_id: IntervalIndex() for trainer_id in trainer_ids}
+    if not indexes:
+        return indexes
+    rows = db.session.execute(
+        select(Course.trainer_id, Course.id, Course.scheduled_time, Course.scheduled_end)
+        .where(Course.trainer_id.in_(list(indexes)), *_overlapping(window_start, window_end))
+    )
+    for trainer_id, course_id, start, end in rows:
+        indexes[trainer_id].add(start, end, course_id)
+    return indexes
+
+
+def calendar_statement(window_start, window_end, trainer_id=None):
+    """SELECT of every session overlapping the window, org-wide or for one trainer."""
+    statement = (
+        select(Course.id, Course.title, Course.status, Course.scheduled_time, Course.scheduled_end,
+               Course.trainer_id, Trainer.name)
+        .outerjoin(Trainer, Course.trainer_id == Trainer.id)
+        .where(*_overlapping(window_start, window_end))
+        .order_by(Course.scheduled_time)
+    )
+    if trainer_id is not None:
+        statement = statement.where(Course.trainer_id == trainer_id)
+    return statement
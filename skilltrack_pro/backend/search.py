@@ -0,0 +1,192 @@
+import math
+import re
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal_column, select
+from .models import Course, Documentation, SearchDocument, SearchTerm, Trainer, db, search_vector
+
+ENTITY_TYPES = ('course', 'trainer', 'documentation')
+
+# Extracted document text can be long; index only the leading part
+MAX_BODY_CHARS = 200_000
+MAX_PER_PAGE = 50
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it of on or that the this to was were will with'.split()
+)
+
+
+def tokenize(text):
+    """Lower-cased word tokens, without stopwords; mirrors what the fallback index stores."""
+    return [
+        token for token in _TOKEN.findall((text or '').lower())
+        if token not in _STOPWORDS and len(token) <= 100
+    ]
+
+
+def _uses_postgres():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def _postings(document_id, title, body):
+    """Fallback posting rows of one document; titles weigh twice as much as bodies."""
+    weights = Counter()
+    for token, count in Counter(tokenize(title)).items():
+        weights[token] += 2 * (1 + math.log(count))
+    for token, count in Counter(tokenize(body)).items():
+        weights[token] += 1 + math.log(count)
+    return [{'term': term, 'document_id': document_id, 'weight': weight} for term, weight in weights.items()]
+
+
+def _write_postings(document_id, title, body):
+    """Replace the fallback postings of one document."""
+    db.session.execute(delete(SearchTerm).where(SearchTerm.document_id == document_id))
+    postings = _postings(document_id, title, body)
+    if postings:
+        db.session.execute(insert(SearchTerm), postings)
+
+
+def index_entity(entity_type, entity_id, title, body=None):
+    """Insert or refresh one entity's search document in the caller's transaction."""
+    body = body[:MAX_BODY_CHARS] if body else body
+    document = SearchDocument.query.filter_by(entity_type=entity_type, entity_id=entity_id).first()
+    if document is None:
+        document = SearchDocument(entity_type=entity_type, entity_id=entity_id)
+        db.session.add(document)
+    document.title = title
+    document.body = body
+    document.updated_at = datetime.utcnow()
+    if not _uses_postgres():
+        db.session.flush()
+        _write_postings(document.id, title, body)
+    return document
+
+
+def index_new_entities(entity_type, entities):
+    """Index many entities that have no search document yet, with executemany.
+
+    ``entities`` are (entity_id, title, body) tuples. Used by bulk imports,
+    where index_entity's lookup and flush per row would dominate the cost.
+    """
+    if not entities:
+        return
+    now = datetime.utcnow()
+    rows = [{'entity_type': entity_type, 'entity_id': entity_id, 'title': title,
+             'body': body[:MAX_BODY_CHARS] if body else body, 'updated_at': now}
+            for entity_id, title, body in entities]
+    db.session.execute(insert(SearchDocument.__table__), rows)
+    if _uses_postgres():
+        return
+    # One lookup for the new ids; an ordered RETURNING would make SQLite insert row by row
+    ids = dict(db.session.execute(
+        select(SearchDocument.entity_id, SearchDocument.id)
+        .where(SearchDocument.entity_type == entity_type,
+               SearchDocument.entity_id.in_([row['entity_id'] for row in rows]))
+    ).all())
+    postings = [posting for row in rows
+                for posting in _postings(ids[row['entity_id']], row['title'], row['body'])]
+    if postings:
+        db.session.execute(insert(SearchTerm), postings)
+
+
+def remove_entity(entity_type, entity_id):
+    document = SearchDocument.query.filter_by(entity_type=entity_type, entity_id=entity_id).first()
+    if document is not None:
+        db.session.execute(delete(SearchTerm).where(SearchTerm.document_id == document.id))
+        db.session.delete(document)
+
+
+def index_course(course):
+    return index_entity('course', course.id, course.title, course.description)
+
+
+def index_trainer(trainer):
+    return index_entity('trainer', trainer.id, trainer.name)
+
+
+def index_documentation(doc, course_title=None):
+    """Index a documentation revision under its course title plus the extracted text."""
+    if course_title is None:
+        course_title = db.session.query(Course.title).filter(Course.id == doc.course_id).scalar()
+    title = f'{course_title} (revision {doc.revision_number or 0})'
+    return index_entity('documentation', doc.id, title, doc.extracted_text)
+
+
+def rebuild_index():
+    """Re-index every course, trainer and documentation revision; returns the count."""
+    db.session.execute(delete(SearchTerm))
+    db.session.execute(delete(SearchDocument))
+    total = 0
+    for course in Course.query.yield_per(500):
+        index_course(course)
+        total += 1
+    for trainer in Trainer.query.yield_per(500):
+        index_trainer(trainer)
+        total += 1
+    docs = (
+        db.session.query(Documentation, Course.title)
+        .join(Course, Documentation.course_id == Course.id)
+        .filter(Documentation.extracted_text.isnot(None))
+        .yield_per(200)
+    )
+    for doc, course_title in docs:
+        index_documentation(doc, course_title)
+        total += 1
+    db.session.commit()
+    return total
+
+
+def _postgres_query(text, types):
+    vector = search_vector(SearchDocument.title, SearchDocument.body)
+    tsquery = func.websearch_to_tsquery(literal_column("'english'"), text)
+    rank = func.ts_rank(vector, tsquery).label('rank')
+    query = select(SearchDocument, rank).where(vector.op('@@')(tsquery))
+    if types:
+        query = query.where(SearchDocument.entity_type.in_(types))
+    return query.order_by(rank.desc(), SearchDocument.id)
+
+
+def _fallback_query(text, types):
+    terms = sorted(set(tokenize(text)))
+    if not terms:
+        return None
+    scores = (
+        select(SearchTerm.document_id, func.sum(SearchTerm.weight).label('rank'))
+        .where(SearchTerm.term.in_(terms))
+        .group_by(SearchTerm.document_id)
+        # Every query term has to match, like websearch_to_tsquery's implicit AND
+        .having(func.count(SearchTerm.term) == len(terms))
+        .subquery()
+    )
+    query = select(SearchDocument, scores.c.rank).join(scores, SearchDocument.id == scores.c.document_id)
+    if types:
+        query = query.where(SearchDocument.entity_type.in_(types))
+    return query.order_by(scores.c.rank.desc(), SearchDocument.id)
+
+
+def search(text, types=None, page=1, per_page=20):
+    """Ranked search over courses, trainers and document text.
+
+    Returns (results, has_more). Each result is a dict with type, id, title
+    and rank. One extra row is fetched instead of counting all matches, so
+    a page costs the same however many documents match.
+    """
+    text = (text or '').strip()
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    page = max(1, page)
+    if not text:
+        return [], False
+    types = [t for t in (types or []) if t in ENTITY_TYPES]
+
+    query = _postgres_query(text, types) if _uses_postgres() else _fallback_query(text, types)
+    if query is None:
+        return [], False
+    rows = db.session.execute(query.limit(per_page + 1).offset((page - 1) * per_page)).all()
+    results = [{
+        'type': document.entity_type,
+        'id': str(document.entity_id),
+        'title': document.title,
+        'rank': round(float(rank), 4),
+    } for document, rank in rows[:per_page]]
+    return results, len(rows) > per_page
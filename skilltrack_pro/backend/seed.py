@@ -0,0 +1,248 @@
+"""Synthetic data at production-like volume, for benchmarks and query-plan checks.
+
+Rows are generated course by course and written with executemany in batches,
+so memory stays flat whatever the scale. Every run uses a fresh prefix for
+usernames and emails, so seeding twice adds to the existing data.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from .models import (
+    Course, Documentation, Feedback, Trainer, TrainerDirectoryEntry, User, db,
+)
+from .feedback_rollups import rebuild_rollups
+from .search import rebuild_index
+from .scheduling import IntervalIndex, session_end
+from . import data_version
+
+# Preset volumes; 'production' is the shape we plan capacity for
+SCALES = {
+    'small': {'trainers': 50, 'courses': 2_000, 'admins': 3, 'observers': 3, 'feedback_per_doc': 3},
+    'medium': {'trainers': 500, 'courses': 20_000, 'admins': 5, 'observers': 10, 'feedback_per_doc': 4},
+    'production': {'trainers': 3_000, 'courses': 300_000, 'admins': 20, 'observers': 40, 'feedback_per_doc': 5},
+}
+
+# Relative frequency of each course status; most courses are long finished
+COURSE_STATUS_WEIGHTS = {'Completed': 60, 'Approved': 25, 'In Review': 5, 'Rejected': 5, 'Requested': 5}
+# Status of a course's latest documentation revision; earlier revisions were rejected
+LATEST_DOC_STATUS = {'Completed': 'Approved', 'Approved': 'Approved', 'In Review': 'Pending',
+                     'Rejected': 'Rejected', 'Requested': None}
+# Relative frequency of 1, 2, 3 and 4 documentation revisions per course
+REVISION_WEIGHTS = (70, 20, 7, 3)
+# Session lengths in minutes, with their relative frequency
+DURATION_WEIGHTS = {60: 50, 90: 20, 120: 20, 240: 10}
+
+COMMENTS = (
+    'Clear structure, good examples.',
+    'Slides need more detail on the exercises.',
+    'Please add the assessment rubric.',
+    'Great pacing, participants stayed engaged.',
+    'Missing references for section 3.',
+    'Approved with minor wording fixes.',
+)
+TOPICS = ('Python', 'SQL', 'Leadership', 'Safety', 'Excel', 'Negotiation', 'Cloud', 'Security', 'Design', 'Agile')
+LEVELS = ('Foundations', 'Intermediate', 'Advanced', 'Workshop', 'Bootcamp')
+
+# Placeholder hash; seeded accounts cannot log in through Supabase anyway
+SEED_PASSWORD_HASH = 'seeded'
+
+
+class _Writer:
+    """Buffers rows per table and flushes them in parent-before-child order."""
+
+    def __init__(self, batch_size, progress):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.buffers = {Course: [], Documentation: [], Feedback: []}
+        self.totals = {Course: 0, Documentation: 0, Feedback: 0}
+
+    def add(self, model, row):
+        self.buffers[model].append(row)
+        if len(self.buffers[model]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model, rows in self.buffers.items():
+            if rows:
+                # Core insert keeps each batch one executemany; the ORM one regroups rows by their None values
+                db.session.execute(insert(model.__table__), rows)
+                self.totals[model] += len(rows)
+                rows.clear()
+        db.session.commit()
+        if self.progress:
+            self.progress(f'{self.totals[Course]} courses, {self.totals[Documentation]} documents, '
+                          f'{self.totals[Feedback]} feedback rows')
+
+
+def _users(prefix, role, count):
+    return [{
+        'id': uuid.uuid4(),
+        'supabase_user_id': uuid.uuid4(),
+        'username': f'{prefix}-{role}-{i:05d}',
+        'email': f'{prefix}-{role}-{i:05d}@example.com',
+        'password_hash': SEED_PASSWORD_HASH,
+        'role': role,
+    } for i in range(count)]
+
+
+def seed_database(trainers, courses, admins=5, observers=10, feedback_per_doc=4,
+                  random_seed=None, batch_size=5000, search_index=True, progress=None):
+    """Insert users, trainers, courses, documentation revisions and feedback.
+
+    Course statuses follow COURSE_STATUS_WEIGHTS; every course past 'Requested'
+    has one to four revisions, and each reviewed revision gets on average
+    ``feedback_per_doc`` feedback rows. Feedback rollups (and, unless
+    ``search_index`` is false, the search index) are rebuilt at the end and
+    the tables analyzed. Returns the number of rows written per table.
+    """
+    rng = random.Random(random_seed)
+    prefix = f'seed{uuid.uuid4().hex[:6]}'
+    now = datetime.utcnow().replace(microsecond=0)
+
+    admin_rows = _users(prefix, 'admin', admins)
+    trainer_users = _users(prefix, 'trainer', trainers)
+    observer_rows = _users(prefix, 'observer', observers)
+    db.session.execute(insert(User), admin_rows + trainer_users + observer_rows)
+    trainer_rows = [{'id': uuid.uuid4(), 'name': f'Trainer {i:05d}', 'user_id': user['id'],
+                     'status': 'Active' if rng.random() < 0.95 else 'Inactive'}
+                    for i, user in enumerate(trainer_users)]
+    db.session.execute(insert(Trainer), trainer_rows)
+    db.session.execute(insert(TrainerDirectoryEntry), [{
+        'supabase_user_id': user['supabase_user_id'],
+        'email': user['email'],
+        'username': user['username'],
+        'email_key': user['email'],
+        'name_key': user['username'],
+        'remote_updated_at': now,
+        'synced_at': now,
+    } for user in trainer_users])
+    db.session.commit()
+
+    statuses = list(COURSE_STATUS_WEIGHTS)
+    weights = list(COURSE_STATUS_WEIGHTS.values())
+    durations = list(DURATION_WEIGHTS)
+    duration_weights = list(DURATION_WEIGHTS.values())
+    # Sessions are never double-booked (Postgres enforces it with ex_courses_trainer_schedule)
+    bookings = {trainer['id']: IntervalIndex() for trainer in trainer_rows}
+    writer = _Writer(batch_size, progress)
+    for i in range(courses):
+        status = rng.choices(statuses, weights)[0]
+        trainer = None if status == 'Requested' and rng.random() < 0.8 else rng.choice(trainer_rows)
+        course_id = uuid.uuid4()
+        created = now - timedelta(days=rng.randint(0, 3 * 365))
+        start = created.replace(hour=0, minute=0, second=0)
+        start += timedelta(days=rng.randint(7, 60), hours=rng.randint(8, 17))
+        duration = rng.choices(durations, duration_weights)[0]
+        if trainer:
+            while bookings[trainer['id']].overlapping(start, session_end(start, duration)):
+                start += timedelta(days=1)
+            bookings[trainer['id']].add(start, session_end(start, duration))
+        writer.add(Course, {
+            'id': course_id,
+            'title': f'{rng.choice(TOPICS)} {rng.choice(LEVELS)} #{i}',
+            'description': f'{rng.choice(TOPICS)} training for cohort {i % 97}.',
+            'status': status,
+            'scheduled_time': start,
+            'duration_minutes': duration,
+            'scheduled_end': session_end(start, duration),
+            'user_id': rng.choice(admin_rows)['id'],
+            'trainer_id': trainer['id'] if trainer else None,
+        })
+
+        latest_status = LATEST_DOC_STATUS[status]
+        if latest_status is None:
+            continue
+        revisions = rng.choices(range(1, len(REVISION_WEIGHTS) + 1), REVISION_WEIGHTS)[0]
+        submitted = created
+        for revision in range(1, revisions + 1):
+            submitted += timedelta(days=rng.randint(1, 14), minutes=rng.randint(0, 600))
+            doc_status = latest_status if revision == revisions else 'Rejected'
+            reviewed = submitted + timedelta(days=rng.randint(1, 5))
+            doc_id = uuid.uuid4()
+            writer.add(Documentation, {
+                'id': doc_id,
+                'course_id': course_id,
+                'file_path': f'seed/{doc_id}.pdf',
+                'original_filename': f'course-{i}-rev{revision}.pdf',
+                'status': doc_status,
+                'submitted_at': submitted,
+                'approved_at': reviewed if doc_status == 'Approved' else None,
+                'rejected_at': reviewed if doc_status == 'Rejected' else None,
+                'revision_number': revision,
+            })
+            if doc_status == 'Pending':
+                continue
+            for n in range(rng.randint(0, 2 * feedback_per_doc)):
+                writer.add(Feedback, {
+                    'documentation_id': doc_id,
+                    'comments': rng.choice(COMMENTS),
+                    'rating': rng.randint(1, 5) if rng.random() < 0.9 else None,
+                    'created_at': reviewed + timedelta(hours=n),
+                })
+    writer.flush()
+    rebuild_rollups()
+    # Running workers re-read their dashboards and cached fragments
+    data_version.bump(data_version.COURSES, data_version.DOCUMENTATION, data_version.TRAINERS)
+    db.session.commit()
+    if search_index:
+        rebuild_index()
+    with db.engine.begin() as conn:
+        # Fresh planner statistics, otherwise Postgres plans for empty tables
+        conn.exec_driver_sql('ANALYZE')
+
+    return {
+        'users': len(admin_rows) + len(trainer_users) + len(observer_rows),
+        'trainers': len(trainer_rows),
+        'courses': writer.totals[Course],
+        'documentation': writer.totals[Documentation],
+        'feedback': writer.totals[Feedback],
+    }
+
+
+def pick_sample():
+    """Ids of representative rows in an already seeded database, for driving routes.
+
+    The trainer is the one with the most courses, so trainer pages show the
+    heaviest realistic load; the admin owns the most courses for the same reason.
+    """
+    busiest_trainer = db.session.execute(
+        select(Course.trainer_id).where(Course.trainer_id.isnot(None))
+        .group_by(Course.trainer_id).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    trainer = db.session.get(Trainer, busiest_trainer)
+    admin_id = db.session.execute(
+        select(Course.user_id).group_by(Course.user_id).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    observer_id = db.session.execute(select(User.id).where(User.role == 'observer').limit(1)).scalar()
+
+    def trainer_course(*statuses):
+        return db.session.execute(
+            select(Course.id).where(Course.trainer_id == trainer.id, Course.status.in_(statuses)).limit(1)
+        ).scalar()
+
+    return {
+        'admin': admin_id,
+        'trainer': trainer.user_id,
+        'observer': observer_id,
+        'trainer_id': trainer.id,
+        'course': trainer_course('In Review', 'Approved', 'Completed'),
+        'completed_course': trainer_course('Completed'),
+        'doc': db.session.execute(
+            select(Documentation.id).where(Documentation.status == 'Pending').limit(1)
+        ).scalar(),
+    }
+
+
+def fake_auth_users():
+    """Supabase admin-API shaped users for every mirrored trainer.
+
+    Lets a stubbed Supabase return the same trainers the directory already
+    holds, so background syncs during a benchmark change nothing.
+    """
+    return [{
+        'id': str(entry.supabase_user_id),
+        'email': entry.email,
+        'updated_at': entry.remote_updated_at.isoformat() if entry.remote_updated_at else None,
+        'user_metadata': {'role': 'trainer', 'username': entry.username},
+    } for entry in TrainerDirectoryEntry.query.order_by(TrainerDirectoryEntry.supabase_user_id)]
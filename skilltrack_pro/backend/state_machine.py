@@ -0,0 +1,101 @@
+"""Legal status transitions for courses and documentation, applied as compare-and-set UPDATEs.
+
+Each transition names the statuses it may start from and the status it
+ends in. apply() moves a row with
+UPDATE ... WHERE id = :id AND status = :expected RETURNING ..., so the
+check and the write are one statement. Of two requests racing to make the
+same move, exactly one gets a row back. The other's UPDATE waits for the
+row lock, re-checks the status and matches nothing. apply_many() moves
+many ids with one statement per source status.
+
+Sources are tried in the order they are declared, one statement each, so
+put the common one first. A statement that matches nothing changes
+nothing. The row returned carries the source it matched as
+``previous_status``, since RETURNING only sees new values.
+
+Rows are updated with synchronize_session=False: ORM objects already
+loaded keep their old status until the session commits and expires them.
+Every row moved is recorded in the change log (changes.py) under the
+transition's name.
+"""
+from collections import namedtuple
+from sqlalchemy import literal, update
+from . import changes
+from .models import Course, Documentation, db
+
+Transition = namedtuple('Transition', ['sources', 'target'])
+
+
+class StateMachine:
+    def __init__(self, model, entity_type, transitions, course_id=None):
+        self.model = model
+        self.entity_type = entity_type
+        self.transitions = transitions
+        # Column naming the row's course, always returned; None when the row is a course
+        self.course_id = course_id
+
+    def transition(self, name):
+        try:
+            return self.transitions[name]
+        except KeyError:
+            raise ValueError(f'Unknown {self.model.__name__} transition {name!r}') from None
+
+    def apply(self, name, row_id, *where, values=None, returning=()):
+        """Move ``row_id`` along transition ``name`` in the caller's transaction.
+
+        ``where`` adds conditions the row must also meet (owner, lease,
+        the trainer it was read with). ``values`` sets more columns in the
+        same UPDATE. Returns the row (id, status, previous_status, course_id
+        for documentation, *returning), or None when the row is missing, not
+        in a source status or fails ``where``.
+        """
+        rows = self.apply_many(name, [row_id], *where, values=values, returning=returning)
+        return rows[0] if rows else None
+
+    def apply_many(self, name, ids, *where, values=None, returning=()):
+        """Move every id in ``ids`` that can take transition ``name``; return the rows that moved."""
+        transition = self.transition(name)
+        model = self.model
+        if self.course_id is not None:
+            returning = (self.course_id, *returning)
+        remaining, moved = list(ids), []
+        for source in transition.sources:
+            if not remaining:
+                break
+            rows = db.session.execute(
+                update(model)
+                .where(model.id.in_(remaining), model.status == source, *where)
+                .values(status=transition.target, **(values or {}))
+                .returning(model.id, model.status, literal(source).label('previous_status'), *returning),
+                execution_options={'synchronize_session': False},
+            ).all()
+            if rows:
+                moved.extend(rows)
+                done = {row.id for row in rows}
+                remaining = [row_id for row_id in remaining if row_id not in done]
+        if moved:
+            changes.record(self.entity_type, name, [
+                (row.id, row.course_id if self.course_id is not None else row.id, row.status) for row in moved
+            ])
+        return moved
+
+
+COURSE = StateMachine(Course, changes.COURSE, {
+    # A trainer takes on (or gives back) an admin's request
+    'accept': Transition(('Requested',), 'In Review'),
+    'decline': Transition(('Requested',), 'Requested'),
+    # The admin books a time slot
+    'schedule': Transition(('In Review',), 'Approved'),
+    # The observer's decision on the latest documentation. Scheduled courses are Approved
+    # already, and a new revision can be uploaded to a Rejected course without resubmitting.
+    'approve': Transition(('In Review', 'Approved', 'Rejected'), 'Approved'),
+    'reject': Transition(('In Review', 'Approved', 'Rejected'), 'Rejected'),
+    # The trainer sends fixed documentation back for review
+    'resubmit': Transition(('Rejected',), 'In Review'),
+})
+
+DOCUMENTATION = StateMachine(Documentation, changes.DOCUMENTATION, {
+    'approve': Transition(('Pending',), 'Approved'),
+    'reject': Transition(('Pending',), 'Rejected'),
+    'resubmit': Transition(('Rejected',), 'Pending'),
+}, course_id=Documentation.course_id)
@@ -56,10 +56,10 @@ function populateCoursesTable(courses) {
 
   courses.forEach((c) => {
     html += `
-            <tr>
+            <tr data-course-id="${c.id}">
                 <td>${c.title}</td>
-                <td>${c.trainer_name || "Unassigned"}</td>
-                <td>${c.status}</td>
+                <td data-field="trainer">${c.trainer_name || "Unassigned"}</td>
+                <td data-field="status">${c.status}</td>
                 <td>${c.scheduled_time || "-"}</td>
             </tr>`;
   });
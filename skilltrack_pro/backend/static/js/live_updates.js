@@ -0,0 +1,97 @@
+// static/js/live_updates.js
+// Applies course and documentation status changes pushed from /api/events
+// to the dashboard in place: status card counts, admin course rows and the
+// observer review queue. The server only sends what this user's dashboard
+// shows; "resync" means changes were missed and the page is reloaded.
+
+(function () {
+  if (!window.EventSource) return;
+
+  const STREAM_URL = "/api/events";
+  // When the server refuses the stream (e.g. too many open), try again later
+  const REOPEN_DELAY_MS = 30000;
+
+  function applyCounts(kind, counts) {
+    const container = document.querySelector(`[data-live-counts="${kind}"]`);
+    if (!container || !counts) return;
+    Object.entries(counts).forEach(([status, delta]) => {
+      const card = container.querySelector(`[data-status="${status}"]`);
+      if (!card) return;
+      card.textContent = card.textContent.replace(
+        /(\d+)(\s*)$/,
+        (_, count, space) => Math.max(0, Number(count) + delta) + space
+      );
+    });
+  }
+
+  function updateCourseRow(course) {
+    const row = document.querySelector(`[data-course-id="${course.id}"]`);
+    if (!row) return;
+    row.querySelector('[data-field="status"]').textContent = course.status;
+    if (!course.trainer_id) {
+      row.querySelector('[data-field="trainer"]').textContent = "Unassigned";
+    } else if (course.trainer_name) {
+      row.querySelector('[data-field="trainer"]').textContent = course.trainer_name;
+    }
+  }
+
+  function cell(text) {
+    const td = document.createElement("td");
+    td.textContent = text || "-";
+    return td;
+  }
+
+  function updateReviewQueue(doc) {
+    const tbody = document.querySelector("[data-live-queue]");
+    if (!tbody || !doc.queue) return;
+    const existing = tbody.querySelector(`[data-doc-id="${doc.id}"]`);
+    if (doc.queue === "remove" && existing) {
+      existing.remove();
+    } else if (doc.queue === "add" && !existing) {
+      const row = document.createElement("tr");
+      row.dataset.docId = doc.id;
+      const link = document.createElement("a");
+      link.href = doc.review_url || `/observer/review/${doc.id}`;
+      link.className = "action-link";
+      link.textContent = "Review";
+      const action = document.createElement("td");
+      action.appendChild(link);
+      row.append(cell(doc.course_title), cell(doc.trainer_name), cell(doc.submitted_at), action);
+      tbody.appendChild(row);
+    }
+    const empty = tbody.rows.length === 0;
+    const table = tbody.closest("table");
+    table.hidden = empty;
+    if (table.nextElementSibling) table.nextElementSibling.hidden = !empty;
+  }
+
+  function open() {
+    const source = new EventSource(STREAM_URL);
+
+    source.addEventListener("course", (e) => {
+      const course = JSON.parse(e.data);
+      applyCounts("course", course.counts);
+      updateCourseRow(course);
+    });
+
+    source.addEventListener("documentation", (e) => {
+      const doc = JSON.parse(e.data);
+      applyCounts("documentation", doc.counts);
+      updateReviewQueue(doc);
+    });
+
+    source.addEventListener("resync", () => {
+      source.close();
+      window.location.reload();
+    });
+
+    source.onerror = () => {
+      // Network errors reconnect on their own; a refused stream is closed for good
+      if (source.readyState === EventSource.CLOSED) {
+        setTimeout(open, REOPEN_DELAY_MS);
+      }
+    };
+  }
+
+  document.addEventListener("DOMContentLoaded", open);
+})();
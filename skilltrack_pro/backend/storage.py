@@ -0,0 +1,186 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from .models import StoredBlob, db
+
+# Bytes read per iteration while hashing and copying uploads
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Default per-file limit; override with the MAX_UPLOAD_BYTES config/env value
+DEFAULT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+# Content-addressed blobs, under UPLOAD_ROOT
+BLOB_DIR = 'blobs'
+# Files younger than this may belong to an upload whose transaction is still open
+ORPHAN_GRACE_SECONDS = 3600
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit):
+        super().__init__(f'File exceeds the {limit // (1024 * 1024)} MB upload limit')
+        self.limit = limit
+
+
+def max_upload_bytes():
+    return int(current_app.config.get('MAX_UPLOAD_BYTES') or DEFAULT_MAX_UPLOAD_BYTES)
+
+
+def upload_root():
+    return current_app.config['UPLOAD_ROOT']
+
+
+def blob_relative_path(sha256, extension):
+    """Path of a blob relative to UPLOAD_ROOT, e.g. blobs/ab/ab12....pdf"""
+    return '/'.join([BLOB_DIR, sha256[:2], f'{sha256}.{extension}'])
+
+
+def resolve_path(file_path):
+    """Absolute filesystem path for a Documentation.file_path (blob or legacy upload)."""
+    root = os.path.realpath(upload_root())
+    path = os.path.realpath(os.path.join(root, file_path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f'Path escapes the upload root: {file_path}')
+    return path
+
+
+def _hash_stream(stream, limit):
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLarge(limit)
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def _write_stream(stream, target_dir, limit):
+    """Copy a non-seekable stream to a temp file while hashing it."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(limit)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return digest.hexdigest(), size, tmp_path
+
+
+def _acquire(sha256, extension, size):
+    """Take one reference on a blob row, creating it if this is its first use."""
+    result = db.session.execute(
+        update(StoredBlob).where(StoredBlob.sha256 == sha256).values(ref_count=StoredBlob.ref_count + 1)
+    )
+    if result.rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(StoredBlob(sha256=sha256, extension=extension, size=size, ref_count=1))
+    except IntegrityError:
+        db.session.execute(
+            update(StoredBlob).where(StoredBlob.sha256 == sha256).values(ref_count=StoredBlob.ref_count + 1)
+        )
+
+
+def store_upload(stream, extension, limit=None):
+    """Store an upload content-addressed and return (sha256, size, relative_path).
+
+    Seekable streams (Werkzeug spools uploads to memory or a temp file) are
+    hashed first, so bytes that are already stored are never written again.
+    Other streams are copied to a temp file while hashing. Either way the
+    size limit is enforced chunk by chunk. The blob's reference count is
+    taken in the caller's transaction.
+    """
+    limit = limit or max_upload_bytes()
+    extension = extension.lower()
+    blob_root = os.path.join(upload_root(), BLOB_DIR)
+    os.makedirs(blob_root, exist_ok=True)
+
+    tmp_path = None
+    if stream.seekable():
+        start = stream.tell()
+        sha256, size = _hash_stream(stream, limit)
+    else:
+        sha256, size, tmp_path = _write_stream(stream, blob_root, limit)
+
+    relative_path = blob_relative_path(sha256, extension)
+    final_path = resolve_path(relative_path)
+    try:
+        # Reusing stored bytes: restart the grace period, so collect_orphan_blobs()
+        # cannot take a file whose stored_blobs row was dropped a while ago
+        os.utime(final_path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        if tmp_path is None:
+            stream.seek(start)
+            fd, tmp_path = tempfile.mkstemp(dir=blob_root, suffix='.part')
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(stream, out, UPLOAD_CHUNK_SIZE)
+        os.replace(tmp_path, final_path)
+    else:
+        if tmp_path:
+            os.unlink(tmp_path)
+
+    _acquire(sha256, extension, size)
+    return sha256, size, relative_path
+
+
+def collect_orphan_blobs():
+    """Delete blob files (and stale .part files) with no stored_blobs row; returns the count.
+
+    Such files are left behind by uploads whose transaction rolled back.
+    Files written or reused within ORPHAN_GRACE_SECONDS are kept.
+    """
+    blob_root = os.path.join(upload_root(), BLOB_DIR)
+    known = {sha256 for (sha256,) in db.session.query(StoredBlob.sha256)}
+    cutoff = time.time() - ORPHAN_GRACE_SECONDS
+    removed = 0
+    for dirpath, _, filenames in os.walk(blob_root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name.split('.', 1)[0] in known or os.path.getmtime(path) > cutoff:
+                continue
+            os.unlink(path)
+            removed += 1
+    return removed
+
+
+def import_legacy_upload(doc):
+    """Move a pre-blob upload into the blob store and point ``doc`` at it.
+
+    Returns True when the document was migrated. The caller commits; the
+    legacy file is left in place and can be removed afterwards.
+    """
+    if doc.content_hash or not doc.file_path:
+        return False
+    path = resolve_path(doc.file_path)
+    if not os.path.isfile(path):
+        return False
+    extension = doc.file_path.rsplit('.', 1)[-1] if '.' in doc.file_path else 'bin'
+    with open(path, 'rb') as stream:
+        sha256, _, relative_path = store_upload(stream, extension, limit=os.path.getsize(path) + 1)
+    doc.original_filename = doc.original_filename or os.path.basename(doc.file_path)
+    doc.file_path = relative_path
+    doc.content_hash = sha256
+    return True
+
+
+def init_app(app):
+    """Create UPLOAD_ROOT, refusing one inside the static folder, which anyone could read."""
+    root = os.path.realpath(app.config['UPLOAD_ROOT'])
+    if app.static_folder:
+        static = os.path.realpath(app.static_folder)
+        if os.path.commonpath([static, root]) == static:
+            raise RuntimeError(f'UPLOAD_ROOT {root} is inside the static folder')
+    os.makedirs(root, exist_ok=True)
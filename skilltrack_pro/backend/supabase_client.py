@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from supabase import create_client
+from .metrics import supabase_call
 
 load_dotenv()
 
@@ -15,16 +16,17 @@ supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 def register_user(email: str, password: str, username: str, role: str):
     try:
-        response = supabase.auth.sign_up({
-            "email": email,
-            "password": password,
-            "options": {
-                "data": {
-                    "role": role,
-                    "username": username
+        with supabase_call('auth.sign_up'):
+            response = supabase.auth.sign_up({
+                "email": email,
+                "password": password,
+                "options": {
+                    "data": {
+                        "role": role,
+                        "username": username
+                    }
                 }
-            }
-        })
+            })
 
         # Check for error in registration
         if response.error:
@@ -40,12 +42,13 @@ def register_user(email: str, password: str, username: str, role: str):
         user_id = user.id
 
         # Insert user profile in 'profiles' table
-        profile_response = supabase.table('profiles').insert({
-            'id': user_id,
-            'username': username,
-            'role': role,
-            'email': email
-        }).execute()
+        with supabase_call('profiles.insert'):
+            profile_response = supabase.table('profiles').insert({
+                'id': user_id,
+                'username': username,
+                'role': role,
+                'email': email
+            }).execute()
 
         # Check for error on profile insert
         if profile_response.error:
@@ -58,25 +61,52 @@ def register_user(email: str, password: str, username: str, role: str):
         return {'error': str(e)}
 
 
-def get_all_trainers():
-    try:
-        # List all users with pagination: adjust page and per_page as needed
-        response = supabase.auth.admin.list_users(
-            page=1,
-            per_page=1000  # max 1000 per page
-        )
+# Largest page the Supabase admin API will return
+LIST_USERS_PAGE_SIZE = 1000
 
-        if response.error:
-            raise Exception(response.error.message)
 
+def _page_users(response):
+    """Normalise a list_users() response from either supabase-py API generation."""
+    if isinstance(response, list):
+        return response
+    error = getattr(response, 'error', None)
+    if error:
+        raise Exception(getattr(error, 'message', str(error)))
+    data = getattr(response, 'data', response)
+    if isinstance(data, dict):
+        return data.get('users', [])
+    return getattr(data, 'users', None) or []
+
+
+def iter_auth_users(admin_api=None, per_page=LIST_USERS_PAGE_SIZE):
+    """Yield every auth user, following pagination until a short page is returned."""
+    admin_api = admin_api or supabase.auth.admin
+    page = 1
+    while True:
+        with supabase_call('auth.admin.list_users'):
+            response = admin_api.list_users(page=page, per_page=per_page)
+        users = _page_users(response)
+        yield from users
+        if len(users) < per_page:
+            break
+        page += 1
+
+
+def user_field(user, name, default=None):
+    """Read a field from a Supabase user given as a dict or an object."""
+    if isinstance(user, dict):
+        return user.get(name, default)
+    return getattr(user, name, default)
+
+
+def get_all_trainers():
+    try:
         # Filter users with user_metadata.role == 'trainer'
-        trainers = [
-            user for user in response.data['users']
-            if user.get('user_metadata', {}).get('role') == 'trainer'
+        return [
+            user for user in iter_auth_users()
+            if (user_field(user, 'user_metadata') or {}).get('role') == 'trainer'
         ]
 
-        return trainers
-
     except Exception as e:
         print(f"Error fetching trainers from Supabase: {e}")
         return []
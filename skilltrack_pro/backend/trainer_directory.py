@@ -0,0 +1,141 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import or_
+from .models import TrainerDirectoryEntry, db
+from .supabase_client import iter_auth_users, user_field
+from . import data_version
+
+# How long a worker serves the local mirror before refreshing it in the background
+SYNC_TTL_SECONDS = 300
+# After a failed sync, how long a worker waits before trying Supabase again
+SYNC_RETRY_SECONDS = 60
+
+# monotonic() time at which the mirror is next refreshed; None until the first attempt
+_next_sync = None
+_sync_lock = threading.Lock()
+
+
+def _parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        stamp = value
+    else:
+        stamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if stamp is not None and stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return stamp
+
+
+def sync_trainer_directory(admin_api=None):
+    """Mirror Supabase trainers into trainer_directory.
+
+    Walks every page of the admin users API, only writes rows whose remote
+    updated_at changed, and removes trainers that no longer exist or lost
+    the role. ``admin_api`` defaults to the real Supabase admin client; pass
+    any object with a compatible ``list_users(page, per_page)`` to sync from
+    a fake. Returns a dict with the number of rows added, updated and removed.
+    """
+    global _next_sync
+    existing = {entry.supabase_user_id: entry for entry in TrainerDirectoryEntry.query}
+    seen = set()
+    added = updated = 0
+    now = datetime.utcnow()
+
+    for user in iter_auth_users(admin_api):
+        metadata = user_field(user, 'user_metadata') or {}
+        if metadata.get('role') != 'trainer':
+            continue
+        user_id = uuid.UUID(str(user_field(user, 'id')))
+        seen.add(user_id)
+        remote_updated_at = _parse_timestamp(user_field(user, 'updated_at'))
+
+        entry = existing.get(user_id)
+        if entry is not None and entry.remote_updated_at == remote_updated_at and remote_updated_at is not None:
+            continue
+        if entry is None:
+            entry = TrainerDirectoryEntry(supabase_user_id=user_id)
+            db.session.add(entry)
+            added += 1
+        else:
+            updated += 1
+        email = user_field(user, 'email')
+        username = metadata.get('username')
+        entry.email = email
+        entry.username = username
+        entry.email_key = email.lower() if email else None
+        entry.name_key = (username or email or '').lower() or None
+        entry.remote_updated_at = remote_updated_at
+        entry.synced_at = now
+
+    removed = [entry for user_id, entry in existing.items() if user_id not in seen]
+    for entry in removed:
+        db.session.delete(entry)
+
+    if added or updated or removed:
+        data_version.bump(data_version.TRAINERS)
+    db.session.commit()
+    _next_sync = time.monotonic() + SYNC_TTL_SECONDS
+    return {'added': added, 'updated': updated, 'removed': len(removed)}
+
+
+def _sync_failed():
+    """Log the failed sync and hold off the next attempt for SYNC_RETRY_SECONDS."""
+    global _next_sync
+    _next_sync = time.monotonic() + SYNC_RETRY_SECONDS
+    db.session.rollback()
+    current_app.logger.exception('Trainer directory sync failed')
+
+
+def _background_sync(app):
+    with app.app_context():
+        try:
+            sync_trainer_directory()
+        except Exception:
+            _sync_failed()
+        finally:
+            _sync_lock.release()
+
+
+def refresh_if_stale():
+    """Make sure the mirror is no older than SYNC_TTL_SECONDS.
+
+    The very first sync of an empty mirror runs inline so the page has data;
+    after that, stale mirrors are refreshed on a background thread while the
+    current request keeps reading the local copy. A failed sync, inline or in
+    the background, is retried after SYNC_RETRY_SECONDS rather than on the
+    next request.
+    """
+    if _next_sync is not None and time.monotonic() < _next_sync:
+        return
+    if not _sync_lock.acquire(blocking=False):
+        return  # A sync is already running
+
+    try:
+        if db.session.query(TrainerDirectoryEntry.supabase_user_id).first() is not None:
+            app = current_app._get_current_object()
+            threading.Thread(target=_background_sync, args=(app,), daemon=True).start()
+            return  # The thread releases the lock
+        sync_trainer_directory()
+    except Exception:
+        _sync_failed()
+    _sync_lock.release()
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_trainers(query=''):
+    """Trainers whose name or email starts with ``query`` (case-insensitive), by name."""
+    refresh_if_stale()
+    entries = TrainerDirectoryEntry.query
+    query = (query or '').strip().lower()
+    if query:
+        pattern = _escape_like(query) + '%'
+        entries = entries.filter(or_(
+            TrainerDirectoryEntry.name_key.like(pattern, escape='\\'),
+            TrainerDirectoryEntry.email_key.like(pattern, escape='\\')
+        ))
+    return entries.order_by(TrainerDirectoryEntry.name_key).all()
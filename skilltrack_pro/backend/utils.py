@@ -0,0 +1,47 @@
+import json
+from flask import Response, stream_with_context
+from .models import db
+
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+def stream_json_array(rows, serialize):
+    """Stream an iterable of rows as a JSON array without building it in memory.
+
+    Each row is passed through ``serialize`` and encoded on its own, so memory
+    use stays flat no matter how many rows the query yields.
+    """
+    def generate():
+        yield '['
+        first = True
+        for row in rows:
+            if first:
+                first = False
+                yield _encoder.encode(serialize(row))
+            else:
+                yield ',' + _encoder.encode(serialize(row))
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def stream_query_json(statement, serialize, yield_per=500):
+    """Stream the rows of a SELECT as a JSON array, ``yield_per`` rows per fetch.
+
+    Flask tears down the app context, and with it the request's session and
+    its connection, as soon as the view returns and before a streamed body is
+    sent. The rows are therefore read through a connection that the response
+    generator opens and holds until the last row has been written.
+    """
+    return stream_json_array(iter_query_rows(statement, yield_per), serialize)
+
+
+def iter_query_rows(statement, yield_per=500):
+    """Rows of a SELECT from a server-side cursor on a connection of their own.
+
+    The connection is opened on the first row and released once the last one
+    has been read (or the generator is closed), so this is safe to consume
+    from a streamed response body. ``yield_per`` rows are fetched at a time.
+    """
+    with db.engine.connect() as conn:
+        yield from conn.execution_options(stream_results=True, yield_per=yield_per).execute(statement)